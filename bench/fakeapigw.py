@@ -0,0 +1,85 @@
+"""In-process stand-in for the API Gateway connection-management API.
+
+Implements what smokehouse_common.fanout and the live lambdas call on an
+`apigatewaymanagementapi` client: post_to_connection, get_connection and
+delete_connection, with GoneException (410) for closed or unknown
+connections, like the real service. The test side opens and closes
+connections and reads back what each one received.
+
+    api = LocalConnections(latency_ms=20)
+    cid = api.connect()
+    deliver(api, [(cid, "hello")])
+    api.received(cid)        # -> [b"hello"]
+    api.close(cid)           # next post -> GoneException
+"""
+import itertools
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+MAX_DATA = 128 * 1024
+
+
+def _error(code, status, operation, message):
+    return ClientError({"Error": {"Code": code, "Message": message},
+                        "ResponseMetadata": {"HTTPStatusCode": status}}, operation)
+
+
+class LocalConnections:
+    """Thread-safe registry of open connections and the messages posted to them."""
+
+    def __init__(self, latency_ms=0.0):
+        self.latency = latency_ms / 1000
+        self._lock = threading.Lock()
+        self._open = {}      # connection id -> [messages]
+        self._ids = itertools.count(1)
+        self.posts = 0
+
+    # -- test side --
+    def connect(self, connection_id=None):
+        with self._lock:
+            cid = connection_id or f"conn-{next(self._ids):06d}="
+            self._open[cid] = []
+            return cid
+
+    def close(self, connection_id):
+        """Drop a connection without telling anyone, like a closed tab or lost network."""
+        with self._lock:
+            self._open.pop(connection_id, None)
+
+    def is_open(self, connection_id):
+        return connection_id in self._open
+
+    def received(self, connection_id):
+        return list(self._open.get(connection_id, ()))
+
+    def open_connections(self):
+        with self._lock:
+            return list(self._open)
+
+    # -- apigatewaymanagementapi --
+    def post_to_connection(self, ConnectionId, Data, **_):
+        if self.latency:
+            time.sleep(self.latency)
+        data = Data.encode() if isinstance(Data, str) else bytes(Data)
+        if len(data) > MAX_DATA:
+            raise _error("PayloadTooLargeException", 413, "PostToConnection", "Message too large")
+        with self._lock:
+            self.posts += 1
+            inbox = self._open.get(ConnectionId)
+            if inbox is None:
+                raise _error("GoneException", 410, "PostToConnection", "Connection is gone")
+            inbox.append(data)
+        return {}
+
+    def get_connection(self, ConnectionId, **_):
+        if ConnectionId not in self._open:
+            raise _error("GoneException", 410, "GetConnection", "Connection is gone")
+        return {"Identity": {"SourceIp": "127.0.0.1"}}
+
+    def delete_connection(self, ConnectionId, **_):
+        with self._lock:
+            if self._open.pop(ConnectionId, None) is None:
+                raise _error("GoneException", 410, "DeleteConnection", "Connection is gone")
+        return {}
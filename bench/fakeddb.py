@@ -0,0 +1,902 @@
+"""In-memory stand-in for the boto3 DynamoDB resource API.
+
+Covers what the lambdas use: Table.query (key conditions, filters, projections,
+ScanIndexForward, Limit, ExclusiveStartKey/LastEvaluatedKey, GSIs including
+sparse and INCLUDE projections), scan (with Segment/TotalSegments), get_item,
+put_item, update_item (SET/REMOVE/ADD/DELETE, if_not_exists, list_append),
+delete_item, batch_writer and resource-level batch_get_item. Conditions may be
+boto3 condition objects or expression strings; a failed ConditionExpression
+raises botocore's ClientError with ConditionalCheckFailedException, like the
+real service.
+
+Consumed capacity is tallied per table the way DynamoDB bills it: reads in 4 KB
+units (halved when eventually consistent, summed over everything a query or
+scan evaluates, not just what the filter keeps), writes in 1 KB units of the
+larger of the old and new item, plus one write per GSI the item lands in.
+
+Writes can also be captured as DynamoDB stream records (NEW_AND_OLD_IMAGES) to
+drive stream handlers with realistic events.
+
+    ddb = FakeDynamoDB.from_infra("infra/ddb/tables")
+    ddb.create_table("sensor_data", [("session_id", "S"), ("timestamp", "S")])
+    boto3.resource = lambda *a, **k: ddb
+"""
+import bisect
+import copy
+import itertools
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from decimal import Decimal
+
+from boto3.dynamodb.conditions import ConditionBase, AttributeBase
+from boto3.dynamodb.types import Binary, TypeSerializer
+from botocore.exceptions import ClientError
+
+PAGE_BYTES = 1024 * 1024   # a query/scan page stops after 1 MB evaluated
+_serializer = TypeSerializer()
+
+
+# ---------- errors ----------
+def _error(code, message, operation):
+    return ClientError({"Error": {"Code": code, "Message": message}}, operation)
+
+
+# ---------- values ----------
+def _store(value):
+    """Python value -> what boto3 hands back after a round trip (ints as Decimal)."""
+    if isinstance(value, bool) or value is None or isinstance(value, (str, Decimal, Binary)):
+        return value
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, float):
+        raise TypeError("Float types are not supported. Use Decimal types instead.")
+    if isinstance(value, (bytes, bytearray)):
+        return Binary(bytes(value))
+    if isinstance(value, dict):
+        return {k: _store(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_store(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return {_store(v) for v in value}
+    raise TypeError(f"Unsupported type {type(value)} for value {value!r}")
+
+
+def _copy(value):
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+def _size(value):
+    """Approximate DynamoDB attribute value size in bytes."""
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, Decimal):
+        return len(value.as_tuple().digits) // 2 + 2
+    if isinstance(value, Binary):
+        return len(value.value)
+    if isinstance(value, dict):
+        return 3 + sum(len(k) + _size(v) + 1 for k, v in value.items())
+    if isinstance(value, (list, set)):
+        return 3 + sum(_size(v) + 1 for v in value)
+    return 1
+
+
+def item_size(item):
+    return sum(len(k.encode()) + _size(v) for k, v in item.items())
+
+
+def _units(nbytes, unit):
+    return max(1, math.ceil(nbytes / unit))
+
+
+# ---------- expressions ----------
+# AST: ("and", a, b) ("or", a, b) ("not", a) ("cmp", op, l, r) ("between", x, lo, hi)
+#      ("in", x, [operands]) ("fn", name, [args]); operands ("path", names) ("val", v)
+#      ("size", operand) ("if_not_exists", path, operand) ("list_append", a, b)
+#      ("+"/"-", a, b)
+_BOTO_OPS = {"=", "<>", "<", "<=", ">", ">="}
+
+
+def _from_boto(obj):
+    """boto3 condition object -> AST."""
+    if isinstance(obj, AttributeBase):
+        return ("path", tuple(obj.name.split(".")))
+    if not isinstance(obj, ConditionBase):
+        return ("val", _store(obj))
+    expr = obj.get_expression()
+    op, values = expr["operator"], expr["values"]
+    if op in ("AND", "OR"):
+        return (op.lower(), _from_boto(values[0]), _from_boto(values[1]))
+    if op == "NOT":
+        return ("not", _from_boto(values[0]))
+    if op in _BOTO_OPS:
+        return ("cmp", op, _from_boto(values[0]), _from_boto(values[1]))
+    if op == "BETWEEN":
+        return ("between", _from_boto(values[0]), _from_boto(values[1]), _from_boto(values[2]))
+    if op == "IN":
+        return ("in", _from_boto(values[0]), [("val", _store(v)) for v in values[1]])
+    if op == "size":
+        return ("size", _from_boto(values[0]))
+    return ("fn", op, [_from_boto(v) for v in values])
+
+
+_TOKEN = re.compile(r"\s*(<>|<=|>=|[=<>(),+\-\[\]]|[#:]\w+|[A-Za-z_]\w*|\d+|\.)")
+
+
+class _Parser:
+    """Recursive-descent parser for condition/key/update expression strings."""
+
+    def __init__(self, text, names, values):
+        self.tokens, pos = [], 0
+        text = text.strip()
+        while pos < len(text):
+            m = _TOKEN.match(text, pos)
+            if not m:
+                raise _error("ValidationException", f"Invalid expression near {text[pos:]!r}", "Parse")
+            self.tokens.append(m.group(1))
+            pos = m.end()
+            while pos < len(text) and text[pos].isspace():
+                pos += 1
+        self.i = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    def peek(self, upper=False):
+        tok = self.tokens[self.i] if self.i < len(self.tokens) else None
+        return tok.upper() if upper and tok else tok
+
+    def take(self, expected=None):
+        tok = self.peek()
+        if tok is None or (expected and tok.upper() != expected):
+            raise _error("ValidationException", f"expected {expected or 'token'}, got {tok!r}", "Parse")
+        self.i += 1
+        return tok
+
+    def done(self):
+        return self.i >= len(self.tokens)
+
+    # conditions
+    def condition(self):
+        left = self.conjunction()
+        while self.peek(True) == "OR":
+            self.take()
+            left = ("or", left, self.conjunction())
+        return left
+
+    def conjunction(self):
+        left = self.negation()
+        while self.peek(True) == "AND":
+            self.take()
+            left = ("and", left, self.negation())
+        return left
+
+    def negation(self):
+        if self.peek(True) == "NOT":
+            self.take()
+            return ("not", self.negation())
+        return self.predicate()
+
+    def predicate(self):
+        if self.peek() == "(":
+            self.take()
+            inner = self.condition()
+            self.take(")")
+            return inner
+        name = self.peek()
+        if name in ("attribute_exists", "attribute_not_exists", "begins_with", "contains", "attribute_type"):
+            self.take()
+            return ("fn", name, self.arguments())
+        left = self.operand()
+        op = self.take()
+        if op in _BOTO_OPS:
+            return ("cmp", op, left, self.operand())
+        if op.upper() == "BETWEEN":
+            lo = self.operand()
+            self.take("AND")
+            return ("between", left, lo, self.operand())
+        if op.upper() == "IN":
+            return ("in", left, self.arguments())
+        raise _error("ValidationException", f"unexpected {op!r}", "Parse")
+
+    def arguments(self):
+        self.take("(")
+        args = [self.operand()]
+        while self.peek() == ",":
+            self.take()
+            args.append(self.operand())
+        self.take(")")
+        return args
+
+    def operand(self):
+        tok = self.peek()
+        if tok == "size":
+            self.take()
+            return ("size", self.arguments()[0])
+        if tok in ("if_not_exists", "list_append"):
+            self.take()
+            a, b = self.arguments()
+            return (tok, a, b)
+        if tok and tok.startswith(":"):
+            self.take()
+            if tok not in self.values:
+                raise _error("ValidationException", f"missing value {tok}", "Parse")
+            return ("val", _store(self.values[tok]))
+        return self.path()
+
+    def path(self):
+        names = [self.name(self.take())]
+        while self.peek() in (".", "["):
+            if self.take() == ".":
+                names.append(self.name(self.take()))
+            else:
+                names.append(int(self.take()))
+                self.take("]")
+        return ("path", tuple(names))
+
+    def name(self, tok):
+        if tok.startswith("#"):
+            if tok not in self.names:
+                raise _error("ValidationException", f"missing name {tok}", "Parse")
+            return self.names[tok]
+        return tok
+
+    # update expressions
+    def update(self):
+        actions = []
+        while not self.done():
+            clause = self.take().upper()
+            while True:
+                target = self.path()
+                if clause == "SET":
+                    self.take("=")
+                    value = self.operand()
+                    if self.peek() in ("+", "-"):
+                        op = self.take()
+                        value = (op, value, self.operand())
+                    actions.append(("set", target, value))
+                elif clause == "REMOVE":
+                    actions.append(("remove", target, None))
+                elif clause in ("ADD", "DELETE"):
+                    actions.append((clause.lower(), target, self.operand()))
+                else:
+                    raise _error("ValidationException", f"unknown clause {clause}", "Parse")
+                if self.peek() != ",":
+                    break
+                self.take()
+        return actions
+
+
+def _parse(expr, names, values, update=False):
+    if expr is None:
+        return None
+    if isinstance(expr, (ConditionBase, AttributeBase)):
+        return _from_boto(expr)
+    parser = _Parser(expr, names, values)
+    tree = parser.update() if update else parser.condition()
+    if not parser.done():
+        raise _error("ValidationException", f"trailing tokens in {expr!r}", "Parse")
+    return tree
+
+
+_MISSING = object()
+
+
+def _get(item, names):
+    cur = item
+    for n in names:
+        if isinstance(n, int):
+            if not isinstance(cur, list) or n >= len(cur):
+                return _MISSING
+            cur = cur[n]
+        elif isinstance(cur, dict) and n in cur:
+            cur = cur[n]
+        else:
+            return _MISSING
+    return cur
+
+
+def _value(node, item):
+    kind = node[0]
+    if kind == "val":
+        return node[1]
+    if kind == "path":
+        return _get(item, node[1])
+    if kind == "size":
+        v = _value(node[1], item)
+        if v is _MISSING:
+            return _MISSING
+        return Decimal(len(v.value if isinstance(v, Binary) else v))
+    if kind == "if_not_exists":
+        v = _value(node[1], item)
+        return _value(node[2], item) if v is _MISSING else v
+    if kind == "list_append":
+        return list(_value(node[1], item)) + list(_value(node[2], item))
+    if kind in ("+", "-"):
+        a, b = _value(node[1], item), _value(node[2], item)
+        if a is _MISSING or b is _MISSING:
+            raise _error("ValidationException", "operand in arithmetic does not exist", "UpdateItem")
+        return a + b if kind == "+" else a - b
+    raise ValueError(f"not an operand: {node!r}")
+
+
+def _comparable(a, b):
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b)
+    if isinstance(a, Decimal) and isinstance(b, Decimal):
+        return True
+    return type(a) is type(b) and isinstance(a, (str, Binary))
+
+
+def _key(v):
+    return v.value if isinstance(v, Binary) else v
+
+
+_TYPES = {str: "S", Decimal: "N", Binary: "B", bool: "BOOL", dict: "M", list: "L", type(None): "NULL"}
+
+
+def _holds(node, item):
+    """Evaluate a condition AST against an item."""
+    kind = node[0]
+    if kind == "and":
+        return _holds(node[1], item) and _holds(node[2], item)
+    if kind == "or":
+        return _holds(node[1], item) or _holds(node[2], item)
+    if kind == "not":
+        return not _holds(node[1], item)
+    if kind == "cmp":
+        a, b = _value(node[2], item), _value(node[3], item)
+        if a is _MISSING or b is _MISSING:
+            return node[1] == "<>" and (a is _MISSING) != (b is _MISSING)
+        if node[1] == "=":
+            return _comparable(a, b) and a == b
+        if node[1] == "<>":
+            return not (_comparable(a, b) and a == b)
+        if not _comparable(a, b):
+            return False
+        a, b = _key(a), _key(b)
+        return {"<": a < b, "<=": a <= b, ">": a > b, ">=": a >= b}[node[1]]
+    if kind == "between":
+        x, lo, hi = (_value(n, item) for n in node[1:])
+        if _MISSING in (x, lo, hi) or not (_comparable(x, lo) and _comparable(x, hi)):
+            return False
+        return _key(lo) <= _key(x) <= _key(hi)
+    if kind == "in":
+        x = _value(node[1], item)
+        return x is not _MISSING and any(_comparable(x, v) and x == v for v in (_value(n, item) for n in node[2]))
+    if kind == "fn":
+        name, args = node[1], node[2]
+        v = _value(args[0], item)
+        if name == "attribute_exists":
+            return v is not _MISSING
+        if name == "attribute_not_exists":
+            return v is _MISSING
+        if v is _MISSING:
+            return False
+        arg = _value(args[1], item)
+        if name == "begins_with":
+            return _comparable(v, arg) and _key(v)[:len(_key(arg))] == _key(arg)
+        if name == "contains":
+            if isinstance(v, (str, Binary)):
+                return _comparable(v, arg) and _key(arg) in _key(v)
+            return isinstance(v, (list, set)) and arg in v
+        if name == "attribute_type":
+            t = _TYPES.get(type(v)) or ("SS" if isinstance(v, set) else None)
+            return t == arg
+    raise ValueError(f"not a condition: {node!r}")
+
+
+def _leaves(node):
+    """Flatten a key condition's AND tree."""
+    if node[0] == "and":
+        return _leaves(node[1]) + _leaves(node[2])
+    return [node]
+
+
+def _projection(expr, names):
+    if not expr:
+        return None
+    return [tuple(_Parser(p, names, None).path()[1]) for p in expr.split(",")]
+
+
+def _project(item, paths):
+    if paths is None:
+        return _copy(item)
+    out = {}
+    for path in paths:
+        v = _get(item, path)
+        if v is _MISSING:
+            continue
+        cur = out
+        for n in path[:-1]:
+            cur = cur.setdefault(n, {})
+        cur[path[-1]] = _copy(v)
+    return out
+
+
+def _apply_update(item, actions):
+    for op, target, operand in actions:
+        names = target[1]
+        parent = item
+        for n in names[:-1]:
+            parent = parent.setdefault(n, {}) if isinstance(parent, dict) else parent[n]
+        leaf = names[-1]
+        if op == "set":
+            parent[leaf] = _copy(_value(operand, item))
+        elif op == "remove":
+            if isinstance(parent, dict):
+                parent.pop(leaf, None)
+            elif isinstance(leaf, int) and leaf < len(parent):
+                parent.pop(leaf)
+        elif op == "add":
+            v = _value(operand, item)
+            cur = _get(item, names)
+            if cur is _MISSING:
+                parent[leaf] = _copy(v)
+            elif isinstance(cur, set):
+                parent[leaf] = cur | v
+            else:
+                parent[leaf] = cur + v
+        elif op == "delete":
+            cur = _get(item, names)
+            if isinstance(cur, set):
+                remaining = cur - _value(operand, item)
+                if remaining:
+                    parent[leaf] = remaining
+                else:
+                    parent.pop(leaf, None)
+
+
+def _updated_attrs(actions):
+    return {target[1][0] for _, target, _ in actions}
+
+
+# ---------- storage ----------
+class _Index:
+    """One key-ordered view (the base table or a GSI): hash -> sorted range keys."""
+
+    def __init__(self, name, hash_key, range_key, table_keys, projection=None):
+        self.name = name
+        self.hash_key, self.range_key = hash_key, range_key
+        self.table_keys = table_keys
+        projection = projection or {"ProjectionType": "ALL"}
+        ptype = projection.get("ProjectionType", "ALL")
+        if ptype == "ALL":
+            self.attrs = None
+        else:
+            self.attrs = set(table_keys) | {hash_key} | ({range_key} if range_key else set())
+            if ptype == "INCLUDE":
+                self.attrs |= set(projection.get("NonKeyAttributes", []))
+        self.parts = {}  # hash value -> [sorted sort keys, {sort key: item}]
+
+    def sort_key(self, item):
+        pk = tuple(_key(item[k]) for k in self.table_keys)
+        if self.range_key:
+            return (_key(item[self.range_key]),) + pk
+        return pk
+
+    def covers(self, item):
+        return self.hash_key in item and (not self.range_key or self.range_key in item)
+
+    def view(self, item):
+        if self.attrs is None:
+            return item
+        return {k: v for k, v in item.items() if k in self.attrs}
+
+    def add(self, item):
+        part = self.parts.setdefault(_key(item[self.hash_key]), [[], {}])
+        sk = self.sort_key(item)
+        if sk not in part[1]:
+            bisect.insort(part[0], sk)
+        part[1][sk] = self.view(item)
+
+    def remove(self, item):
+        h = _key(item[self.hash_key])
+        part = self.parts.get(h)
+        sk = self.sort_key(item)
+        if part and sk in part[1]:
+            del part[1][sk]
+            part[0].pop(bisect.bisect_left(part[0], sk))
+            if not part[0]:
+                del self.parts[h]
+
+    def last_key(self, item):
+        keys = set(self.table_keys) | {self.hash_key} | ({self.range_key} if self.range_key else set())
+        return {k: _copy(item[k]) for k in keys}
+
+
+class FakeTable:
+    """Mimics boto3.resource("dynamodb").Table(name)."""
+
+    def __init__(self, db, name, key_schema, indexes=()):
+        self.db = db
+        self.name = self.table_name = name
+        hash_key = next(k["AttributeName"] for k in key_schema if k["KeyType"] == "HASH")
+        range_key = next((k["AttributeName"] for k in key_schema if k["KeyType"] == "RANGE"), None)
+        self.keys = (hash_key,) + ((range_key,) if range_key else ())
+        self.base = _Index(None, hash_key, range_key, self.keys)
+        self.indexes = {}
+        for gsi in indexes:
+            schema = gsi["KeySchema"]
+            self.indexes[gsi["IndexName"]] = _Index(
+                gsi["IndexName"],
+                next(k["AttributeName"] for k in schema if k["KeyType"] == "HASH"),
+                next((k["AttributeName"] for k in schema if k["KeyType"] == "RANGE"), None),
+                self.keys, gsi.get("Projection"),
+            )
+        self.items = {}
+        self.lock = threading.RLock()
+        self.stream = []
+        self._seq = itertools.count(1)
+
+    def __repr__(self):
+        return f"FakeTable({self.name!r}, {len(self.items)} items)"
+
+    # -- internals --
+    def _pk(self, key, operation):
+        if set(key) != set(self.keys):
+            raise _error("ValidationException",
+                         "The provided key element does not match the schema", operation)
+        return tuple(_key(key[k]) for k in self.keys)
+
+    def _write(self, pk, old, new, operation):
+        """Replace `old` with `new` (either may be None) in the table and every GSI."""
+        units = _units(max(item_size(old) if old else 0, item_size(new) if new else 0), 1024)
+        for index in (self.base, *self.indexes.values()):
+            had, has = old is not None and index.covers(old), new is not None and index.covers(new)
+            if had:
+                index.remove(old)
+            if has:
+                index.add(new)
+            if index is not self.base and (had or has):
+                units += 1 + (had and has and index.sort_key(old) != index.sort_key(new))
+        if new is None:
+            self.items.pop(pk, None)
+        else:
+            self.items[pk] = new
+        self.db.consume(self.name, wcu=units)
+        if self.db.streams and (old is not None or new is not None):
+            self._record(old, new)
+
+    def _record(self, old, new):
+        some = new if new is not None else old
+        record = {
+            "eventID": f"{self.name}-{next(self._seq)}",
+            "eventName": "REMOVE" if new is None else ("INSERT" if old is None else "MODIFY"),
+            "eventSource": "aws:dynamodb",
+            "eventSourceARN": f"arn:aws:dynamodb:local:000000000000:table/{self.name}/stream/local",
+            "dynamodb": {
+                "Keys": {k: _serializer.serialize(some[k]) for k in self.keys},
+                "StreamViewType": "NEW_AND_OLD_IMAGES",
+            },
+        }
+        if new is not None:
+            record["dynamodb"]["NewImage"] = {k: _serializer.serialize(v) for k, v in new.items()}
+        if old is not None:
+            record["dynamodb"]["OldImage"] = {k: _serializer.serialize(v) for k, v in old.items()}
+        self.stream.append(record)
+
+    def _check(self, kwargs, item, operation):
+        cond = _parse(kwargs.get("ConditionExpression"), kwargs.get("ExpressionAttributeNames"),
+                      kwargs.get("ExpressionAttributeValues"))
+        if cond is not None and not _holds(cond, item or {}):
+            raise _error("ConditionalCheckFailedException", "The conditional request failed", operation)
+
+    def _returned(self, kwargs, old, new, actions=None):
+        mode = kwargs.get("ReturnValues", "NONE")
+        if mode == "ALL_OLD" and old:
+            return {"Attributes": _copy(old)}
+        if mode == "ALL_NEW" and new:
+            return {"Attributes": _copy(new)}
+        if mode in ("UPDATED_NEW", "UPDATED_OLD") and actions:
+            src = new if mode == "UPDATED_NEW" else old
+            attrs = {k: _copy(src[k]) for k in _updated_attrs(actions) if src and k in src}
+            return {"Attributes": attrs} if attrs else {}
+        return {}
+
+    # -- item API --
+    def get_item(self, Key, ConsistentRead=False, ProjectionExpression=None,
+                 ExpressionAttributeNames=None, **_):
+        pk = self._pk(Key, "GetItem")
+        with self.lock:
+            item = self.items.get(pk)
+            size = item_size(item) if item else 0
+            self.db.consume(self.name, rcu=_units(size, 4096) * (1 if ConsistentRead else 0.5))
+            if item is None:
+                return {}
+            return {"Item": _project(item, _projection(ProjectionExpression, ExpressionAttributeNames))}
+
+    def put_item(self, Item, **kwargs):
+        new = _store(Item)
+        pk = self._pk({k: new[k] for k in self.keys if k in new}, "PutItem")
+        with self.lock:
+            old = self.items.get(pk)
+            self._check(kwargs, old, "PutItem")
+            self._write(pk, old, new, "PutItem")
+            return self._returned(kwargs, old, new)
+
+    def update_item(self, Key, UpdateExpression=None, **kwargs):
+        pk = self._pk(Key, "UpdateItem")
+        actions = _parse(UpdateExpression, kwargs.get("ExpressionAttributeNames"),
+                         kwargs.get("ExpressionAttributeValues"), update=True) or []
+        if _updated_attrs(actions) & set(self.keys):
+            raise _error("ValidationException", "Cannot update attribute: it is part of the key", "UpdateItem")
+        with self.lock:
+            old = self.items.get(pk)
+            try:
+                self._check(kwargs, old, "UpdateItem")
+            except ClientError:
+                self.db.consume(self.name, wcu=_units(item_size(old) if old else 0, 1024))
+                raise
+            new = _copy(old) if old else {k: _store(Key[k]) for k in self.keys}
+            _apply_update(new, actions)
+            self._write(pk, old, new, "UpdateItem")
+            return self._returned(kwargs, old, new, actions)
+
+    def delete_item(self, Key, **kwargs):
+        pk = self._pk(Key, "DeleteItem")
+        with self.lock:
+            old = self.items.get(pk)
+            self._check(kwargs, old, "DeleteItem")
+            if old is not None:
+                self._write(pk, old, None, "DeleteItem")
+            else:
+                self.db.consume(self.name, wcu=1)
+            return self._returned(kwargs, old, None)
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return _BatchWriter(self, overwrite_by_pkeys)
+
+    def load(self, items):
+        """Bulk-load fixtures: no capacity, conditions or stream records."""
+        with self.lock:
+            for item in items:
+                new = _store(item)
+                pk = tuple(_key(new[k]) for k in self.keys)
+                old = self.items.get(pk)
+                for index in (self.base, *self.indexes.values()):
+                    if old is not None and index.covers(old):
+                        index.remove(old)
+                    if index.covers(new):
+                        index.add(new)
+                self.items[pk] = new
+
+    def drain_stream(self):
+        """Stream records written since the last drain, oldest first."""
+        with self.lock:
+            records, self.stream = self.stream, []
+        return records
+
+    # -- reads --
+    def query(self, KeyConditionExpression, IndexName=None, **kwargs):
+        index = self._index(IndexName, "Query")
+        names, values = kwargs.get("ExpressionAttributeNames"), kwargs.get("ExpressionAttributeValues")
+        hash_value, range_cond = _MISSING, None
+        for leaf in _leaves(_parse(KeyConditionExpression, names, values)):
+            if leaf[0] == "cmp" and leaf[1] == "=" and leaf[2] == ("path", (index.hash_key,)):
+                hash_value = _key(leaf[3][1])
+            elif index.range_key and range_cond is None:
+                range_cond = leaf
+            else:
+                raise _error("ValidationException", "Query key condition not supported", "Query")
+        if hash_value is _MISSING:
+            raise _error("ValidationException", "Query condition missed key schema element", "Query")
+        forward = kwargs.get("ScanIndexForward", True)
+        with self.lock:
+            part = index.parts.get(hash_value) or [[], {}]
+            keys = self._range(part[0], range_cond)
+            start = kwargs.get("ExclusiveStartKey")
+            if start:
+                sk = index.sort_key(_store(start))
+                keys = keys[bisect.bisect_right(keys, sk):] if forward else keys[:bisect.bisect_left(keys, sk)]
+            if not forward:
+                keys = keys[::-1]
+            return self._page(index, [part[1][sk] for sk in keys], kwargs)
+
+    def scan(self, IndexName=None, Segment=None, TotalSegments=None, **kwargs):
+        index = self._index(IndexName, "Scan")
+        with self.lock:
+            # Stable order: partitions by hash of their key, items in key order
+            order = lambda h: (zlib.crc32(repr(h).encode()), repr(h))
+            hashes = sorted((h for h in index.parts
+                             if TotalSegments is None or order(h)[0] % TotalSegments == Segment), key=order)
+            start = kwargs.get("ExclusiveStartKey")
+            if start:
+                start = _store(start)
+                h0, sk0 = _key(start[index.hash_key]), index.sort_key(start)
+                hashes = [h for h in hashes if order(h) >= order(h0)]
+            items = []
+            for h in hashes:
+                keys, part = index.parts[h]
+                if start and h == h0:
+                    keys = keys[bisect.bisect_right(keys, sk0):]
+                items.extend(part[sk] for sk in keys)
+            return self._page(index, items, kwargs)
+
+    def _index(self, name, operation):
+        if name is None:
+            return self.base
+        if name not in self.indexes:
+            raise _error("ValidationException", f"The table does not have the specified index: {name}", operation)
+        return self.indexes[name]
+
+    @staticmethod
+    def _range(keys, cond):
+        """Slice of a partition's sorted keys matching a range-key condition."""
+        if cond is None:
+            return keys
+        lo, hi = 0, len(keys)
+        kind = cond[0]
+        if kind == "cmp":
+            v, op = (_key(cond[3][1]),), cond[1]
+            top = v + (_Top,)
+            if op == "=":
+                lo, hi = bisect.bisect_left(keys, v), bisect.bisect_left(keys, top)
+            elif op == "<":
+                hi = bisect.bisect_left(keys, v)
+            elif op == "<=":
+                hi = bisect.bisect_left(keys, top)
+            elif op == ">":
+                lo = bisect.bisect_left(keys, top)
+            elif op == ">=":
+                lo = bisect.bisect_left(keys, v)
+        elif kind == "between":
+            lo = bisect.bisect_left(keys, (_key(cond[2][1]),))
+            hi = bisect.bisect_left(keys, (_key(cond[3][1]), _Top))
+        elif kind == "fn" and cond[1] == "begins_with":
+            prefix = _key(cond[2][1][1])
+            lo = hi = bisect.bisect_left(keys, (prefix,))
+            while hi < len(keys) and keys[hi][0][:len(prefix)] == prefix:
+                hi += 1
+        else:
+            raise _error("ValidationException", "Unsupported range key condition", "Query")
+        return keys[lo:hi]
+
+    def _page(self, index, items, kwargs):
+        """One page of `items` (already in read order): Limit, 1 MB cap, filter, projection."""
+        names, values = kwargs.get("ExpressionAttributeNames"), kwargs.get("ExpressionAttributeValues")
+        filt = _parse(kwargs.get("FilterExpression"), names, values)
+        paths = _projection(kwargs.get("ProjectionExpression"), names)
+        limit = kwargs.get("Limit")
+        out, scanned, nbytes, last = [], 0, 0, None
+        for item in items:
+            scanned += 1
+            nbytes += item_size(item)
+            if filt is None or _holds(filt, item):
+                out.append(_project(item, paths))
+            if (limit and scanned >= limit) or (nbytes >= PAGE_BYTES and scanned < len(items)):
+                last = index.last_key(item)
+                break
+        consistent = kwargs.get("ConsistentRead") and index is self.base
+        self.db.consume(self.name, rcu=_units(nbytes, 4096) * (1 if consistent else 0.5))
+        resp = {"Count": len(out), "ScannedCount": scanned}
+        if kwargs.get("Select") != "COUNT":
+            resp["Items"] = out
+        if last is not None:
+            resp["LastEvaluatedKey"] = last
+        return resp
+
+
+class _TopType:
+    """Sorts after every key component, to bound bisects on a range-key prefix."""
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+
+_Top = _TopType()
+
+
+class _BatchWriter:
+    def __init__(self, table, overwrite_by_pkeys=None):
+        self.table = table
+        self.pending = []
+        self.overwrite = overwrite_by_pkeys
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def put_item(self, Item):
+        self._add(("put", Item))
+
+    def delete_item(self, Key):
+        self._add(("delete", Key))
+
+    def _add(self, request):
+        if self.overwrite:
+            body = request[1]
+            key = tuple(_key(_store(body[k])) for k in self.overwrite)
+            self.pending = [r for r in self.pending
+                            if tuple(_key(_store(r[1][k])) for k in self.overwrite) != key]
+        self.pending.append(request)
+        if len(self.pending) >= 25:
+            self.flush()
+
+    def flush(self):
+        for op, body in self.pending:
+            if op == "put":
+                self.table.put_item(Item=body)
+            else:
+                self.table.delete_item(Key=body)
+        self.pending = []
+
+
+class FakeDynamoDB:
+    """Mimics boto3.resource("dynamodb")."""
+
+    def __init__(self):
+        self.tables = {}
+        self.streams = False
+        self._consumed = {}
+        self._lock = threading.Lock()
+
+    # -- setup --
+    def create_table(self, TableName, KeySchema, GlobalSecondaryIndexes=(), **_):
+        """KeySchema as the AWS list of dicts, or [(name, type), ...] with the hash key first."""
+        if KeySchema and isinstance(KeySchema[0], (tuple, list)):
+            KeySchema = [{"AttributeName": n, "KeyType": t}
+                         for (n, _), t in zip(KeySchema, ("HASH", "RANGE"))]
+        self.tables[TableName] = FakeTable(self, TableName, KeySchema, GlobalSecondaryIndexes)
+        return self.tables[TableName]
+
+    @classmethod
+    def from_infra(cls, directory):
+        """Create every table described by the infra/ddb/tables/*.json definitions."""
+        db = cls()
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".json"):
+                with open(os.path.join(directory, name)) as f:
+                    db.create_table(**json.load(f))
+        return db
+
+    # -- resource API --
+    def Table(self, name):
+        if name not in self.tables:
+            raise _error("ResourceNotFoundException", f"Requested resource not found: {name}", "DescribeTable")
+        return self.tables[name]
+
+    def batch_get_item(self, RequestItems, **_):
+        if sum(len(r["Keys"]) for r in RequestItems.values()) > 100:
+            raise _error("ValidationException", "Too many items requested for the BatchGetItem call",
+                         "BatchGetItem")
+        responses = {}
+        for name, request in RequestItems.items():
+            table = self.Table(name)
+            found = responses.setdefault(name, [])
+            for key in request["Keys"]:
+                item = table.get_item(Key=key, ConsistentRead=request.get("ConsistentRead", False),
+                                      ProjectionExpression=request.get("ProjectionExpression"),
+                                      ExpressionAttributeNames=request.get("ExpressionAttributeNames")
+                                      ).get("Item")
+                if item is not None:
+                    found.append(item)
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    # -- accounting --
+    def consume(self, table, rcu=0.0, wcu=0.0):
+        with self._lock:
+            c = self._consumed.setdefault(table, {"rcu": 0.0, "wcu": 0.0})
+            c["rcu"] += rcu
+            c["wcu"] += wcu
+
+    def consumed(self, reset=False):
+        """{table: {"rcu": ..., "wcu": ...}} since the last reset."""
+        with self._lock:
+            out = copy.deepcopy(self._consumed)
+            if reset:
+                self._consumed = {}
+        return out
@@ -0,0 +1,579 @@
+"""Handler-level load benchmark against the in-memory DynamoDB fake.
+
+Loads a synthetic history (by default 1,000 sessions x 720 rows x 3 probes: a
+year of 12-hour cooks at one reading a minute), imports every Python
+lambda_handler with boto3 pointed at bench/fakeddb.py, drives each with API
+Gateway, DynamoDB stream or scheduled events, and reports warm-call latency
+percentiles and consumed capacity units per handler.
+
+    python bench/run.py                                  # full scale
+    python bench/run.py --sessions 100 --iterations 50   # quick pass
+    python bench/run.py --only FetchSensorsPy SessionsList
+    python bench/run.py --json bench.json                # save results
+    python bench/run.py --baseline bench.json            # exit 1 on regressions
+
+Needs boto3 installed locally (for its condition/serializer types); no AWS
+credentials or network are used. Bedrock, SNS, SSM, IoT, Amplify and Lambda
+clients are answered by canned responses (--model-latency-ms adds a simulated
+Bedrock round trip).
+"""
+import argparse
+import importlib.util
+import io
+import json
+import math
+import os
+import random
+import sys
+import time
+import types
+from decimal import Decimal
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+LAMBDAS = os.path.join(ROOT, "lambdas")
+sys.path.insert(0, os.path.join(ROOT, "layers", "smokehouse_common", "python"))
+sys.path.insert(0, HERE)
+
+import boto3                                        # noqa: E402
+import boto3.session                                # noqa: E402
+
+from fakeapigw import LocalConnections              # noqa: E402
+from fakeddb import FakeDynamoDB                    # noqa: E402
+
+INTERVAL = 60            # seconds between readings
+DAY = 86400
+PROBES = ("probe1_temp", "probe2_temp", "probe3_temp")
+ITEMS = (  # probe -> (item_type, weight lbs, stall temp °F)
+    ("probe1_temp", "brisket", "14", 160),
+    ("probe2_temp", "pork_shoulder", "8", 155),
+    ("probe3_temp", "chicken", "4", None),
+)
+MEAT_TYPES = [
+    {"name": "brisket", "description": "Beef brisket, packer cut", "smoke_type": "hot",
+     "target_internal_temp_f": Decimal(203), "max_safe_temp_f": None},
+    {"name": "pork_shoulder", "description": "Bone-in pork butt", "smoke_type": "hot",
+     "target_internal_temp_f": Decimal(200), "max_safe_temp_f": None},
+    {"name": "chicken", "description": "Whole chicken", "smoke_type": "hot",
+     "target_internal_temp_f": Decimal(165), "max_safe_temp_f": None},
+    {"name": "salmon", "description": "Cold-smoked salmon", "smoke_type": "cold",
+     "target_internal_temp_f": None, "max_safe_temp_f": Decimal(80)},
+]
+# Tables the lambdas read that have no definition under infra/ddb/tables
+EXTRA_TABLES = [
+    {"TableName": "sensor_data",
+     "KeySchema": [{"AttributeName": "session_id", "KeyType": "HASH"},
+                   {"AttributeName": "timestamp", "KeyType": "RANGE"}],
+     "GlobalSecondaryIndexes": [{
+         "IndexName": "by_session_timestamp",
+         "KeySchema": [{"AttributeName": "session_id", "KeyType": "HASH"},
+                       {"AttributeName": "timestamp", "KeyType": "RANGE"}],
+         "Projection": {"ProjectionType": "ALL"}}]},
+    {"TableName": "session_analytics",
+     "KeySchema": [{"AttributeName": "session_id", "KeyType": "HASH"},
+                   {"AttributeName": "metric", "KeyType": "RANGE"}]},
+    {"TableName": "meat_types",
+     "KeySchema": [{"AttributeName": "name", "KeyType": "HASH"}]},
+]
+ENV = {
+    "AWS_DEFAULT_REGION": "us-east-2",
+    "PROBE_ASSIGNMENT_TABLE": "probe_assignments",
+    "SNS_TOPIC_ARN": "arn:aws:sns:us-east-2:000000000000:bench",
+    "LIVE_ENDPOINT": "https://bench.execute-api.us-east-2.amazonaws.com/live",
+}
+
+
+# ---------- fake AWS ----------
+class FakeClient:
+    """Canned answers for the non-DynamoDB clients the handlers create."""
+
+    def __init__(self, service, model_latency=0.0):
+        self.service = service
+        self.model_latency = model_latency
+
+    def invoke_model(self, **kwargs):
+        if self.model_latency:
+            time.sleep(self.model_latency)
+        advice = {"summary": "Holding steady.", "actions": ["Keep the pit at target."],
+                  "eta_minutes": 180, "notes": "bench"}
+        advice.update({p: dict(advice) for p in PROBES})
+        body = {"content": [{"type": "text", "text": json.dumps(advice)}]}
+        return {"body": io.BytesIO(json.dumps(body).encode())}
+
+    def get_parameter(self, **kwargs):
+        return {"Parameter": {"Name": kwargs.get("Name"), "Value": "30"}}
+
+    def publish(self, **kwargs):
+        return {"MessageId": "bench"}
+
+    def invoke(self, **kwargs):
+        return {"StatusCode": 202}
+
+    def describe_table(self, TableName, **kwargs):
+        return {"Table": {"TableName": TableName, "TableStatus": "ACTIVE"}}
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: {}
+
+
+def install(db, model_latency, connections):
+    """Point boto3 at the fakes (before any handler module is imported)."""
+    for k, v in ENV.items():
+        os.environ.setdefault(k, v)
+
+    def resource(service_name, *args, **kwargs):
+        if service_name != "dynamodb":
+            raise ValueError(f"no fake for resource {service_name!r}")
+        return db
+
+    def client(service_name, *args, **kwargs):
+        if service_name == "apigatewaymanagementapi":
+            return connections
+        return FakeClient(service_name, model_latency)
+
+    class Session:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def resource(self, service_name, *args, **kwargs):
+            return resource(service_name)
+
+        def client(self, service_name, *args, **kwargs):
+            return client(service_name)
+
+    boto3.resource, boto3.client, boto3.session.Session = resource, client, Session
+
+
+# ---------- synthetic data ----------
+_decimals = {}
+
+
+def _dec(v):
+    """Decimal at 0.1 resolution, interned so 700k rows don't hold 7M Decimal objects."""
+    q = int(round(v * 10))
+    d = _decimals.get(q)
+    if d is None:
+        d = _decimals[q] = Decimal(q) / 10
+    return d
+
+
+def _sid(epoch):
+    return time.strftime("%Y%m%d%H%M%S", time.gmtime(epoch))
+
+
+def _compact(epoch):
+    return time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(epoch))
+
+
+def _probe_temp(minute, stall, rng):
+    """Roughly realistic internal temp curve: fast rise, optional stall, slow finish."""
+    t = 40 + 150 * (1 - math.exp(-minute / 240))
+    if stall and t > stall:
+        t = stall + (t - stall) * 0.35
+    return t + rng.uniform(-0.4, 0.4)
+
+
+def make_payload(session_id, epoch, minute, target, rng):
+    """One firmware message as published to smokehouse/sensordata (-999 for a dropped probe)."""
+    warm = min(1.0, minute / 30)
+    outside = 58 + 8 * math.sin(epoch / DAY * 2 * math.pi)
+    pit = outside + (target - outside) * warm
+    payload = {
+        "session_id": session_id,
+        "timestamp": _compact(epoch),
+        "top_temp": round(pit + 6 + rng.uniform(-3, 3), 1),
+        "middle_temp": round(pit + rng.uniform(-3, 3), 1),
+        "bottom_temp": round(pit - 5 + rng.uniform(-3, 3), 1),
+        "outside_temp": round(outside, 1),
+        "humidity": round(45 + rng.uniform(0, 20), 1),
+        "smoke_ppm": round(150 + rng.uniform(0, 200), 1),
+    }
+    for probe, _, _, stall in ITEMS:
+        dropped = rng.random() < 0.005
+        payload[probe] = -999 if dropped else round(_probe_temp(minute, stall, rng), 1)
+    return payload
+
+
+def make_row(session_id, epoch, minute, target, rng):
+    """The sensor_data item SensorIngest writes for make_payload() (see readings.normalize).
+
+    Built here with interned Decimals rather than by normalize() itself, which would
+    allocate a fresh Decimal per value across the whole history.
+    """
+    payload = make_payload(session_id, epoch, minute, target, rng)
+    row = {"session_id": session_id, "timestamp": payload["timestamp"], "ts_epoch": epoch,
+           "elapsed_s": minute * INTERVAL}
+    for field, v in payload.items():
+        if isinstance(v, float) or isinstance(v, int) and v != -999:
+            row[field] = _dec(v)
+    row["pit_avg"] = _dec((payload["top_temp"] + payload["middle_temp"] + payload["bottom_temp"]) / 3)
+    return row
+
+
+class Fixture:
+    """The synthetic history plus the live sessions the stream scenarios extend."""
+
+    def __init__(self, db, sessions, rows, live, seed):
+        self.db = db
+        self.rng = random.Random(seed)
+        self.now = int(time.time())
+        self.ended, self.live = [], []
+        self.cursor = {}   # live session -> (next epoch, next minute)
+        sensors = db.Table("sensor_data")
+        packed = []
+        from smokehouse_common import archive
+
+        cook = rows * INTERVAL
+        for i in range(sessions):
+            is_live = i >= sessions - live
+            if is_live:
+                start = self.now - cook + (i - sessions) * 120
+            else:
+                start = self.now - (sessions - i) * DAY - cook
+            sid = _sid(start)
+            target = self.rng.choice((225, 250, 275))
+            data = [make_row(sid, start + m * INTERVAL, m, target, self.rng) for m in range(rows)]
+            sensors.load(data)
+            last = data[-1]
+            item = {
+                "session_id": sid, "kind": "session", "created_at": start, "started_at": start,
+                "start_time": data[0]["timestamp"], "last_seen": last["timestamp"],
+                "last_seen_at": last["ts_epoch"], "seen_count": rows, "target_pit_temp_f": target,
+            }
+            if is_live:
+                item.update(status="active", active_key="active")
+                self.live.append(sid)
+                self.cursor[sid] = (last["ts_epoch"] + INTERVAL, rows)
+            else:
+                item.update(status="ended", end_time=time.strftime("%Y-%m-%dT%H:%M:%SZ",
+                                                                   time.gmtime(last["ts_epoch"])))
+                blob = archive.pack(sid, data)
+                chunks = archive.parts(blob)
+                for p, chunk in enumerate(chunks):
+                    part = {"session_id": sid, "part": p, "blob": chunk}
+                    if p == 0:
+                        part.update(parts=len(chunks), rows=rows, bytes=len(blob))
+                    packed.append(part)
+                item.update(archived_rows=rows, archive_bytes=len(blob))
+                self.ended.append(sid)
+            db.Table("sessions").load([item])
+            db.Table("probe_assignments").load([
+                {"session_id": sid, "probe_id": probe, "item_type": kind, "item_weight": weight,
+                 "min_alert": Decimal(40), "max_alert": Decimal(210), "mobile_number": None}
+                for probe, kind, weight, _ in ITEMS
+            ])
+        db.Table("sensor_archive").load(packed)
+        db.Table("meat_types").load(MEAT_TYPES)
+
+    def live_session(self):
+        return self.rng.choice(self.live)
+
+    def ended_session(self):
+        return self.rng.choice(self.ended)
+
+    def any_session(self):
+        return self.rng.choice(self.ended + self.live)
+
+    def add_viewers(self, connections, per_session):
+        """Open per_session dashboard connections subscribed to each live session."""
+        self.connections = connections
+        self.db.Table("live_connections").load([
+            self._viewer(sid, connections.connect()) for sid in self.live for _ in range(per_session)
+        ])
+
+    def _viewer(self, sid, cid):
+        return {"session_id": sid, "connection_id": cid, "connected_at": self.now, "ttl": self.now + 3 * 3600}
+
+    def churn(self):
+        """One viewer drops off without a $disconnect (gone on next push), another subscribes."""
+        open_ = self.connections.open_connections()
+        if open_:
+            self.connections.close(self.rng.choice(open_))
+        self.db.Table("live_connections").load([self._viewer(self.live_session(), self.connections.connect())])
+
+    def ingest(self, n):
+        """Append n new readings across the live sessions; returns their stream records."""
+        sensors = self.db.Table("sensor_data")
+        self.db.streams = True
+        try:
+            for _ in range(n):
+                sid = self.live_session()
+                epoch, minute = self.cursor[sid]
+                sensors.put_item(Item=make_row(sid, epoch, minute, 225, self.rng))
+                self.cursor[sid] = (epoch + INTERVAL, minute + 1)
+        finally:
+            self.db.streams = False
+        return sensors.drain_stream()
+
+    def publish(self, n):
+        """n firmware messages across the live sessions, as the rule's SQS batch delivers them.
+
+        About one in fifty is a garbled frame that SensorIngest should reject.
+        """
+        records = []
+        for i in range(n):
+            sid = self.live_session()
+            epoch, minute = self.cursor[sid]
+            payload = make_payload(sid, epoch, minute, 225, self.rng)
+            self.cursor[sid] = (epoch + INTERVAL, minute + 1)
+            if self.rng.random() < 0.02:
+                payload["timestamp"] = "garbled"
+            records.append({"messageId": f"msg-{i}", "body": json.dumps(payload)})
+        return records
+
+    def reopen(self):
+        """Flag an ended session as active but long silent, so the closer has work."""
+        sid = self.ended_session()
+        self.db.Table("sessions").update_item(
+            Key={"session_id": sid},
+            UpdateExpression="SET #s = :a, active_key = :a",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={":a": "active"},
+        )
+        return sid
+
+
+# ---------- events ----------
+def http(method, path, qs=None, body=None):
+    """API Gateway HTTP API (payload v2) event."""
+    return {
+        "version": "2.0",
+        "routeKey": f"{method} {path}",
+        "rawPath": path,
+        "headers": {"content-type": "application/json"},
+        "queryStringParameters": {k: str(v) for k, v in (qs or {}).items()} or None,
+        "requestContext": {"http": {"method": method, "path": path}},
+        "body": json.dumps(body) if body is not None else None,
+        "isBase64Encoded": False,
+    }
+
+
+def ws(route, connection_id, body=None, qs=None):
+    """API Gateway WebSocket API event."""
+    return {
+        "requestContext": {"routeKey": route, "connectionId": connection_id, "stage": "live",
+                           "domainName": "bench.execute-api.us-east-2.amazonaws.com"},
+        "queryStringParameters": qs,
+        "body": json.dumps(body) if body is not None else None,
+        "isBase64Encoded": False,
+    }
+
+
+def scenarios(fx, batch):
+    """name -> (handler dir, event factory)."""
+    def rows_of(sid):
+        return fx.db.Table("sensor_data").base.parts[sid][0]
+
+    def sensors_after():
+        sid = fx.live_session()
+        return http("GET", "/sensors", {"session_id": sid, "limit": 50, "after": rows_of(sid)[-5][0]})
+
+    def sensors_window(sid):
+        keys = rows_of(sid)
+        i = fx.rng.randrange(0, max(1, len(keys) - 120))
+        return http("GET", "/sensors", {"session_id": sid, "since": keys[i][0],
+                                        "until": keys[min(i + 120, len(keys) - 1)][0]})
+
+    def live_fanout():
+        fx.churn()
+        return {"Records": fx.ingest(batch)}
+
+    def scheduled_close():
+        fx.reopen()
+        return {"source": "aws.events", "detail-type": "Scheduled Event"}
+
+    return {
+        "FetchSensorsPy/latest": ("FetchSensorsPy", lambda: http(
+            "GET", "/sensors", {"session_id": fx.live_session(), "limit": 50})),
+        "FetchSensorsPy/after": ("FetchSensorsPy", sensors_after),
+        "FetchSensorsPy/series": ("FetchSensorsPy", lambda: http(
+            "GET", "/sensors", {"session_id": fx.live_session(), "max_points": 300})),
+        "FetchSensorsPy/window": ("FetchSensorsPy", lambda: sensors_window(fx.live_session())),
+        "FetchSensorsPy/archived": ("FetchSensorsPy", lambda: http(
+            "GET", "/sensors", {"session_id": fx.ended_session(), "max_points": 300})),
+        "SessionsLatest": ("SessionsLatest", lambda: http("GET", "/sessions/latest")),
+        "DashboardBootstrap": ("DashboardBootstrap", lambda: http("GET", "/bootstrap")),
+        "SessionsList": ("SessionsList", lambda: http("GET", "/sessions", {"limit": 50})),
+        "SessionsList/status": ("SessionsList", lambda: http(
+            "GET", "/sessions", {"limit": 50, "status": "active"})),
+        "SessionsUpdate": ("SessionsUpdate", lambda: http(
+            "POST", "/sessions/update", body={"session_id": fx.any_session(), "target_pit_temp_f": 250})),
+        "SessionUpdate": ("SessionUpdate", lambda: http(
+            "POST", "/sessions/update", body={"session_id": fx.any_session(), "target_pit_temp_f": 250})),
+        "ManageProbeAssignmentsPy/get": ("ManageProbeAssignmentsPy", lambda: http(
+            "GET", "/assignments", {"session_id": fx.any_session()})),
+        "ManageProbeAssignmentsPy/post": ("ManageProbeAssignmentsPy", lambda: http(
+            "POST", "/assignments", body={"sessionId": fx.live_session(), "probeId": "probe1_temp",
+                                          "itemType": "brisket", "itemWeight": "14"})),
+        "ManageProbeAssignments": ("ManageProbeAssignments", lambda: http(
+            "POST", "/assignments", body={"sessionId": fx.live_session(), "probeId": "probe2_temp",
+                                          "itemType": "pork_shoulder", "itemWeight": "8"})),
+        "ItemTypesPy": ("ItemTypesPy", lambda: http("GET", "/itemTypes")),
+        "ListItemTypesPy": ("ListItemTypesPy", lambda: http("GET", "/meatTypes")),
+        "SmokehouseAIAdvisor": ("SmokehouseAIAdvisor", lambda: http(
+            "POST", "/advisor", body={"session_id": fx.live_session(), "probe_id": "probe1_temp"})),
+        "SmokehouseAIAdvisor/batch": ("SmokehouseAIAdvisor", lambda: http(
+            "POST", "/advisor", body={"session_id": fx.live_session(), "probe_ids": None})),
+        "SensorIngest": ("SensorIngest", lambda: {"Records": fx.publish(batch)}),
+        "SessionsUpsert": ("SessionsUpsert", lambda: {"Records": fx.ingest(batch)}),
+        "SessionsUpserter": ("SessionsUpserter", lambda: {"Records": fx.ingest(batch)}),
+        "SensorRollups": ("SensorRollups", lambda: {"Records": fx.ingest(batch)}),
+        "SmokehouseSensorAlerts": ("SmokehouseSensorAlerts", lambda: {"Records": fx.ingest(batch)}),
+        "LiveFanout": ("LiveFanout", live_fanout),
+        "LiveConnections/connect": ("LiveConnections", lambda: ws(
+            "$connect", fx.connections.connect(), qs={"session_id": fx.live_session()})),
+        "LiveConnections/subscribe": ("LiveConnections", lambda: ws(
+            "subscribe", fx.rng.choice(fx.connections.open_connections()),
+            body={"action": "subscribe", "session_id": fx.live_session()})),
+        "SmokehouseUpdateSession": ("SmokehouseUpdateSession", scheduled_close),
+        "Smokehouse_WakeUp": ("Smokehouse_WakeUp", lambda: {"source": "bench"}),
+        "Smokehouse_Shutdown": ("Smokehouse_Shutdown", lambda: {"source": "bench"}),
+    }
+
+
+# ---------- harness ----------
+def load_handler(name):
+    path = os.path.join(LAMBDAS, name, "lambda_function.py")
+    spec = importlib.util.spec_from_file_location(f"bench_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return getattr(module, "lambda_handler", None) or module.handler
+
+
+def context(name):
+    return types.SimpleNamespace(
+        function_name=name,
+        invoked_function_arn=f"arn:aws:lambda:us-east-2:000000000000:function:{name}",
+        aws_request_id="bench",
+        get_remaining_time_in_millis=lambda: 30000,
+    )
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[k]
+
+
+def failed(result):
+    status = result.get("statusCode", 200) if isinstance(result, dict) else 200
+    return isinstance(status, int) and status >= 500
+
+
+def run(db, fx, names, iterations, warmup, batch, quiet):
+    handlers, results = {}, {}
+    for name, (directory, make_event) in scenarios(fx, batch).items():
+        if names and name not in names and directory not in names:
+            continue
+        if directory not in handlers:
+            handlers[directory] = load_handler(directory)
+        handler, ctx = handlers[directory], context(directory)
+        times, rcu, wcu, errors = [], 0.0, 0.0, 0
+        stdout = sys.stdout
+        for i in range(warmup + iterations):
+            event = make_event()
+            db.consumed(reset=True)
+            if quiet:
+                sys.stdout = io.StringIO()   # handlers print per call
+            t0 = time.perf_counter()
+            try:
+                result = handler(event, ctx)
+                ok = not failed(result)
+            except Exception as e:
+                ok = False
+                result = e
+            finally:
+                elapsed = time.perf_counter() - t0
+                sys.stdout = stdout
+            used = db.consumed(reset=True)
+            if i < warmup:
+                continue
+            times.append(elapsed * 1000)
+            rcu += sum(t["rcu"] for t in used.values())
+            wcu += sum(t["wcu"] for t in used.values())
+            if not ok:
+                errors += 1
+                if errors == 1:
+                    print(f"{name}: first failure: {str(result)[:300]}", file=sys.stderr)
+        times.sort()
+        results[name] = {
+            "calls": iterations,
+            "errors": errors,
+            "p50_ms": round(percentile(times, 50), 3),
+            "p95_ms": round(percentile(times, 95), 3),
+            "p99_ms": round(percentile(times, 99), 3),
+            "rcu": round(rcu / iterations, 2),
+            "wcu": round(wcu / iterations, 2),
+        }
+    return results
+
+
+def report(results, baseline=None, tolerance=0.2):
+    cols = ("calls", "errors", "p50_ms", "p95_ms", "p99_ms", "rcu", "wcu")
+    width = max(len(n) for n in results) + 2
+    print("".ljust(width) + "".join(c.rjust(10) for c in cols))
+    regressions = []
+    for name, r in results.items():
+        line = name.ljust(width) + "".join(str(r[c]).rjust(10) for c in cols)
+        base = (baseline or {}).get(name)
+        if base:
+            notes = []
+            for c in ("p95_ms", "rcu", "wcu"):
+                old, new = base.get(c) or 0, r[c]
+                if new > old * (1 + tolerance) and new - old > (0.05 if c == "p95_ms" else 0.5):
+                    notes.append(f"{c} {old}->{new}")
+            if notes:
+                regressions.append(name)
+                line += "   REGRESSION: " + ", ".join(notes)
+        print(line)
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sessions", type=int, default=1000)
+    ap.add_argument("--rows", type=int, default=720, help="readings per session (1/min)")
+    ap.add_argument("--live", type=int, default=3, help="sessions still cooking")
+    ap.add_argument("--iterations", type=int, default=200)
+    ap.add_argument("--warmup", type=int, default=5, help="untimed calls per scenario (cold start)")
+    ap.add_argument("--batch", type=int, default=25, help="records per stream event")
+    ap.add_argument("--model-latency-ms", type=float, default=0)
+    ap.add_argument("--viewers", type=int, default=20, help="open dashboards per live session")
+    ap.add_argument("--ws-latency-ms", type=float, default=0, help="per post_to_connection delay")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--only", nargs="*", help="scenario or handler names")
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--baseline", help="compare with a previous --json run")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed growth vs baseline")
+    ap.add_argument("--verbose", action="store_true", help="keep handler output")
+    args = ap.parse_args()
+
+    db = FakeDynamoDB.from_infra(os.path.join(ROOT, "infra", "ddb", "tables"))
+    for table in EXTRA_TABLES:
+        db.create_table(**table)
+    connections = LocalConnections(args.ws_latency_ms)
+    install(db, args.model_latency_ms / 1000, connections)
+
+    t0 = time.perf_counter()
+    fx = Fixture(db, args.sessions, args.rows, min(args.live, args.sessions), args.seed)
+    fx.add_viewers(connections, args.viewers)
+    print(f"Loaded {args.sessions} sessions x {args.rows} rows in {time.perf_counter() - t0:.1f}s",
+          file=sys.stderr)
+
+    results = run(db, fx, set(args.only or ()), args.iterations, args.warmup, args.batch,
+                  quiet=not args.verbose)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = report(results, baseline, args.tolerance)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if regressions:
+        sys.exit(f"{len(regressions)} scenario(s) regressed beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+SELECT
+  session_id,
+  timestamp,
+  ts_epoch,
+  floor(timestamp() / 1000) AS received_at,
+  outside_temp,
+  bottom_temp,
+  middle_temp,
+  top_temp,
+  probe1_temp,
+  probe2_temp,
+  probe3_temp,
+  humidity,
+  smoke_ppm
+FROM 'smokehouse/sensordata'
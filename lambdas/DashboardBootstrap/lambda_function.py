@@ -0,0 +1,133 @@
+import os, json, time, base64
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Key
+
+from smokehouse_common import (response, preflight, method, query_params, TTLCache, get_client,
+                               get_table, instrumented)
+from smokehouse_common import catalogue
+from smokehouse_common.timestamps import row_epoch
+
+SESSIONS_TABLE = os.environ.get("SESSIONS_TABLE", "sessions")
+SESSIONS_GSI   = os.environ.get("SESSIONS_GSI", "by_kind_session")
+SENSORS_TABLE  = os.environ.get("SENSORS_TABLE", "sensor_data")
+SENSORS_GSI    = os.environ.get("SENSORS_GSI", "by_session_timestamp")
+ASSIGN_TABLE   = os.environ.get("ASSIGN_TABLE", "probe_assignments")
+ITEM_TYPES_TABLE = os.environ.get("ITEM_TYPES_TABLE", "meat_types")
+SESSION_KIND   = "session"
+
+METHODS = "OPTIONS,GET"
+# Sessions page fields (SessionsList) plus what SessionsLatest reports for the newest one
+PROJECTION = "session_id, #s, started_at, last_seen, seen_count, target_pit_temp_f"
+
+# Reads run on a pool that lives with the warm container; get_table() gives each
+# worker thread its own resource, built once per thread rather than per request.
+_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="boot")
+# The SSM session gap changes rarely (the item catalogue has its own cache)
+_reference = TTLCache(maxsize=4, ttl=300)
+
+def _encode_cursor(last_key):
+    # Same opaque cursor as SessionsList, so "load more" continues from this page
+    raw = json.dumps(last_key, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _sessions_page(limit):
+    resp = get_table(SESSIONS_TABLE).query(
+        IndexName=SESSIONS_GSI,
+        KeyConditionExpression=Key("kind").eq(SESSION_KIND),
+        ProjectionExpression=PROJECTION,
+        ExpressionAttributeNames={"#s": "status"},
+        ScanIndexForward=False,  # newest-first
+        Limit=limit,
+    )
+    last_key = resp.get("LastEvaluatedKey")
+    return resp.get("Items", []), _encode_cursor(last_key) if last_key else None
+
+def _sensors(session_id, limit):
+    resp = get_table(SENSORS_TABLE).query(
+        IndexName=SENSORS_GSI,
+        KeyConditionExpression=Key("session_id").eq(session_id),
+        ScanIndexForward=False,
+        Limit=limit,
+    )
+    return resp.get("Items", [])
+
+def _assignments(session_id):
+    resp = get_table(ASSIGN_TABLE).query(KeyConditionExpression=Key("session_id").eq(session_id))
+    return resp.get("Items", [])
+
+def _gap_minutes():
+    try:
+        p = get_client("ssm").get_parameter(Name="/smokehouse/session_gap_mins", WithDecryption=False)
+        return int(p["Parameter"]["Value"])
+    except Exception:
+        return 30
+
+def _cached(key, loader):
+    """(value, None) on a cache hit, else (None, future loading it on the pool).
+
+    TTLCache isn't thread-safe, so it's only touched here and in _resolve, on the
+    handler's thread.
+    """
+    value = _reference.get(key)
+    return (value, None) if value is not None else (None, _pool.submit(loader))
+
+def _resolve(key, cached):
+    value, future = cached
+    if future is not None:
+        value = future.result()
+        _reference.put(key, value)
+    return value
+
+def _latest(session, rows, gap_secs):
+    """Same body as GET /sessions/latest, from rows already read."""
+    session_id = str(session["session_id"])
+    last_row = rows[0] if rows else None
+    last_epoch = row_epoch(session_id, last_row) if last_row else None
+    age_secs = None if last_epoch is None else max(0, int(time.time()) - last_epoch)
+    return {
+        "session_id": session_id,
+        "started_at": session.get("started_at"),
+        "status": "active" if (age_secs is not None and age_secs <= gap_secs) else "stale",
+        "last_sample_ts": last_row.get("timestamp") if last_row else None,
+        "age_secs": age_secs,
+        "gap_secs": gap_secs,
+        "target_pit_temp_f": session.get("target_pit_temp_f"),
+    }
+
+@instrumented
+def lambda_handler(event, context):
+    if method(event) == "OPTIONS":
+        return preflight(METHODS)
+
+    qs = query_params(event)
+    try:
+        sensor_limit = max(1, min(int(qs.get("limit") or 100), 1000))
+        sessions_limit = max(1, min(int(qs.get("sessions_limit") or 50), 100))
+    except (ValueError, TypeError):
+        return response(400, {"error": "invalid limit/sessions_limit"}, methods=METHODS)
+
+    # The newest session heads the sessions page, so one query resolves both; the
+    # catalogue and gap don't depend on it and load alongside.
+    page_f  = _pool.submit(_sessions_page, sessions_limit)
+    types_f = _pool.submit(catalogue.get, ITEM_TYPES_TABLE)
+    gap     = _cached("gap_minutes", _gap_minutes)
+
+    sessions, next_cursor = page_f.result()
+    latest, rows, assignments = None, [], []
+    if sessions:
+        sid = str(sessions[0]["session_id"])
+        rows_f = _pool.submit(_sensors, sid, sensor_limit)
+        assignments_f = _pool.submit(_assignments, sid)
+        rows, assignments = rows_f.result(), assignments_f.result()
+        latest = _latest(sessions[0], rows, _resolve("gap_minutes", gap) * 60)
+
+    for s in sessions:  # page items carry the SessionsList fields only
+        s.pop("target_pit_temp_f", None)
+
+    return response(200, {
+        "latest": latest,
+        "sessions": {"items": sessions, "next_cursor": next_cursor},
+        "sensors": rows,
+        "assignments": assignments,
+        "item_types": types_f.result().items,  # as GET /itemTypes
+    }, methods=METHODS)
@@ -1,36 +1,342 @@
-import os, json, boto3
+import os, re
 from boto3.dynamodb.conditions import Key
-from decimal import Decimal
 
-DDB = boto3.resource("dynamodb")
-TABLE = DDB.Table(os.environ.get("SENSORS_TABLE", "sensor_data"))
-GSI   = os.environ.get("SENSORS_GSI", "by_session_timestamp")
+from smokehouse_common import (response, query_params, etag, etag_matches, not_modified, TTLCache,
+                               get_table, instrumented)
+from smokehouse_common import archive
+from smokehouse_common.rollups import RESOLUTIONS, METRICS, choose_resolution, series_key
+from smokehouse_common.timestamps import (to_epoch, to_compact, row_epoch, column_epochs,
+                                          session_start_epoch)
 
-def _to_native(x):
-    if isinstance(x, Decimal):
-        return int(x) if x % 1 == 0 else float(x)
-    if isinstance(x, list):
-        return [_to_native(v) for v in x]
-    if isinstance(x, dict):
-        return {k:_to_native(v) for k,v in x.items()}
-    return x
+TABLE   = os.environ.get("SENSORS_TABLE", "sensor_data")
+GSI     = os.environ.get("SENSORS_GSI", "by_session_timestamp")
+ROLLUPS = os.environ.get("ROLLUPS_TABLE", "sensor_rollups")
+ARCHIVE = os.environ.get("ARCHIVE_TABLE", "sensor_archive")
+MAX_ROWS = int(os.environ.get("SENSORS_MAX_ROWS", "20000"))  # safety cap for windowed reads
+MAX_POINTS = int(os.environ.get("SENSORS_MAX_POINTS", "5000"))  # largest downsample a client may ask for
+ARCHIVE_MISS_SECS = 60   # how long a session without an archive is remembered as such
+ARCHIVE_HIT_SECS  = 900  # how long a decoded archive is kept before it is re-read
 
+SENTINEL = -999
+
+# Decoded archives stay cached in the warm container for ARCHIVE_HIT_SECS; sessions
+# without one are re-checked after ARCHIVE_MISS_SECS. A session that resumes after
+# being closed has raw rows newer than its archive, which is then ignored.
+_archives = TTLCache(maxsize=8, ttl=ARCHIVE_HIT_SECS)
+SERIES_FIELDS = (
+    "top_temp", "middle_temp", "bottom_temp", "outside_temp",
+    "probe1_temp", "probe2_temp", "probe3_temp",
+    "humidity", "smoke_ppm", "pit_avg",
+)
+
+_COMPACT = re.compile(r"^\d{8}T\d{6}Z$")   # firmware: 20260424T124032Z
+_HHMMSS  = re.compile(r"^\d{6}$")          # legacy firmware: 124032
+
+def _window_bound(value):
+    """since/until -> a string comparable with the `timestamp` sort key.
+
+    Sort-key formats pass through unchanged (use HHMMSS for legacy sessions);
+    epoch seconds and ISO-8601 UTC are converted to the compact firmware format.
+    """
+    s = str(value).strip()
+    if _COMPACT.match(s) or _HHMMSS.match(s):
+        return s
+    epoch = to_epoch(s)
+    if epoch is None:
+        raise ValueError(f"bad time bound: {value!r}")
+    return to_compact(epoch)
+
+def _key_condition(session_id, since, until, after=None):
+    cond = Key("session_id").eq(session_id)
+    if after:
+        # Delta polling: strictly newer than the client's newest row
+        return cond & Key("timestamp").gt(after)
+    if since and until:
+        return cond & Key("timestamp").between(since, until)
+    if since:
+        return cond & Key("timestamp").gte(since)
+    if until:
+        return cond & Key("timestamp").lte(until)
+    return cond
+
+def _query_all(key_cond, forward):
+    """Follow LastEvaluatedKey until the key range is exhausted (or MAX_ROWS)."""
+    kwargs = {
+        "IndexName": GSI,
+        "KeyConditionExpression": key_cond,
+        "ScanIndexForward": forward,
+    }
+    items = []
+    while len(items) < MAX_ROWS:
+        kwargs["Limit"] = MAX_ROWS - len(items)
+        resp = get_table(TABLE).query(**kwargs)
+        items.extend(resp.get("Items", []))
+        if "LastEvaluatedKey" not in resp:
+            break
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+    return items
+
+def _newest_timestamp(session_id):
+    """Sort key of the newest row (keys-only, Limit=1): the session's change marker."""
+    resp = get_table(TABLE).query(
+        IndexName=GSI,
+        KeyConditionExpression=Key("session_id").eq(session_id),
+        ProjectionExpression="#ts",
+        ExpressionAttributeNames={"#ts": "timestamp"},
+        ScanIndexForward=False,
+        Limit=1,
+    )
+    items = resp.get("Items", [])
+    return items[0].get("timestamp") if items else None
+
+def _x_seconds(session_id, rows):
+    """Monotonic seconds for each (chronological) row, used as the LTTB x-axis."""
+    xs, prev = [], None
+    for i, x in enumerate(column_epochs(session_id, rows)):
+        if x is None:
+            x = prev + 60 if prev is not None else i * 60
+        xs.append(x)
+        prev = x
+    return xs
+
+def _lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets: keep `threshold` points that preserve shape.
+
+    `points` are (x, y, ...) tuples sorted by x; extra fields ride along.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return points
+    out = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # average of the next bucket is the third triangle vertex
+        start = int((i + 1) * every) + 1
+        end = min(int((i + 2) * every) + 1, n)
+        span = end - start
+        avg_x = sum(p[0] for p in points[start:end]) / span
+        avg_y = sum(p[1] for p in points[start:end]) / span
+
+        ax, ay = points[a][0], points[a][1]
+        best, best_area = None, -1.0
+        for j in range(int(i * every) + 1, start):
+            px, py = points[j][0], points[j][1]
+            area = abs((ax - avg_x) * (py - ay) - (ax - px) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        out.append(points[best])
+        a = best
+    out.append(points[-1])
+    return out
+
+def _downsample(session_id, rows, max_points):
+    """Chronological rows -> {field: {"t": [...], "v": [...]}} with <= max_points each."""
+    xs = _x_seconds(session_id, rows)
+    series = {}
+    for field in SERIES_FIELDS:
+        pts = []
+        for x, r in zip(xs, rows):
+            v = r.get(field)
+            if v is None or v == SENTINEL:
+                continue
+            pts.append((x, float(v), r.get("timestamp")))
+        if not pts:
+            continue
+        kept = _lttb(pts, max_points)
+        series[field] = {
+            "t": [p[2] for p in kept],
+            "v": [round(p[1], 2) for p in kept],
+        }
+    return series
+
+def _epoch_bound(value):
+    """since/until for rollup mode -> epoch seconds (epoch, ISO-8601 UTC or compact)."""
+    epoch = to_epoch(_window_bound(value))
+    if epoch is None:
+        raise ValueError(f"bad time bound: {value!r}")
+    return epoch
+
+def _rollup_series(session_id, since, until, newest, max_points):
+    """Read the finest rollup resolution that fits the window into max_points buckets.
+
+    Returns (resolution, series, newest last_ts folded into any bucket read).
+    """
+    start = since if since is not None else session_start_epoch(session_id)
+    if until is not None:
+        end = until
+    else:
+        end = row_epoch(session_id, {"timestamp": newest}) if newest else None
+    if start is None or end is None:
+        return None, {}, None
+    res = choose_resolution(max(end - start, 0), max_points)
+
+    first = start - start % RESOLUTIONS[res]   # the bucket containing `start`
+    cond = Key("series_key").eq(series_key(session_id, res)) & Key("bucket").between(first, end)
+    kwargs = {"KeyConditionExpression": cond}
+    buckets = []
+    while True:
+        resp = get_table(ROLLUPS).query(**kwargs)
+        buckets.extend(resp.get("Items", []))
+        if "LastEvaluatedKey" not in resp:
+            break
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+    series = {}
+    for b in buckets:
+        for m in METRICS:
+            n = b.get(f"{m}_n")
+            if not n:
+                continue
+            out = series.setdefault(m, {"t": [], "min": [], "max": [], "avg": []})
+            out["t"].append(b["bucket"])
+            out["min"].append(b[f"{m}_min"])
+            out["max"].append(b[f"{m}_max"])
+            out["avg"].append(round(float(b[f"{m}_sum"]) / int(n), 2))
+    last_ts = max((int(b.get("last_ts", -1)) for b in buckets), default=None)
+    return res, series, last_ts
+
+def _load_archive(session_id):
+    """Decoded rows from sensor_archive (chronological), or None if not archived."""
+    kwargs = {"KeyConditionExpression": Key("session_id").eq(session_id)}
+    items = []
+    while True:
+        resp = get_table(ARCHIVE).query(**kwargs)
+        items.extend(resp.get("Items", []))
+        if "LastEvaluatedKey" not in resp:
+            break
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+    if not items or int(items[0].get("parts", 0)) != len(items):
+        return None  # not archived, or still being written
+    return archive.unpack(b"".join(bytes(getattr(i["blob"], "value", i["blob"])) for i in items))
+
+def _archived_rows(session_id):
+    hit = _archives.get(session_id)
+    if hit is None:
+        try:
+            hit = _load_archive(session_id) or False
+        except Exception as e:
+            print(f"archive read failed for {session_id}: {e}")
+            hit = False
+        _archives.put(session_id, hit, ttl=ARCHIVE_HIT_SECS if hit else ARCHIVE_MISS_SECS)
+    return hit or None
+
+def _from_archive(session_id, rows, limit, since, until, after, max_points):
+    """The rows modes below, answered from an archived session's decoded rows."""
+    if after:
+        return list(reversed([r for r in rows if r["timestamp"] > after][:limit]))
+    window = [r for r in rows
+              if (not since or r["timestamp"] >= since) and (not until or r["timestamp"] <= until)]
+    if max_points:
+        return {
+            "session_id": session_id,
+            "since": since,
+            "until": until,
+            "rows": len(window),
+            "max_points": max_points,
+            "series": _downsample(session_id, window, max_points),
+        }
+    if since or until:
+        return list(reversed(window[-MAX_ROWS:]))
+    return list(reversed(rows[max(len(rows) - limit, 0):]))
+
+@instrumented
 def lambda_handler(event, context):
     # API Gateway HTTP API event: queryStringParameters
-    qs = (event or {}).get("queryStringParameters") or {}
+    qs = query_params(event)
     session_id = (qs.get("session_id") or "").strip()
-    limit = int(qs.get("limit") or 100)
     if not session_id:
-        return {"statusCode": 400, "headers":{"Content-Type":"application/json"},
-                "body": json.dumps({"error":"missing session_id"})}
+        return response(400, {"error":"missing session_id"})
+    try:
+        limit = int(qs.get("limit") or 100)
+        since = _window_bound(qs["since"]) if qs.get("since") else None
+        until = _window_bound(qs["until"]) if qs.get("until") else None
+        after = _window_bound(qs["after"]) if qs.get("after") else None
+        max_points = int(qs["max_points"]) if qs.get("max_points") else None
+        if max_points is not None and not 3 <= max_points <= MAX_POINTS:
+            raise ValueError("max_points out of range")  # LTTB keeps both ends: 3 is the least that shrinks
+        rollup = qs.get("rollup") in ("1", "true")
+        if rollup:
+            since = _epoch_bound(qs["since"]) if qs.get("since") else None
+            until = _epoch_bound(qs["until"]) if qs.get("until") else None
+    except (ValueError, TypeError):
+        return response(400, {"error":"invalid limit/since/until/after/max_points"})
+
+    # The archive answers only while it holds the newest row: rows that resumed after
+    # the session was closed (and reactivated by the upserters) make it stale.
+    archived = _archived_rows(session_id)
+    newest = _newest_timestamp(session_id)
+    if archived and newest is not None and archived[-1]["timestamp"] != newest:
+        _archives.put(session_id, False, ttl=ARCHIVE_MISS_SECS)  # re-checked like a miss
+        archived = None
+    elif archived and newest is None:
+        newest = archived[-1]["timestamp"]
+
+    if rollup:
+        # Pre-aggregated buckets: a long cook is a few dozen items, not every raw row.
+        # SensorRollups lags the raw rows, so the tag follows what the buckets hold.
+        res, series, last_ts = _rollup_series(session_id, since, until, newest, max_points or 300)
+        tag = etag(session_id, "rollup", res, last_ts, since, until, max_points)
+        headers = {"ETag": tag, "Cache-Control": "no-cache"}
+        if etag_matches(event, tag):
+            return not_modified(tag, headers=headers)
+        return response(200, {
+            "session_id": session_id,
+            "resolution": res,
+            "since": since,
+            "until": until,
+            "series": series,
+        }, headers=headers)
+
+    # Rows are append-only, so the newest sort key plus the request shape fully
+    # determines the body: an unchanged session answers 304 without reading rows.
+    tag = etag(session_id, newest, limit, since, until, after, max_points)
+    headers = {"ETag": tag, "Cache-Control": "no-cache"}
+    if etag_matches(event, tag):
+        return not_modified(tag, headers=headers)
+
+    if archived:
+        # Ended session: one small archive read instead of paginating raw rows
+        body = _from_archive(session_id, archived, limit, since, until, after, max_points)
+        return response(200, body, headers=headers)
+
+    key_cond = _key_condition(session_id, since, until, after)
+
+    if after:
+        if newest is None or str(newest) <= after:
+            return response(200, [], headers=headers)
+        # Oldest-first so a capped delta stays contiguous with the client's data;
+        # returned newest-first like every other rows mode.
+        resp = get_table(TABLE).query(
+            IndexName=GSI,
+            KeyConditionExpression=key_cond,
+            ScanIndexForward=True,
+            Limit=limit,
+        )
+        return response(200, list(reversed(resp.get("Items", []))), headers=headers)
+
+    if max_points:
+        # Downsampled mode: whole window, oldest-first, reduced per series
+        rows = _query_all(key_cond, forward=True)
+        return response(200, {
+            "session_id": session_id,
+            "since": since,
+            "until": until,
+            "rows": len(rows),
+            "max_points": max_points,
+            "series": _downsample(session_id, rows, max_points),
+        }, headers=headers)
+
+    if since or until:
+        # Raw rows for a time window, newest-first like the default mode
+        return response(200, _query_all(key_cond, forward=False), headers=headers)
 
     # Query newest-first by session + timestamp
-    resp = TABLE.query(
+    resp = get_table(TABLE).query(
         IndexName=GSI,
-        KeyConditionExpression=Key("session_id").eq(session_id),
+        KeyConditionExpression=key_cond,
         ScanIndexForward=False,
         Limit=limit
     )
-    items = _to_native(resp.get("Items", []))
-    return {"statusCode": 200, "headers":{"Content-Type":"application/json"},
-            "body": json.dumps(items)}
+    # Items go straight to the encoder; Decimals are converted while serializing
+    return response(200, resp.get("Items", []), headers=headers)
@@ -1,41 +1,25 @@
-import os, json, boto3
-from decimal import Decimal
+import os
 
-ddb = boto3.resource('dynamodb')
-TABLE = os.environ.get('ITEM_TYPES_TABLE', 'meat_types')
-table = ddb.Table(TABLE)
+from smokehouse_common import response, etag, etag_matches, not_modified, instrumented
+from smokehouse_common import catalogue
 
-def _to_native(x):
-    if isinstance(x, Decimal):
-        return int(x) if x % 1 == 0 else float(x)
-    if isinstance(x, list):
-        return [_to_native(v) for v in x]
-    if isinstance(x, dict):
-        return {k: _to_native(v) for k, v in x.items()}
-    return x
+TABLE = os.environ.get('ITEM_TYPES_TABLE', 'meat_types')
 
-def _resp(status, body):
-    return {
-        "statusCode": status,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET,OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type"
-        },
-        "body": json.dumps(body)
-    }
+METHODS = "GET,OPTIONS"
+CACHE_CONTROL = "public, max-age=300"
 
+@instrumented
 def lambda_handler(event, context):
     try:
-        # Basic scan (small reference table)
-        res = table.scan()
-        items = _to_native(res.get("Items", []))
-        # Normalize field name for UI: prefer 'name'
-        for it in items:
-            if "name" not in it:
-                if "item_type" in it: it["name"] = it["item_type"]
-            # keep original fields too; UI uses 'name'
-        return _resp(200, items)
+        # Reference table, cached per container and revalidated by version (see catalogue)
+        cat = catalogue.get(TABLE)
     except Exception as e:
-        return _resp(500, {"error": str(e), "table": TABLE})
+        return response(500, {"error": str(e), "table": TABLE}, methods=METHODS)
+
+    # Content hash: a client holding the current list gets a 304 straight from memory
+    tag = etag("itemTypes", cat.digest)
+    headers = {"ETag": tag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(event, tag):
+        return not_modified(tag, methods=METHODS, headers=headers)
+    # Items keep their original fields; 'name' is filled from 'item_type' where missing
+    return response(200, cat.items, methods=METHODS, headers=headers)
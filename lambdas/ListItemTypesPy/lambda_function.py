@@ -1,40 +1,29 @@
-import os, json, boto3
-from decimal import Decimal
+import os
 
-DDB   = boto3.resource('dynamodb')
-TABLE = os.environ.get('ITEM_TYPES_TABLE', 'meat_types')
-table = DDB.Table(TABLE)
+from smokehouse_common import (response, preflight, method, etag, etag_matches, not_modified,
+                               instrumented)
+from smokehouse_common import catalogue
 
-CORS = {
-    "Access-Control-Allow-Origin":  "*",
-    "Access-Control-Allow-Headers": "content-type",
-    "Access-Control-Allow-Methods": "GET,OPTIONS",
-}
+TABLE = os.environ.get('ITEM_TYPES_TABLE', 'meat_types')
 
-def _to_native(x):
-    if isinstance(x, Decimal):
-        return int(x) if x % 1 == 0 else float(x)
-    if isinstance(x, list):
-        return [_to_native(v) for v in x]
-    if isinstance(x, dict):
-        return {k: _to_native(v) for k, v in x.items()}
-    return x
+METHODS = "GET,OPTIONS"
+CACHE_CONTROL = "public, max-age=300"
 
+@instrumented
 def lambda_handler(event, context):
-    method = (event.get("requestContext", {}).get("http", {}).get("method") or
-              event.get("httpMethod", "GET")).upper()
-    if method == "OPTIONS":
-        return {"statusCode": 204, "headers": CORS}
-
-    resp  = table.scan()
-    raw   = _to_native(resp.get("Items", []))
+    if method(event) == "OPTIONS":
+        return preflight(METHODS)
 
-    # Sort alphabetically by name for consistent dropdown ordering
-    raw.sort(key=lambda x: x.get("name", ""))
+    # Cached per container, revalidated by version, already sorted by name
+    cat = catalogue.get(TABLE)
+    tag = etag("meatTypes", cat.digest)
+    headers = {"ETag": tag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(event, tag):
+        return not_modified(tag, methods=METHODS, headers=headers)
 
     # Normalise field names so the frontend always gets the same shape
     items = []
-    for r in raw:
+    for r in cat.items:
         items.append({
             "name":                  r.get("name", ""),
             "description":           r.get("description", ""),
@@ -43,8 +32,4 @@ def lambda_handler(event, context):
             "max_safe_temp_f":       r.get("max_safe_temp_f"),           # None for hot smoke
         })
 
-    return {
-        "statusCode": 200,
-        "headers":    {**CORS, "Content-Type": "application/json"},
-        "body":       json.dumps(items),
-    }
+    return response(200, items, methods=METHODS, headers=headers)
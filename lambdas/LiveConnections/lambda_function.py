@@ -0,0 +1,77 @@
+import json
+import os
+import time
+
+from boto3.dynamodb.conditions import Key
+
+from smokehouse_common import get_table, instrumented
+
+TABLE_NAME = os.environ.get("LIVE_CONNECTIONS_TABLE", "live_connections")
+BY_CONNECTION = os.environ.get("LIVE_CONNECTIONS_GSI", "by_connection")
+TTL_SECS = 3 * 3600  # API Gateway closes WebSockets after 2 h; TTL sweeps missed $disconnects
+
+def _ok(body=None):
+    return {"statusCode": 200, "body": json.dumps(body or {"ok": True})}
+
+def _bad(message):
+    return {"statusCode": 400, "body": json.dumps({"ok": False, "error": message})}
+
+def _subscriptions(connection_id):
+    """Sessions this connection is registered for (normally zero or one)."""
+    resp = get_table(TABLE_NAME).query(
+        IndexName=BY_CONNECTION,
+        KeyConditionExpression=Key("connection_id").eq(connection_id),
+    )
+    return [item["session_id"] for item in resp.get("Items", [])]
+
+def _unsubscribe(connection_id, keep=None):
+    for sid in _subscriptions(connection_id):
+        if sid != keep:
+            get_table(TABLE_NAME).delete_item(Key={"session_id": sid, "connection_id": connection_id})
+
+def _subscribe(connection_id, session_id):
+    # One session per tab: switching sessions moves the registration
+    _unsubscribe(connection_id, keep=session_id)
+    now = int(time.time())
+    get_table(TABLE_NAME).put_item(Item={
+        "session_id": session_id,
+        "connection_id": connection_id,
+        "connected_at": now,
+        "ttl": now + TTL_SECS,
+    })
+
+@instrumented
+def lambda_handler(event, context):
+    # API Gateway WebSocket API: $connect / $disconnect / subscribe / unsubscribe
+    ctx = event.get("requestContext") or {}
+    route = ctx.get("routeKey")
+    connection_id = ctx.get("connectionId")
+    if not connection_id:
+        return _bad("missing connectionId")
+
+    if route == "$connect":
+        # wss://...?session_id=... subscribes in the handshake, saving a round trip
+        session_id = ((event.get("queryStringParameters") or {}).get("session_id") or "").strip()
+        if session_id:
+            _subscribe(connection_id, session_id)
+        return _ok()
+
+    if route == "$disconnect":
+        _unsubscribe(connection_id)
+        return _ok()
+
+    try:
+        body = json.loads(event.get("body") or "{}")
+    except ValueError:
+        return _bad("invalid JSON")
+    action = body.get("action") or route
+    if action == "subscribe":
+        session_id = str(body.get("session_id") or "").strip()
+        if not session_id:
+            return _bad("missing session_id")
+        _subscribe(connection_id, session_id)
+        return _ok({"ok": True, "session_id": session_id})
+    if action == "unsubscribe":
+        _unsubscribe(connection_id)
+        return _ok()
+    return _bad(f"unknown action {action!r}")
@@ -0,0 +1,64 @@
+import os
+
+from boto3.dynamodb.conditions import Key
+
+from smokehouse_common import dumps, new_images, get_client, get_table, instrumented
+from smokehouse_common.fanout import deliver, frames
+
+TABLE_NAME = os.environ.get("LIVE_CONNECTIONS_TABLE", "live_connections")
+# https://{api-id}.execute-api.{region}.amazonaws.com/{stage} of the WebSocket API
+ENDPOINT = os.environ.get("LIVE_ENDPOINT", "")
+WORKERS = int(os.environ.get("LIVE_WORKERS", "16"))
+
+def _connections(session_id):
+    """Connection ids subscribed to session_id."""
+    ids, kwargs = [], {
+        "KeyConditionExpression": Key("session_id").eq(session_id),
+        "ProjectionExpression": "connection_id",
+    }
+    while True:
+        resp = get_table(TABLE_NAME).query(**kwargs)
+        ids.extend(item["connection_id"] for item in resp.get("Items", []))
+        if "LastEvaluatedKey" not in resp:
+            return ids
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+def _prune(gone):
+    """Drop registrations of connections API Gateway reported as gone."""
+    if not gone:
+        return
+    with get_table(TABLE_NAME).batch_writer() as batch:
+        for session_id, connection_id in gone:
+            batch.delete_item(Key={"session_id": session_id, "connection_id": connection_id})
+
+@instrumented
+def lambda_handler(event, context):
+    # New readings only: MODIFY/REMOVE of old rows are not news to a live chart
+    by_session = {}
+    for row in new_images(event, events=("INSERT",)):
+        sid = str(row.get("session_id") or "")
+        if sid:
+            by_session.setdefault(sid, []).append(row)
+    if not by_session or not ENDPOINT:
+        return {"ok": True, "sent": 0}
+
+    # Same shape as GET /sensors: rows newest-first, merged client-side like a delta poll
+    messages, owner = [], {}
+    for sid, rows in by_session.items():
+        conns = _connections(sid)
+        if not conns:
+            continue
+        rows.sort(key=lambda r: str(r.get("timestamp") or ""), reverse=True)
+        payloads = frames(rows, lambda chunk: dumps({"type": "rows", "session_id": sid, "rows": chunk}))
+        for cid in conns:
+            owner[cid] = sid
+            messages.extend((cid, data) for data in payloads)
+    if not messages:
+        return {"ok": True, "sent": 0}
+
+    result = deliver(get_client("apigatewaymanagementapi", endpoint_url=ENDPOINT), messages, WORKERS)
+    gone = {(owner[cid], cid) for cid in result["gone"]}
+    _prune(gone)
+    print(f"Pushed {len(result['sent'])} message(s) for {len(by_session)} session(s); "
+          f"{len(gone)} gone, {len(result['failed'])} failed")
+    return {"ok": True, "sent": len(result["sent"]), "gone": len(gone), "failed": len(result["failed"])}
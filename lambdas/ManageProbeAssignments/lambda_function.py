@@ -1,7 +1,7 @@
 import json, os, base64
-import boto3
 
-DDB = boto3.resource("dynamodb")
+from smokehouse_common import get_table, instrumented
+
 TABLE_NAME = os.environ.get("ASSIGNMENTS_TABLE", "probe_assignments")
 
 def _cors():
@@ -43,6 +43,7 @@ def _parse_event(event):
     except Exception:
         return {}
 
+@instrumented
 def lambda_handler(event, context):
     payload = _parse_event(event)
 
@@ -69,7 +70,7 @@ def lambda_handler(event, context):
     # Optional: persist to DynamoDB if table exists
     saved, err = False, None
     try:
-        table = DDB.Table(TABLE_NAME)
+        table = get_table(TABLE_NAME)
         # Normalize numeric fields if provided (ignore blanks)
         def _num(v):
             if v in (None, "", "null"): return None
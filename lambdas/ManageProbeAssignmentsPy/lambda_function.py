@@ -1,57 +1,38 @@
 import json
 import os
-import boto3
-from decimal import Decimal
 from boto3.dynamodb.conditions import Key
 
-DDB = boto3.resource("dynamodb")
+from smokehouse_common import response, preflight, method, query_params, get_table, instrumented
+
 TABLE_NAME = os.environ.get("ASSIGN_TABLE", "probe_assignments")
-TABLE = DDB.Table(TABLE_NAME)
 
-def _to_native(x):
-    if isinstance(x, Decimal):
-        return int(x) if x % 1 == 0 else float(x)
-    if isinstance(x, list):
-        return [_to_native(v) for v in x]
-    if isinstance(x, dict):
-        return {k: _to_native(v) for k, v in x.items()}
-    return x
+METHODS = "GET,POST,OPTIONS"
 
 def _response(status, body=None):
-    return {
-        "statusCode": status,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type",
-        },
-        "body": json.dumps(body or {}),
-    }
+    return response(status, body or {}, methods=METHODS)
 
+@instrumented
 def lambda_handler(event, context):
-    method = (event.get("requestContext", {}).get("http", {}).get("method")
-              or event.get("httpMethod") or "GET").upper()
+    http_method = method(event)
 
-    if method == "OPTIONS":
-        return _response(204, {})  # CORS preflight
+    if http_method == "OPTIONS":
+        return preflight(METHODS)  # CORS preflight
 
-    if method == "GET":
+    if http_method == "GET":
         # Expect query param: session_id
-        qs = event.get("queryStringParameters") or {}
+        qs = query_params(event)
         session_id = qs.get("session_id") or qs.get("sessionId")
         if not session_id:
             return _response(400, {"ok": False, "error": "session_id is required"})
         try:
-            resp = TABLE.query(
+            resp = get_table(TABLE_NAME).query(
                 KeyConditionExpression=Key("session_id").eq(session_id)
             )
-            items = _to_native(resp.get("Items", []))
-            return _response(200, {"ok": True, "items": items})
+            return _response(200, {"ok": True, "items": resp.get("Items", [])})
         except Exception as e:
             return _response(500, {"ok": False, "error": str(e)})
 
-    if method == "POST":
+    if http_method == "POST":
         try:
             body_raw = event.get("body") or "{}"
             data = json.loads(body_raw)
@@ -82,10 +63,10 @@ def lambda_handler(event, context):
         }
 
         try:
-            TABLE.put_item(Item=item)
-            return _response(200, {"ok": True, "saved": True, "item": _to_native(item)})
+            get_table(TABLE_NAME).put_item(Item=item)
+            return _response(200, {"ok": True, "saved": True, "item": item})
         except Exception as e:
             return _response(500, {"ok": False, "saved": False, "error": str(e)})
 
     # Fallback
-    return _response(405, {"ok": False, "error": f"Method {method} not allowed"})
+    return _response(405, {"ok": False, "error": f"Method {http_method} not allowed"})
@@ -0,0 +1,82 @@
+import os, json
+
+from smokehouse_common import get_table, instrumented
+from smokehouse_common.readings import InvalidReading, normalize
+
+TABLE_NAME = os.environ.get("SENSORS_TABLE", "sensor_data")
+
+def _payloads(body):
+    """Readings in a message body: a list, {"readings": [...]} or one object."""
+    if isinstance(body, list):
+        for p in body:
+            yield from _payloads(p)
+    elif isinstance(body, dict) and isinstance(body.get("readings"), list):
+        yield from _payloads(body["readings"])
+    else:
+        yield body
+
+def _messages(event):
+    """(message_id, payload) for each reading; message_id is None outside an SQS batch."""
+    if not (isinstance(event, dict) and "Records" in event):
+        for p in _payloads(event):
+            yield None, p
+        return
+    for record in event["Records"]:
+        body = record.get("body")
+        try:
+            body = json.loads(body or "null")
+        except ValueError:
+            pass  # normalize() rejects it
+        for p in _payloads(body):
+            yield record.get("messageId"), p
+
+def _write(items):
+    """Batch-write items; on failure retry one by one. Returns the keys not stored."""
+    try:
+        with get_table(TABLE_NAME).batch_writer() as batch:
+            for item in items.values():
+                batch.put_item(Item=item)
+        return set()
+    except Exception as e:
+        print(f"Batch write failed ({type(e).__name__}: {e}); writing items one by one")
+    failed = set()
+    for key, item in items.items():
+        try:
+            get_table(TABLE_NAME).put_item(Item=item)
+        except Exception as e:
+            print(f"Write failed for {key}: {type(e).__name__}: {e}")
+            failed.add(key)
+    return failed
+
+@instrumented
+def lambda_handler(event, context):
+    items, owners, failed, rejected = {}, {}, set(), 0
+    for message_id, payload in _messages(event):
+        try:
+            item = normalize(payload)
+        except InvalidReading as e:
+            # Bad frames are dropped, not retried: the same bytes would fail again
+            print(f"Rejected reading: {e}")
+            rejected += 1
+            continue
+        except Exception as e:
+            # Unexpected: retry the message alone; SQS moves it to the DLQ if it keeps failing
+            print(f"Could not normalize reading: {type(e).__name__}: {e}")
+            failed.add(message_id)
+            continue
+        key = (item["session_id"], item["timestamp"])
+        items[key] = item  # last duplicate wins
+        owners.setdefault(key, set()).add(message_id)
+
+    # Keyed by (session_id, timestamp) and derived only from the payload, so a
+    # redelivered message rewrites identical items.
+    unstored = _write(items) if items else set()
+    for key in unstored:
+        failed |= owners[key]
+    written = len(items) - len(unstored)
+    print(f"Wrote {written} reading(s), rejected {rejected}, {len(failed)} message(s) to retry")
+    if None in failed:
+        raise RuntimeError("readings could not be stored")  # direct invoke: let Lambda retry it
+    # SQS trigger with ReportBatchItemFailures: only these messages are redelivered
+    return {"ok": True, "written": written, "rejected": rejected,
+            "batchItemFailures": [{"itemIdentifier": m} for m in sorted(failed)]}
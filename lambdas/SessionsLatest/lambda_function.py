@@ -1,23 +1,16 @@
-import os, json, time, boto3
-from decimal import Decimal
+import os, time
 from boto3.dynamodb.conditions import Key, Attr
 
-dynamodb = boto3.resource('dynamodb')
-ssm = boto3.client('ssm')
+from smokehouse_common import response, get_client, get_table, instrumented
+from smokehouse_common.timestamps import row_epoch
 
 SESSIONS_TABLE = os.environ.get('SESSIONS_TABLE', 'sessions')
 SENSORS_TABLE  = os.environ.get('SENSORS_TABLE', 'sensor_data')
-t_sessions = dynamodb.Table(SESSIONS_TABLE)
-t_sensors  = dynamodb.Table(SENSORS_TABLE)
-
-def to_native(obj):
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    if isinstance(obj, list):
-        return [to_native(v) for v in obj]
-    if isinstance(obj, dict):
-        return {k: to_native(v) for k, v in obj.items()}
-    return obj
+# Time-ordered GSI maintained by the stream upserters: every session item carries
+# kind='session', and session_id (YYYYMMDDHHMMSS) sorts chronologically.
+SESSIONS_GSI   = os.environ.get('SESSIONS_GSI', 'by_kind_session')
+SESSION_KIND   = 'session'
+LATEST_PROJECTION = 'session_id, started_at, created_at, #s, target_pit_temp_f'
 
 def pick_latest(items):
     def to_int(v):
@@ -25,88 +18,87 @@ def pick_latest(items):
         except Exception: return 0
     return sorted(items, key=lambda x: (to_int(x.get('started_at')), to_int(x.get('created_at'))), reverse=True)[0] if items else None
 
-def get_gap_minutes():
+def get_latest_session():
+    # One key-range read on the time-ordered index, independent of table size
     try:
-        p = ssm.get_parameter(Name="/smokehouse/session_gap_mins", WithDecryption=False)
-        return int(p['Parameter']['Value'])
+        resp = get_table(SESSIONS_TABLE).query(
+            IndexName=SESSIONS_GSI,
+            KeyConditionExpression=Key('kind').eq(SESSION_KIND),
+            ProjectionExpression=LATEST_PROJECTION,
+            ExpressionAttributeNames={'#s': 'status'},
+            ScanIndexForward=False,
+            Limit=1,
+        )
+        items = resp.get('Items', [])
+        if items:
+            return items[0]
     except Exception:
-        return 30
+        pass
+    # Fallback while the index is missing/backfilling: full paginated scan
+    items, kwargs = [], {
+        'ProjectionExpression': LATEST_PROJECTION,
+        'ExpressionAttributeNames': {'#s': 'status'},
+    }
+    while True:
+        resp = get_table(SESSIONS_TABLE).scan(**kwargs)
+        items.extend(resp.get('Items', []))
+        if 'LastEvaluatedKey' not in resp:
+            break
+        kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+    return pick_latest(items)
 
-def parse_ts_to_epoch(ts):
-    if ts is None:
-        return None
+def get_gap_minutes():
     try:
-        if isinstance(ts, (int, float, Decimal)):
-            return int(ts)
-        from datetime import datetime, timezone
-        s = str(ts)
-        # Firmware format: "20260424T124032Z"
-        if len(s) == 16 and 'T' in s and s.endswith('Z'):
-            dt = datetime.strptime(s, "%Y%m%dT%H%M%SZ")
-            return int(dt.replace(tzinfo=timezone.utc).timestamp())
-        # ISO 8601: "2026-04-24T12:40:32Z"
-        if 'T' in s and '-' in s:
-            dt = datetime.strptime(s[:19], "%Y-%m-%dT%H:%M:%S")
-            return int(dt.replace(tzinfo=timezone.utc).timestamp())
-        # HHMMSS same-day heuristic
-        if len(s) == 6 and s.isdigit():
-            h, m, sec = int(s[0:2]), int(s[2:4]), int(s[4:6])
-            now = time.localtime()
-            return int(time.mktime((now.tm_year, now.tm_mon, now.tm_mday, h, m, sec, 0, 0, -1)))
-        return int(s)  # plain epoch string
+        p = get_client('ssm').get_parameter(Name="/smokehouse/session_gap_mins", WithDecryption=False)
+        return int(p['Parameter']['Value'])
     except Exception:
-        return None
+        return 30
 
-def get_last_sensor_ts(session_id):
+def get_last_sensor_row(session_id):
     # Try a Query assuming SK 'timestamp'; if not present, fallback to Scan
     try:
-        resp = t_sensors.query(
+        resp = get_table(SENSORS_TABLE).query(
             KeyConditionExpression=Key('session_id').eq(session_id),
-            ProjectionExpression='#ts',
+            ProjectionExpression='#ts, ts_epoch',
             ExpressionAttributeNames={'#ts': 'timestamp'},
             ScanIndexForward=False,
             Limit=1
         )
         items = resp.get('Items', [])
         if items:
-            return items[0].get('timestamp')
+            return items[0]
     except Exception:
         pass
     # Fallback: Scan (slower)
     try:
-        resp = t_sensors.scan(
+        resp = get_table(SENSORS_TABLE).scan(
             FilterExpression=Attr('session_id').eq(session_id),
-            ProjectionExpression='timestamp'
+            ProjectionExpression='#ts, ts_epoch',
+            ExpressionAttributeNames={'#ts': 'timestamp'},
         )
         items = [i for i in resp.get('Items', []) if 'timestamp' in i]
         items.sort(key=lambda x: str(x['timestamp']), reverse=True)
-        return items[0]['timestamp'] if items else None
+        return items[0] if items else None
     except Exception:
         return None
 
-def response(status_code, body):
-    return {'statusCode': status_code, 'headers': {'Content-Type':'application/json'}, 'body': json.dumps(body)}
-
+@instrumented
 def lambda_handler(event, context):
-    # Latest session (scan for now; we’ll index later)
-    resp = t_sessions.scan(
-        ProjectionExpression='session_id, started_at, created_at, #s, target_pit_temp_f',
-        ExpressionAttributeNames={'#s': 'status'}
-    )
-    latest = pick_latest(resp.get('Items', []))
+    latest = get_latest_session()
     if not latest:
         return response(404, {'error':'no sessions'})
 
     session_id = str(latest.get('session_id'))
 
-    last_ts    = get_last_sensor_ts(session_id)
-    last_epoch = parse_ts_to_epoch(last_ts)
+    last_row   = get_last_sensor_row(session_id)
+    last_ts    = last_row.get('timestamp') if last_row else None
+    last_epoch = row_epoch(session_id, last_row) if last_row else None
     now        = int(time.time())
     age_secs   = None if last_epoch is None else max(0, now - last_epoch)
     gap_secs   = get_gap_minutes() * 60
     status     = 'active' if (age_secs is not None and age_secs <= gap_secs) else 'stale'
 
-    body = to_native({
+    body = {
         'session_id': session_id,
         'started_at': latest.get('started_at'),
         'status': status,
@@ -114,5 +106,5 @@ def lambda_handler(event, context):
         'age_secs': age_secs,
         'gap_secs': gap_secs,
         'target_pit_temp_f': latest.get('target_pit_temp_f'),
-    })
+    }
     return response(200, body)
@@ -1,63 +1,91 @@
-import json, os, boto3
-from boto3.dynamodb.conditions import Attr
-from decimal import Decimal
+import os, re, json, base64
+from boto3.dynamodb.conditions import Key, Attr
+
+from smokehouse_common import response, preflight, method, query_params, get_table, instrumented
 
-DDB = boto3.resource("dynamodb")
 TABLE_NAME = os.environ.get("SESSIONS_TABLE", "sessions")
+# Time-ordered GSI (hash kind='session', range session_id YYYYMMDDHHMMSS)
+SESSIONS_GSI = os.environ.get("SESSIONS_GSI", "by_kind_session")
+SESSION_KIND = "session"
 
-def _cors():
-    return {
-        "Access-Control-Allow-Origin": "*",
-        "Access-Control-Allow-Headers": "content-type",
-        "Access-Control-Allow-Methods": "OPTIONS,GET",
-    }
+METHODS = "OPTIONS,GET"
+PROJECTION = "session_id, #s, started_at, last_seen, seen_count"
+
+def _encode_cursor(last_key):
+    raw = json.dumps(last_key, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
 
-def _to_native(obj):
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    if isinstance(obj, list):
-        return [_to_native(v) for v in obj]
-    if isinstance(obj, dict):
-        return {k: _to_native(v) for k, v in obj.items()}
-    return obj
+def _decode_cursor(cursor):
+    """Opaque cursor -> ExclusiveStartKey; raises ValueError if it was tampered with."""
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    key = json.loads(raw)
+    if not isinstance(key, dict) or set(key) != {"kind", "session_id"}:
+        raise ValueError("bad cursor")
+    return key
 
+def _session_id_bound(value, fill):
+    """'2026-04-24', '20260424' or an ISO datetime -> 14-digit session_id bound."""
+    digits = re.sub(r"\D", "", str(value))[:14]
+    if len(digits) < 8:
+        raise ValueError(f"bad date: {value!r}")
+    return digits.ljust(14, fill)
+
+@instrumented
 def lambda_handler(event, context):
     # CORS preflight
-    method = (event.get("requestContext", {}).get("http", {}).get("method") or
-              event.get("httpMethod", "GET")).upper()
-    if method == "OPTIONS":
-        return {"statusCode": 204, "headers": _cors()}
+    if method(event) == "OPTIONS":
+        return preflight(METHODS)
 
-    qs = event.get("queryStringParameters") or {}
+    qs = query_params(event)
     try:
         limit = min(int(qs.get("limit", 50)), 100)
     except (ValueError, TypeError):
         limit = 50
+    limit = max(limit, 1)
 
-    table = DDB.Table(TABLE_NAME)
-
-    # Scan and sort descending by session_id (YYYYMMDDHHMMSS sorts lexicographically)
-    resp = table.scan(
-        ProjectionExpression="session_id, #s, started_at, last_seen, seen_count",
-        ExpressionAttributeNames={"#s": "status"},
-    )
-    items = resp.get("Items", [])
-
-    # Handle pagination if table is large
-    while "LastEvaluatedKey" in resp and len(items) < limit:
-        resp = table.scan(
-            ProjectionExpression="session_id, #s, started_at, last_seen, seen_count",
-            ExpressionAttributeNames={"#s": "status"},
-            ExclusiveStartKey=resp["LastEvaluatedKey"],
-        )
-        items.extend(resp.get("Items", []))
-
-    # Sort newest-first by session_id string (format YYYYMMDDHHMMSS)
-    items.sort(key=lambda x: str(x.get("session_id", "")), reverse=True)
-    items = items[:limit]
+    # Optional filters: status (active/ended/...) and a since/until date range
+    try:
+        key_cond = Key("kind").eq(SESSION_KIND)
+        since, until = qs.get("since"), qs.get("until")
+        if since and until:
+            key_cond &= Key("session_id").between(_session_id_bound(since, "0"),
+                                                 _session_id_bound(until, "9"))
+        elif since:
+            key_cond &= Key("session_id").gte(_session_id_bound(since, "0"))
+        elif until:
+            key_cond &= Key("session_id").lte(_session_id_bound(until, "9"))
+        start_key = _decode_cursor(qs["cursor"]) if qs.get("cursor") else None
+    except (ValueError, TypeError):
+        return response(400, {"error": "invalid since/until/cursor"}, methods=METHODS)
 
-    return {
-        "statusCode": 200,
-        "headers": _cors(),
-        "body": json.dumps(_to_native(items)),
+    query = {
+        "IndexName": SESSIONS_GSI,
+        "KeyConditionExpression": key_cond,
+        "ProjectionExpression": PROJECTION,
+        "ExpressionAttributeNames": {"#s": "status"},
+        "ScanIndexForward": False,  # newest-first
     }
+    if qs.get("status"):
+        query["FilterExpression"] = Attr("status").eq(qs["status"])
+
+    table = get_table(TABLE_NAME)
+    items, last_key = [], None
+
+    # Read one page; a status filter can leave a page short, so keep going until
+    # `limit` matches. Limit is never above what's still needed, so the cursor
+    # always points exactly past the last returned session.
+    while True:
+        if start_key:
+            query["ExclusiveStartKey"] = start_key
+        query["Limit"] = limit - len(items)
+        resp = table.query(**query)
+        items.extend(resp.get("Items", []))
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key or len(items) >= limit:
+            break
+        start_key = last_key
+
+    return response(200, {
+        "items": items,
+        "next_cursor": _encode_cursor(last_key) if last_key else None,
+    }, methods=METHODS)
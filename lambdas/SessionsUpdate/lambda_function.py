@@ -1,10 +1,10 @@
-import boto3
 import json
 import os
 from decimal import Decimal
 
-ddb = boto3.resource('dynamodb')
-TABLE = ddb.Table(os.environ.get('SESSIONS_TABLE', 'sessions'))
+from smokehouse_common import get_table, instrumented
+
+TABLE_NAME = os.environ.get('SESSIONS_TABLE', 'sessions')
 
 UPDATABLE_FIELDS = {'target_pit_temp_f'}
 
@@ -20,6 +20,7 @@ def _response(status, body):
         'body': json.dumps(body),
     }
 
+@instrumented
 def lambda_handler(event, context):
     method = (
         event.get('requestContext', {}).get('http', {}).get('method')
@@ -55,7 +56,7 @@ def lambda_handler(event, context):
     vals = {f':{k}': v for k, v in updates.items()}
 
     try:
-        TABLE.update_item(
+        get_table(TABLE_NAME).update_item(
             Key={'session_id': session_id},
             UpdateExpression=expr,
             ExpressionAttributeNames=names,
@@ -1,58 +1,57 @@
 import os, time, json, logging
-import boto3
-from boto3.dynamodb.types import TypeDeserializer
+
+from smokehouse_common import new_images, get_table, instrumented
+from smokehouse_common.timestamps import session_start_epoch
 
 log = logging.getLogger()
 log.setLevel(logging.INFO)
 
-ddb = boto3.resource("dynamodb")
-table = ddb.Table(os.environ.get("SESSIONS_TABLE", "sessions"))
-
-deser = TypeDeserializer()
-
-def _from_ddb_image(img):
-    return {k: deser.deserialize(v) for k, v in img.items()}
-
-def _as_epoch_from_session(session_id: str) -> int:
-    # Expect YYYYMMDDHHMMSS -> epoch; fallback to now
-    try:
-        if session_id and len(session_id) >= 14:
-            import datetime
-            dt = datetime.datetime.strptime(session_id[:14], "%Y%m%d%H%M%S")
-            return int(dt.replace(tzinfo=datetime.timezone.utc).timestamp())
-    except Exception:
-        pass
-    return int(time.time())
+TABLE_NAME = os.environ.get("SESSIONS_TABLE", "sessions")
+SESSION_KIND = "session"  # hash key of the sessions time-ordered GSI
+ACTIVE_KEY = "active"     # hash key of the sparse active-sessions GSI (by_active)
 
+@instrumented
 def handler(event, context):
     # Handle INSERT/MODIFY with NEW_IMAGE
-    for rec in event.get("Records", []):
-        if rec.get("eventName") not in ("INSERT", "MODIFY"):
-            continue
-        new_img = rec.get("dynamodb", {}).get("NewImage")
-        if not new_img:
-            continue
-        item = _from_ddb_image(new_img)
+    for item in new_images(event):
         sess = str(item.get("session_id") or "")
         if not sess:
             continue
 
         # Derive start candidate from session_id; record heartbeat
-        start_candidate = _as_epoch_from_session(sess)
         now = int(time.time())
-
-        # Upsert: set started_at if missing; always bump last_seen_at/status
-        table.update_item(
-            Key={"session_id": sess},
-            UpdateExpression="SET started_at = if_not_exists(started_at, :s), "
-                             "last_seen_at = :now, #st = :active",
-            ExpressionAttributeValues={
-                ":s": start_candidate,
-                ":now": now,
-                ":active": "active"
-            },
-            ExpressionAttributeNames={
-                "#st": "status"
-            }
-        )
+        start_candidate = session_start_epoch(sess) or now
+
+        # Upsert: set started_at if missing; always bump last_seen_at. kind puts the
+        # session on the time-ordered GSI read by SessionsLatest; status active with
+        # active_key on the sparse by_active GSI read by SmokehouseUpdateSession, unless
+        # the session was already ended (same rule as SessionsUpserter).
+        try:
+            get_table(TABLE_NAME).update_item(
+                Key={"session_id": sess},
+                UpdateExpression="SET started_at = if_not_exists(started_at, :s), "
+                                 "last_seen_at = :now, #st = :active, kind = :kind, active_key = :ak",
+                ConditionExpression="attribute_not_exists(#st) OR #st <> :ended",
+                ExpressionAttributeValues={
+                    ":s": start_candidate,
+                    ":now": now,
+                    ":active": "active",
+                    ":ended": "ended",
+                    ":kind": SESSION_KIND,
+                    ":ak": ACTIVE_KEY,
+                },
+                ExpressionAttributeNames={
+                    "#st": "status"
+                }
+            )
+        except Exception as e:
+            if getattr(e, "response", {}).get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                raise
+            # ended: record the heartbeat but leave it off by_active
+            get_table(TABLE_NAME).update_item(
+                Key={"session_id": sess},
+                UpdateExpression="SET started_at = if_not_exists(started_at, :s), "
+                                 "last_seen_at = :now, kind = :kind",
+                ExpressionAttributeValues={":s": start_candidate, ":now": now, ":kind": SESSION_KIND},
+            )
     return {"ok": True}
@@ -1,38 +1,96 @@
-import os, json, boto3, time
+import os, json, time
 from decimal import Decimal
 
-DDB = boto3.resource("dynamodb")
-SESS = DDB.Table("sessions")
+from smokehouse_common import new_images, get_table, instrumented
+
+SESSIONS_TABLE = "sessions"
 MERGE_GAP_SECS = int(os.getenv("SESSION_MERGE_SECS", "1800"))  # 30min default
+SESSION_KIND = "session"  # hash key of the sessions time-ordered GSI (by_kind_session)
+ACTIVE_KEY = "active"     # hash key of the sparse active-sessions GSI (by_active)
 
 def _to_s(v):  # ensure strings
-    if isinstance(v, (int, float, Decimal)): return str(v)
+    if isinstance(v, Decimal): return str(int(v)) if v % 1 == 0 else str(v)
     return str(v)
 
 def _now_iso():
     return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
 
-def lambda_handler(event, context):
-    for rec in event.get("Records", []):
-        if rec.get("eventName") not in ("INSERT","MODIFY"): 
-            continue
-        img = rec["dynamodb"].get("NewImage", {})
-        session_id = img.get("session_id", {}).get("S") or _to_s(img.get("session_id", {}).get("N", ""))
-        ts = img.get("timestamp", {}).get("S") or _to_s(img.get("timestamp", {}).get("N", ""))
-        if not session_id: 
+def _coalesce(event):
+    """Stream batch -> {session_id: {"n": rows, "first": min ts, "last": max ts}}."""
+    now = _now_iso()
+    per_session = {}
+    for img in new_images(event):
+        session_id = _to_s(img.get("session_id") or "")
+        if not session_id:
             continue
+        ts = _to_s(img.get("timestamp") or "") or now
+        agg = per_session.get(session_id)
+        if agg is None:
+            per_session[session_id] = {"n": 1, "first": ts, "last": ts}
+        else:
+            agg["n"] += 1
+            agg["first"] = min(agg["first"], ts)
+            agg["last"] = max(agg["last"], ts)
+    return per_session
+
+def _update_if(session_id, **kwargs):
+    """update_item that treats a failed condition as "leave it as it is"."""
+    try:
+        get_table(SESSIONS_TABLE).update_item(Key={"session_id": session_id}, **kwargs)
+        return True
+    except Exception as e:
+        if getattr(e, "response", {}).get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            return False
+        raise
 
-        now = _now_iso()
-        # Upsert session: if first time, set start_time = now; always bump last_seen
-        SESS.update_item(
-            Key={"session_id": session_id},
-            UpdateExpression="SET last_seen=:ls ADD seen_count :one",
-            ExpressionAttributeValues={":ls": ts or now, ":one": 1}
-        )
-        # Initialize start_time once (no overwrite)
-        SESS.update_item(
-            Key={"session_id": session_id},
-            UpdateExpression="SET start_time = if_not_exists(start_time, :st), status = if_not_exists(status, :stts)",
-            ExpressionAttributeValues={":st": ts or now, ":stts": "active"}
-        )
-    return {"ok": True}
+def _upsert(session_id, agg):
+    """One write in the usual case, guarded so the item never moves backwards.
+
+    last_seen only advances (a late or replayed batch can't rewind it), and a session
+    SmokehouseUpdateSession has ended is never put back on by_active. When either guard
+    fails, the parts are written separately so the rest of the batch still counts.
+    """
+    names = {"#s": "status"}
+    values = {":ls": agg["last"], ":kind": SESSION_KIND, ":ak": ACTIVE_KEY, ":st": agg["first"],
+              ":active": "active", ":ended": "ended", ":n": agg["n"]}
+    if _update_if(
+        session_id,
+        UpdateExpression="SET last_seen=:ls, kind=:kind, active_key=:ak, #s=:active, "
+                         "start_time=if_not_exists(start_time, :st) "
+                         "ADD seen_count :n",
+        ConditionExpression="(attribute_not_exists(#s) OR #s <> :ended) "
+                            "AND (attribute_not_exists(last_seen) OR last_seen <= :ls)",
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values,
+    ):
+        return
+    get_table(SESSIONS_TABLE).update_item(
+        Key={"session_id": session_id},
+        UpdateExpression="SET kind=:kind, start_time=if_not_exists(start_time, :st) ADD seen_count :n",
+        ExpressionAttributeValues={":kind": SESSION_KIND, ":st": agg["first"], ":n": agg["n"]},
+    )
+    _update_if(
+        session_id,
+        UpdateExpression="SET last_seen=:ls",
+        ConditionExpression="attribute_not_exists(last_seen) OR last_seen < :ls",
+        ExpressionAttributeValues={":ls": agg["last"]},
+    )
+    _update_if(
+        session_id,
+        UpdateExpression="SET active_key=:ak, #s=:active",
+        ConditionExpression="attribute_not_exists(#s) OR #s <> :ended",
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues={":ak": ACTIVE_KEY, ":active": "active", ":ended": "ended"},
+    )
+
+@instrumented
+def lambda_handler(event, context):
+    # One write per session per batch instead of two per record: bump seen_count by
+    # the batch's row count, move last_seen forward to the newest timestamp, and
+    # initialise start_time the first time the session is seen. active_key (with
+    # status active) puts the session on the sparse by_active index until
+    # SmokehouseUpdateSession closes it; an ended session stays ended.
+    per_session = _coalesce(event)
+    for session_id, agg in per_session.items():
+        _upsert(session_id, agg)
+    return {"ok": True, "sessions": len(per_session)}
@@ -1,13 +1,18 @@
 import os
 import json
-import base64
 import time
-from datetime import datetime, timedelta
-from decimal import Decimal
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 
-import boto3
 from boto3.dynamodb.conditions import Key
 
+from smokehouse_common import (to_native, to_ddb, parse_event, method, preflight, response,
+                               get_client, get_table, instrumented)
+from smokehouse_common import catalogue
+from smokehouse_common.timestamps import column_elapsed
+from smokehouse_common.analytics import (NAN, column, pit_column, optional, nan_sum, slope,
+                                         stalled, hold_start, tail)
+
 # ---------- Config ----------
 REGION               = os.getenv("AWS_REGION", "us-east-2")
 BEDROCK_MODEL        = os.getenv("BEDROCK_MODEL", "us.anthropic.claude-3-5-haiku-20241022-v1:0")
@@ -15,124 +20,73 @@ PROBE_TABLE          = os.getenv("PROBE_ASSIGNMENT_TABLE", "probe_assignments")
 SENSOR_TABLE         = os.getenv("SENSOR_DATA_TABLE", "sensor_data")
 SESSIONS_TABLE       = os.getenv("SESSIONS_TABLE", "sessions")
 ANALYTICS_TABLE      = os.getenv("ANALYTICS_TABLE", "session_analytics")
-ADVICE_CACHE_MINUTES = int(os.getenv("ADVICE_CACHE_MINUTES", "15"))
-WARMUP_FETCH         = 30   # oldest rows fetched (warmup curve)
-RECENT_FETCH         = 100  # newest rows fetched (current trajectory + metrics)
+ADVICE_CACHE_MINUTES = int(os.getenv("ADVICE_CACHE_MINUTES", "60"))  # max age of advice for an unchanged state
+ADVICE_MIN_MINUTES   = int(os.getenv("ADVICE_MIN_MINUTES", "10"))    # temperature drift can't refresh sooner
+ADVICE_TEMP_STEP     = 5    # advice is redone once drift since it exceeds: probe temp °F,
+ADVICE_PIT_STEP      = 10   # pit temp °F,
+ADVICE_RATE_STEP     = 5    # rate of rise °F/hr
+ADVICE_APPROACH_F    = 15   # within this of the item's target the probe is "approaching"
+REFRESH_LOCK_SECS    = 120  # one background advice revalidation per probe at a time
+ANALYTICS_MAX_ROWS   = int(os.getenv("ANALYTICS_MAX_ROWS", "5000"))  # rows folded per call
 MILESTONE_POINTS     = 12   # evenly-spaced points sent to model
+PROBE_IDS            = ("probe1_temp", "probe2_temp", "probe3_temp")
+RATE_WINDOW          = 10   # newest readings kept per probe for rate of rise / stall
+WARMUP_HOLD_READINGS = 5    # consecutive readings at target pit temp that end warmup
+ANALYTICS_VERSION    = 2
+DDB_WORKERS          = int(os.getenv("ADVISOR_DDB_WORKERS", "4"))  # concurrent reads per request
 
 # ---------- AWS clients ----------
-_ddb     = boto3.resource("dynamodb", region_name=REGION)
-_bedrock = boto3.client("bedrock-runtime", region_name=REGION)
+# Clients are built on first use, so a cached answer never pays for the Bedrock or
+# Lambda client. Independent DynamoDB reads run on a small pool that lives with the
+# warm container; get_table() gives each worker thread its own resource.
+_pool = ThreadPoolExecutor(max_workers=DDB_WORKERS, thread_name_prefix="ddb")
+
+def _table(name):
+    return get_table(name, REGION)
 
 # ---------- Helpers ----------
-def _to_native(obj):
-    if isinstance(obj, list):    return [_to_native(v) for v in obj]
-    if isinstance(obj, dict):    return {k: _to_native(v) for k, v in obj.items()}
-    if isinstance(obj, Decimal): return float(obj)
-    return obj
-
-def _pit_avg(row):
-    """Average of available pit temps in a sensor row, ignoring -999."""
-    vals = [row.get(k) for k in ("top_temp", "middle_temp", "bottom_temp")]
-    vals = [float(v) for v in vals if v is not None and float(v) != -999]
-    return sum(vals) / len(vals) if vals else None
-
-def _parse_event(event):
-    if isinstance(event, str):      return json.loads(event)
-    if not isinstance(event, dict): return {}
-    body = event.get("body")
-    if body is None:                return event
-    if event.get("isBase64Encoded"):
-        body = base64.b64decode(body).decode("utf-8", "ignore")
-    return json.loads(body) if isinstance(body, str) else body
-
-def _cors():
-    return {
-        "Access-Control-Allow-Origin":  "*",
-        "Access-Control-Allow-Headers": "content-type",
-        "Access-Control-Allow-Methods": "OPTIONS,POST",
-    }
+METHODS = "OPTIONS,POST"
 
 def _resp(status, body_dict):
-    return {"statusCode": status, "headers": _cors(), "body": json.dumps(body_dict)}
-
-# ---------- Timestamp → elapsed minutes ----------
-def _elapsed_minutes(session_id, timestamp):
-    try:
-        s     = str(session_id)
-        start = datetime(int(s[0:4]), int(s[4:6]), int(s[6:8]),
-                         int(s[8:10]), int(s[10:12]), int(s[12:14]))
-        ts = str(timestamp).strip()
-        if len(ts) == 6 and ts.isdigit():
-            reading = start.replace(hour=int(ts[0:2]), minute=int(ts[2:4]), second=int(ts[4:6]))
-            if reading < start:
-                reading += timedelta(days=1)
-        elif "T" in ts:
-            reading = datetime.strptime(ts[:15], "%Y%m%dT%H%M%S")
-        else:
-            return None
-        return max(0, int((reading - start).total_seconds() / 60))
-    except Exception:
-        return None
+    return response(status, body_dict, methods=METHODS)
 
 # ---------- Metrics ----------
-def _compute_rate_of_rise(temps, window=10):
-    """°F per hour over the last `window` readings."""
-    vals = [(i, float(t)) for i, t in enumerate(temps) if t is not None and float(t) != -999]
-    if len(vals) < 2:
-        return None
-    recent = vals[-min(window, len(vals)):]
-    delta_temp     = recent[-1][1] - recent[0][1]
-    delta_readings = recent[-1][0] - recent[0][0]
-    if delta_readings == 0:
+def _compute_rate_of_rise(points):
+    """°F per hour: least-squares slope of [elapsed_min, temp] points."""
+    if len(points) < 2:
         return None
-    return round(delta_temp / delta_readings * 60, 1)  # ~1 min/reading → per hr
+    per_min = slope(array("d", (p[0] for p in points)), array("d", (p[1] for p in points)))
+    return round(per_min * 60, 1) if per_min is not None else None
 
-def _detect_stall(temps, window=10, threshold=2):
+def _detect_stall(points, window=10, threshold=2):
     """True if probe temp changed less than threshold °F over last `window` readings."""
-    vals = [float(t) for t in temps if t is not None and float(t) != -999]
-    if len(vals) < window:
-        return False
-    recent = vals[-window:]
-    return (max(recent) - min(recent)) < threshold
-
-def _compute_warmup(rows, session_id, target_pit_temp_f, hold_readings=5):
-    """Minutes until pit first held target_pit_temp_f for hold_readings consecutive readings."""
-    if not target_pit_temp_f:
-        return None
-    above = []
-    for row in rows:
-        avg     = _pit_avg(row)
-        elapsed = _elapsed_minutes(session_id, row.get("timestamp"))
-        if avg is not None and elapsed is not None:
-            above.append((elapsed, avg >= float(target_pit_temp_f)))
-    for i in range(len(above) - hold_readings):
-        if all(a for _, a in above[i:i + hold_readings]):
-            return above[i][0]
-    return None
+    return stalled(array("d", (p[1] for p in points)), window, threshold)
 
 # ---------- Session analytics cache ----------
 def _get_analytics(session_id, metric):
     try:
-        table  = _ddb.Table(ANALYTICS_TABLE)
+        table  = _table(ANALYTICS_TABLE)
         result = table.get_item(Key={"session_id": session_id, "metric": metric})
-        return _to_native(result.get("Item")) if result.get("Item") else None
+        return to_native(result.get("Item")) if result.get("Item") else None
     except Exception:
         return None
 
-def _put_analytics(session_id, metric, fields):
+def _put_analytics(session_id, metric, fields, condition=None):
     try:
-        table = _ddb.Table(ANALYTICS_TABLE)
+        table = _table(ANALYTICS_TABLE)
         item  = {"session_id": session_id, "metric": metric, "computed_at": int(time.time())}
         item.update(fields)
-        table.put_item(Item=item)
+        kwargs = {"Item": to_ddb(item)}
+        if condition:
+            kwargs.update(condition)
+        table.put_item(**kwargs)
     except Exception:
         pass
 
 # ---------- Fetch target pit temp ----------
 def _get_target_pit_temp(session_id):
     try:
-        table  = _ddb.Table(SESSIONS_TABLE)
+        table  = _table(SESSIONS_TABLE)
         result = table.get_item(
             Key={"session_id": session_id},
             ProjectionExpression="target_pit_temp_f",
@@ -144,26 +98,162 @@ def _get_target_pit_temp(session_id):
         pass
     return None
 
-# ---------- Build evenly-spaced milestones ----------
-def _build_milestones(rows, session_id, probe_id, n=MILESTONE_POINTS):
-    """Pick n evenly-spaced rows and return compact {min, pit, probe} dicts."""
+# ---------- Probe assignment / meat type ----------
+def _get_probe_assignment(session_id, probe_id):
+    result = _table(PROBE_TABLE).query(
+        KeyConditionExpression=Key("session_id").eq(session_id) & Key("probe_id").eq(probe_id)
+    )
+    items = result.get("Items", [])
+    return to_native(items[0]) if items else None
+
+def _get_probe_assignments(session_id):
+    result = _table(PROBE_TABLE).query(KeyConditionExpression=Key("session_id").eq(session_id))
+    return [to_native(i) for i in result.get("Items", [])]
+
+def _get_meat_type(meat_type):
+    """smoke_type / target temps for an item type; None when unknown or unreadable."""
+    try:
+        item = catalogue.get(region_name=REGION).get(meat_type)  # in memory when warm
+        return to_native(item) if item else None
+    except Exception:
+        return None
+
+# ---------- Incremental session analytics ----------
+# The "__session__" analytics item holds running aggregates plus a watermark (the
+# newest timestamp folded in). Each call reads only rows newer than the watermark,
+# so metrics stay exact over the whole cook while per-call reads stay small.
+def _new_state():
+    return {
+        "version":               ANALYTICS_VERSION,
+        "last_ts":               None,
+        "rows":                  0,
+        "outside_temp_at_start": None,
+        "pit_sum":               0.0,
+        "pit_count":             0,
+        "warmup":                {"target": None, "run": 0, "run_start": None, "minutes": None},
+        "probes":                {p: [] for p in PROBE_IDS},  # last RATE_WINDOW [min, temp]
+        "history":               {"stride": 1, "seen": 0, "points": []},
+        "last":                  None,
+    }
+
+def _fold_rows(state, rows, session_id, target_pit_temp_f):
+    """Fold chronological rows into the running aggregates in place.
+
+    The batch is converted to columns once (NaN for missing/-999) and each
+    aggregate is a single pass over them.
+    """
+    warmup = state["warmup"]
+    if warmup["minutes"] is None and warmup["target"] != target_pit_temp_f:
+        # target changed before warmup completed: restart the hold detector
+        warmup.update({"target": target_pit_temp_f, "run": 0, "run_start": None})
     if not rows:
+        return state
+
+    minutes = array("d", (NAN if s is None else s // 60 for s in column_elapsed(session_id, rows)))
+    pit     = pit_column(rows)
+    probes  = {p: column(rows, p) for p in PROBE_IDS}
+
+    if state["outside_temp_at_start"] is None and state["rows"] < 5:
+        for v in column(rows[:5 - state["rows"]], "outside_temp"):
+            if v == v and v:
+                state["outside_temp_at_start"] = v
+                break
+    state["rows"] += len(rows)
+
+    n, total = nan_sum(pit)
+    state["pit_sum"]   += total
+    state["pit_count"] += n
+
+    if warmup["minutes"] is None and warmup["target"]:
+        run, run_start, found = hold_start(
+            minutes, pit, float(warmup["target"]), WARMUP_HOLD_READINGS, warmup["run"], warmup["run_start"])
+        warmup["run"], warmup["run_start"] = run, _minute(run_start) if run_start is not None else None
+        if found is not None:
+            warmup["minutes"] = int(found)
+
+    for p, temps in probes.items():
+        window = state["probes"].setdefault(p, [])
+        window.extend([int(m), t] for m, t in tail(minutes, temps, RATE_WINDOW))
+        del window[:-RATE_WINDOW]
+
+    # Evenly-spaced history for milestones: keep every `stride`-th row and
+    # halve the list (doubling the stride) once it grows past 4x the output size.
+    history = state["history"]
+    for i in range(len(rows)):
+        if history["seen"] % history["stride"] == 0:
+            history["points"].append([_minute(minutes[i]), optional(pit[i], 1),
+                                      {p: optional(c[i], 1) for p, c in probes.items()}])
+            if len(history["points"]) > 4 * MILESTONE_POINTS:
+                history["points"] = history["points"][::2]
+                history["stride"] *= 2
+        history["seen"] += 1
+
+    state["last"] = {
+        "min":    _minute(minutes[-1]),
+        "pit":    optional(pit[-1]),
+        "probes": {p: optional(c[-1]) for p, c in probes.items()},
+    }
+    state["last_ts"] = rows[-1].get("timestamp")
+    return state
+
+def _minute(v):
+    return int(v) if v == v else None
+
+def _fetch_rows_after(session_id, after):
+    """Chronological rows newer than the watermark (all rows on the first call)."""
+    cond = Key("session_id").eq(session_id)
+    if after:
+        cond = cond & Key("timestamp").gt(after)
+    kwargs = {"KeyConditionExpression": cond, "ScanIndexForward": True}
+    rows = []
+    table = _table(SENSOR_TABLE)
+    while len(rows) < ANALYTICS_MAX_ROWS:
+        kwargs["Limit"] = ANALYTICS_MAX_ROWS - len(rows)
+        result = table.query(**kwargs)
+        rows.extend(to_native(i) for i in result.get("Items", []))
+        if "LastEvaluatedKey" not in result:
+            break
+        kwargs["ExclusiveStartKey"] = result["LastEvaluatedKey"]
+    return rows
+
+def _load_session_state(session_id):
+    """Running aggregates for the session; a fresh state if none (or an old shape) is stored."""
+    state = _get_analytics(session_id, "__session__")
+    if not state or state.get("version") != ANALYTICS_VERSION:
+        state = _new_state()
+    return state
+
+def _update_session_analytics(session_id, target_pit_temp_f, state=None):
+    """Fold rows newer than the state's watermark into it, persisting if anything moved."""
+    if state is None:
+        state = _load_session_state(session_id)
+    prev_ts = state.get("last_ts")
+
+    rows = _fetch_rows_after(session_id, prev_ts)
+    if rows or state["warmup"]["target"] != target_pit_temp_f:
+        _fold_rows(state, rows, session_id, target_pit_temp_f)
+        state["avg_pit_temp"]   = round(state["pit_sum"] / state["pit_count"], 1) if state["pit_count"] else None
+        state["warmup_minutes"] = state["warmup"]["minutes"]
+        # Only advance from the watermark we started with; a concurrent call that
+        # already moved it wrote an equal-or-newer state.
+        fields = {k: v for k, v in state.items() if k not in ("session_id", "metric", "computed_at")}
+        if prev_ts:
+            cond = {"ConditionExpression": "last_ts = :prev", "ExpressionAttributeValues": {":prev": prev_ts}}
+        else:
+            cond = {"ConditionExpression": "attribute_not_exists(last_ts) OR #v <> :v",
+                    "ExpressionAttributeNames": {"#v": "version"},
+                    "ExpressionAttributeValues": {":v": ANALYTICS_VERSION}}
+        _put_analytics(session_id, "__session__", fields, condition=cond)
+    return state
+
+def _build_milestones(state, probe_id, n=MILESTONE_POINTS):
+    """Pick n evenly-spaced history points and return compact {min, pit, probe} dicts."""
+    points = state["history"]["points"]
+    if not points:
         return []
-    step     = max(1, len(rows) // n)
-    selected = rows[::step][:n]
-    result   = []
-    for row in selected:
-        elapsed    = _elapsed_minutes(session_id, row.get("timestamp"))
-        pit        = _pit_avg(row)
-        probe_temp = row.get(probe_id)
-        if probe_temp is not None and float(probe_temp) == -999:
-            probe_temp = None
-        result.append({
-            "min":   elapsed,
-            "pit":   round(pit, 1) if pit is not None else None,
-            "probe": round(float(probe_temp), 1) if probe_temp is not None else None,
-        })
-    return result
+    step     = max(1, len(points) // n)
+    selected = points[::step][:n]
+    return [{"min": m, "pit": pit, "probe": probes.get(probe_id)} for m, pit, probes in selected]
 
 # ---------- Prompt ----------
 def _build_prompt(probe_id, meat_type, meat_weight, smoke_type,
@@ -240,15 +330,60 @@ def _build_prompt(probe_id, meat_type, meat_weight, smoke_type,
 
     return system_msg, user_msg
 
+def _build_batch_prompt(session_ctx, probes, pit_milestones):
+    """One prompt for several probes: shared pit/warmup context plus a section per probe.
+
+    `probes` is a list of per-probe dicts (probe_id, item details, current metrics and
+    that probe's milestone series); the model answers with a map keyed by probe_id.
+    """
+    system_msg = (
+        "You are an expert smokehouse coach advising on several items in the same pit at once. "
+        "For hot-smoked items, provide precise, actionable guidance toward the target internal temp. "
+        "For cold-smoked items the goal is NOT to cook the meat: keep product temperature below "
+        "max_safe_temp_f; eta_hours means remaining safe smoke time and doneness_percent is null. "
+        "All temperatures are Fahrenheit. Use warmup time and outside temp to understand how the pit "
+        "performs in current conditions, and milestones to identify trends and stalls. "
+        "Be concise and specific — no generic advice. "
+        "Respond with strict JSON only, no markdown or extra text."
+    )
+    schema = (
+        '{"eta_hours": number|null, "doneness_percent": number|null, "stall_detected": boolean, '
+        '"target_internal_temp_f": number|null, "recommended_pit_temp_f": number|null, '
+        '"rest_time_minutes": number|null, "notes": string}'
+    )
+    user_msg = (
+        f"Session context (shared by all probes):\n{json.dumps(session_ctx)}\n\n"
+        f"Pit milestones ({len(pit_milestones)} evenly-spaced points; min=elapsed minutes, "
+        f"pit=avg pit temp):\n{json.dumps(pit_milestones)}\n\n"
+        f"Probes (milestones are [elapsed minutes, probe temp] at the same points):\n"
+        f"{json.dumps(probes)}\n\n"
+        "Return strict JSON: an object keyed by probe_id, each value shaped as\n"
+        f"{schema}"
+    )
+    return system_msg, user_msg
+
+def _parse_advice(content):
+    """Model text -> dict, tolerating markdown fencing."""
+    text = content.strip()
+    if text.startswith("```"):
+        text = text.split("```")[1]
+        if text.startswith("json"):
+            text = text[4:]
+        text = text.strip()
+    advice = json.loads(text)
+    if not isinstance(advice, dict):
+        advice = {"notes": str(advice)}
+    return advice
+
 # ---------- Bedrock invoke ----------
-def _invoke_bedrock(system_msg, user_msg):
+def _invoke_bedrock(system_msg, user_msg, max_tokens=512):
     body = {
         "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": 512,
+        "max_tokens": max_tokens,
         "system":     system_msg,
         "messages":   [{"role": "user", "content": user_msg}],
     }
-    response = _bedrock.invoke_model(
+    response = get_client("bedrock-runtime", REGION).invoke_model(
         modelId      = BEDROCK_MODEL,
         contentType  = "application/json",
         accept       = "application/json",
@@ -258,133 +393,299 @@ def _invoke_bedrock(system_msg, user_msg):
     content = result["content"][0]["text"]
     return content
 
-# ---------- Handler ----------
-def lambda_handler(event, context):
-    method = (event.get("requestContext", {}).get("http", {}).get("method") or
-              event.get("httpMethod", "POST")).upper()
-    if method == "OPTIONS":
-        return {"statusCode": 204, "headers": _cors()}
+# ---------- Advice cache ----------
+# Cached advice records the inputs it was given. It is reused while the probe stays
+# in the same phase and setup and its temperatures have drifted less than one step
+# from those inputs. Drift is measured from the cached values rather than against
+# fixed bucket edges, so a reading sitting on an edge doesn't flip-flop. Drift is
+# also ignored until the advice is ADVICE_MIN_MINUTES old, and nothing outlives
+# ADVICE_CACHE_MINUTES. A new phase or setup re-asks the model straight away.
+DRIFT = (("probe_t", ADVICE_TEMP_STEP), ("pit_t", ADVICE_PIT_STEP), ("rate", ADVICE_RATE_STEP))
+
+def _phase(item, probe_t, stall_detected):
+    """Milestone of the cook for this probe: cooking, stall, approaching or done."""
+    target = item.get("target_internal_temp_f")
+    if probe_t is not None and target is not None:
+        if probe_t >= float(target):
+            return "done"
+        if probe_t >= float(target) - ADVICE_APPROACH_F:
+            return "approaching"
+    return "stall" if stall_detected else "cooking"
+
+def _advice_inputs(probe_id, item, target_pit_temp_f, last, rate_of_rise, stall_detected):
+    probe_t = last["probes"].get(probe_id)
+    return {
+        "setup":   json.dumps([probe_id, target_pit_temp_f] + [item.get(k) for k in (
+            "meat_type", "smoke_type", "target_internal_temp_f", "max_safe_temp_f")], default=str),
+        "phase":   _phase(item, probe_t, stall_detected),
+        "probe_t": probe_t,
+        "pit_t":   last.get("pit"),
+        "rate":    rate_of_rise,
+    }
 
-    payload    = _parse_event(event)
-    session_id = payload.get("session_id")
-    probe_id   = payload.get("probe_id")
+def _drifted(before, now):
+    for k, step in DRIFT:
+        a, b = before.get(k), now.get(k)
+        if (a is None) != (b is None) or (a is not None and abs(float(a) - float(b)) >= step):
+            return True
+    return False
+
+def _cached_advice(cached, inputs, now):
+    """(advice, fresh) from a probe's cache entry; advice is None when there is none."""
+    if not cached or not cached.get("last_advice") or not cached.get("last_advice_at"):
+        return None, False
+    age_minutes = (now - int(cached["last_advice_at"])) / 60
+    before = cached.get("advice_inputs") or {}
+    if any(before.get(k) != inputs[k] for k in ("setup", "phase")):
+        fresh = False
+    elif age_minutes < ADVICE_MIN_MINUTES:
+        fresh = True
+    else:
+        fresh = age_minutes < ADVICE_CACHE_MINUTES and not _drifted(before, inputs)
+    return cached["last_advice"], fresh
 
-    if not session_id or not probe_id:
-        return _resp(400, {"error": "session_id and probe_id are required"})
+def _claim_refresh(session_id, probe_id, now):
+    """Mark a background refresh as started; False if another one is already running."""
+    try:
+        _table(ANALYTICS_TABLE).update_item(
+            Key={"session_id": session_id, "metric": probe_id},
+            UpdateExpression="SET refresh_started_at = :now",
+            ConditionExpression="attribute_not_exists(refresh_started_at) OR refresh_started_at < :expired",
+            ExpressionAttributeValues={":now": now, ":expired": now - REFRESH_LOCK_SECS},
+        )
+        return True
+    except Exception:
+        return False
 
-    # 1. Fetch probe assignment
+def _revalidate(context, session_id, probe_ids, now, batch=False):
+    """Re-invoke this function asynchronously to recompute advice for `probe_ids`."""
+    if context is None:
+        return
+    claimed = [p for p in probe_ids if _claim_refresh(session_id, p, now)]
+    if not claimed:
+        return
+    payload = {"session_id": session_id, "refresh": True}
+    if batch:
+        payload["probe_ids"] = claimed
+    else:
+        payload["probe_id"] = claimed[0]
     try:
-        probe_result = _ddb.Table(PROBE_TABLE).query(
-            KeyConditionExpression=Key("session_id").eq(session_id) & Key("probe_id").eq(probe_id)
+        get_client("lambda", REGION).invoke(
+            FunctionName   = context.invoked_function_arn,
+            InvocationType = "Event",
+            Payload        = json.dumps(payload).encode(),
         )
-        items = probe_result.get("Items", [])
-        if not items:
-            return _resp(404, {"error": f"No probe assignment found for {probe_id}"})
-        probe_data = _to_native(items[0])
     except Exception as e:
-        return _resp(500, {"error": f"Error fetching probe assignment: {e}"})
+        print(f"Advice revalidation not started for {session_id}: {e}")
 
-    meat_type   = probe_data.get("item_type") or probe_data.get("meat_type") or "unknown"
-    meat_weight = probe_data.get("item_weight") or probe_data.get("weight") or "unknown"
+def _put_advice(session_id, probe_id, advice, inputs, now, rate_of_rise, stall_detected):
+    # A full put also drops refresh_started_at, releasing any revalidation claim.
+    _put_analytics(session_id, probe_id, {
+        "last_advice":    advice,
+        "last_advice_at": now,
+        "advice_inputs":  inputs,
+        "rate_of_rise":   rate_of_rise,
+        "stall_detected": stall_detected,
+    })
 
-    # Look up smoke_type and target temp from meat_types table
-    smoke_type            = "hot"
-    item_target_temp      = None
-    item_max_safe_temp    = None
-    try:
-        item_row = _ddb.Table("meat_types").get_item(Key={"name": meat_type}).get("Item")
-        if item_row:
-            smoke_type         = _to_native(item_row).get("smoke_type", "hot")
-            item_target_temp   = _to_native(item_row).get("target_internal_temp_f")
-            item_max_safe_temp = _to_native(item_row).get("max_safe_temp_f")
-    except Exception:
-        pass
+def _probe_metrics(state, probe_id):
+    points = state["probes"].get(probe_id, [])
+    return _compute_rate_of_rise(points), _detect_stall(points)
+
+def _item_details(assignment, item_row):
+    item_row = item_row or {}
+    return {
+        "meat_type":              assignment.get("item_type") or assignment.get("meat_type") or "unknown",
+        "weight_lbs":             assignment.get("item_weight") or assignment.get("weight") or "unknown",
+        "smoke_type":             item_row.get("smoke_type", "hot"),
+        "target_internal_temp_f": item_row.get("target_internal_temp_f"),
+        "max_safe_temp_f":        item_row.get("max_safe_temp_f"),
+    }
 
-    # 2. Check advice cache
-    now          = int(time.time())
-    cached_probe = _get_analytics(session_id, probe_id)
-    if cached_probe and cached_probe.get("last_advice_at"):
-        age_minutes = (now - int(cached_probe["last_advice_at"])) / 60
-        if age_minutes < ADVICE_CACHE_MINUTES and cached_probe.get("last_advice"):
-            return _resp(200, {"advice": cached_probe["last_advice"], "cached": True})
+# ---------- Batch mode ----------
+def _batch_advice(session_id, probe_ids, refresh=False, stale_ok=False, context=None):
+    """Advice for several probes of one session from a single Bedrock call.
+
+    probe_ids: list of probes to advise on; null/empty means every assigned probe.
+    Probes whose cached advice still fits their current state are answered from the
+    cache and left out of the prompt. Returns
+    {"advice": {probe_id: advice}, "cached": {probe_id: bool}, "stale": [probe_id, ...]}.
+    """
+    # Only the known probes, each at most once: every id costs a read (and a prompt slot)
+    if probe_ids is not None and (not isinstance(probe_ids, list) or len(probe_ids) > len(PROBE_IDS)
+                                  or not all(isinstance(p, str) for p in probe_ids)):
+        return _resp(400, {"error": f"probe_ids must be a list of at most {len(PROBE_IDS)} probe ids"})
+    unknown = [p for p in probe_ids or () if p not in PROBE_IDS]
+    if unknown:
+        return _resp(400, {"error": f"unknown probe_ids: {', '.join(unknown)}"})
+    wanted = list(dict.fromkeys(probe_ids or PROBE_IDS))
+
+    # 1. Assignments, every wanted probe's advice cache, target temp and session state at once
+    assignments_f = _pool.submit(_get_probe_assignments, session_id)
+    cached_fs     = {p: _pool.submit(_get_analytics, session_id, p) for p in wanted}
+    target_f      = _pool.submit(_get_target_pit_temp, session_id)
+    state_f       = _pool.submit(_load_session_state, session_id)
 
-    # 3. Fetch sensor data: oldest WARMUP_FETCH rows + newest RECENT_FETCH rows
     try:
-        sensor_table  = _ddb.Table(SENSOR_TABLE)
-        warmup_result = sensor_table.query(
-            KeyConditionExpression=Key("session_id").eq(session_id),
-            ScanIndexForward=True,
-            Limit=WARMUP_FETCH,
-        )
-        recent_result = sensor_table.query(
-            KeyConditionExpression=Key("session_id").eq(session_id),
-            ScanIndexForward=False,
-            Limit=RECENT_FETCH,
-        )
-        warmup_rows = [_to_native(i) for i in warmup_result.get("Items", [])]
-        recent_rows = list(reversed([_to_native(i) for i in recent_result.get("Items", [])]))
-
-        # Merge, dedupe by timestamp, sort chronologically
-        seen = set()
-        rows = []
-        for r in warmup_rows + recent_rows:
-            ts = r.get("timestamp")
-            if ts not in seen:
-                seen.add(ts)
-                rows.append(r)
-        rows.sort(key=lambda r: str(r.get("timestamp", "")))
+        assignments = {a["probe_id"]: a for a in assignments_f.result() if a.get("probe_id") in wanted}
     except Exception as e:
-        return _resp(500, {"error": f"Error fetching sensor data: {e}"})
+        return _resp(500, {"error": f"Error fetching probe assignment: {e}"})
+    if not assignments:
+        return _resp(404, {"error": "No probe assignments found for this session"})
 
-    if not rows:
+    # 2. Item details alongside the incremental sensor fold
+    item_types = {p: a.get("item_type") or a.get("meat_type") or "unknown" for p, a in assignments.items()}
+    meat_fs    = {t: _pool.submit(_get_meat_type, t) for t in set(item_types.values())}
+    target_pit_temp_f = target_f.result()
+    try:
+        state = _update_session_analytics(session_id, target_pit_temp_f, state_f.result())
+    except Exception as e:
+        return _resp(500, {"error": f"Error fetching sensor data: {e}"})
+    if not state.get("last"):
         return _resp(404, {"error": "No sensor data found for this session"})
+    last = state["last"]
+
+    # 3. Serve what the cache can; only the rest go to the model
+    now, advice, cached, stale = int(time.time()), {}, {}, []
+    probes = {}
+    for p, a in assignments.items():
+        item = _item_details(a, meat_fs[item_types[p]].result())
+        rate_of_rise, stall_detected = _probe_metrics(state, p)
+        inputs = _advice_inputs(p, item, target_pit_temp_f, last, rate_of_rise, stall_detected)
+        probes[p] = (item, rate_of_rise, stall_detected, inputs)
+        hit, fresh = _cached_advice(cached_fs[p].result(), inputs, now)
+        if hit is not None and not refresh and (fresh or stale_ok):
+            advice[p], cached[p] = hit, True
+            if not fresh:
+                stale.append(p)
+    if stale:
+        _revalidate(context, session_id, stale, now, batch=True)
+    missing = [p for p in assignments if p not in advice]
+    if not missing:
+        return _resp(200, {"advice": advice, "cached": cached, "stale": stale})
+
+    # 4. Shared context once, then a compact section per probe
+    history     = _build_milestones(state, None)
+    session_ctx = {
+        "target_pit_temp_f":       target_pit_temp_f,
+        "outside_temp_at_start_f": state.get("outside_temp_at_start"),
+        "warmup_minutes":          state.get("warmup_minutes"),
+        "avg_pit_temp_f":          state.get("avg_pit_temp"),
+        "total_elapsed_minutes":   last.get("min"),
+        "current_pit_temp_f":      last.get("pit"),
+    }
+    pit_milestones = [{"min": m["min"], "pit": m["pit"]} for m in history]
+    sections = []
+    for p in missing:
+        item, rate_of_rise, stall_detected, _ = probes[p]
+        sections.append({
+            "probe_id":              p,
+            **item,
+            "current_probe_temp_f":  last["probes"].get(p),
+            "rate_of_rise_f_per_hr": rate_of_rise,
+            "stall_detected":        stall_detected,
+            "milestones":            [[m["min"], m["probe"]] for m in _build_milestones(state, p)],
+        })
 
-    # 4. Get or compute session-level analytics
-    target_pit_temp_f = _get_target_pit_temp(session_id)
-    session_analytics = _get_analytics(session_id, "__session__")
+    system_msg, user_msg = _build_batch_prompt(session_ctx, sections, pit_milestones)
+    try:
+        parsed = _parse_advice(_invoke_bedrock(system_msg, user_msg, max_tokens=384 + 256 * len(missing)))
+    except Exception as e:
+        return _resp(500, {"error": f"Bedrock call failed: {type(e).__name__}: {e}"})
 
-    if not session_analytics:
-        outside_temp_at_start = None
-        for row in rows[:5]:
-            v = row.get("outside_temp")
-            if v and float(v) != -999:
-                outside_temp_at_start = float(v)
-                break
+    # 5. Split the answer back out and cache each probe's share
+    writes = []
+    for p in missing:
+        probe_advice = parsed.get(p)
+        if not isinstance(probe_advice, dict):
+            probe_advice = {"notes": "No guidance returned for this probe."}
+        advice[p], cached[p] = probe_advice, False
+        _, rate_of_rise, stall_detected, inputs = probes[p]
+        writes.append(_pool.submit(_put_advice, session_id, p, probe_advice, inputs,
+                                   now, rate_of_rise, stall_detected))
+    for w in writes:  # finish before the container is frozen
+        w.result()
+
+    return _resp(200, {"advice": advice, "cached": cached, "stale": stale})
 
-        pit_vals       = [_pit_avg(r) for r in rows if _pit_avg(r) is not None]
-        avg_pit_temp   = round(sum(pit_vals) / len(pit_vals), 1) if pit_vals else None
-        warmup_minutes = _compute_warmup(rows, session_id, target_pit_temp_f)
+# ---------- Handler ----------
+@instrumented
+def lambda_handler(event, context):
+    if method(event, default="POST") == "OPTIONS":
+        return preflight(METHODS)
 
-        session_analytics = {
-            "outside_temp_at_start": outside_temp_at_start,
-            "avg_pit_temp":          avg_pit_temp,
-            "warmup_minutes":        warmup_minutes,
-        }
-        _put_analytics(session_id, "__session__", session_analytics)
+    payload    = parse_event(event)
+    session_id = payload.get("session_id")
+    probe_id   = payload.get("probe_id")
+    # Only _revalidate's own async invokes may skip the cache; they arrive without
+    # an API Gateway requestContext, so a client can't force a model call.
+    refresh    = bool(payload.get("refresh")) and isinstance(event, dict) and "requestContext" not in event
+    stale_ok   = bool(payload.get("stale_ok"))  # return last advice now, refresh asynchronously
 
-    # 5. Compute probe-level metrics
-    probe_temps     = [r.get(probe_id) for r in rows]
-    rate_of_rise    = _compute_rate_of_rise(probe_temps)
-    stall_detected  = _detect_stall(probe_temps)
-    elapsed_minutes = _elapsed_minutes(session_id, rows[-1].get("timestamp")) if rows else 0
+    if session_id and "probe_ids" in payload:
+        return _batch_advice(session_id, payload.get("probe_ids"), refresh, stale_ok, context)
 
-    last_row           = rows[-1]
-    current_probe_temp = last_row.get(probe_id)
-    if current_probe_temp is not None and float(current_probe_temp) == -999:
-        current_probe_temp = None
-    current_pit_temp = _pit_avg(last_row)
+    if not session_id or not probe_id:
+        return _resp(400, {"error": "session_id and probe_id are required"})
+
+    # 1. Issue the independent reads together: probe assignment, advice cache,
+    #    target pit temp and the session's running analytics.
+    assignment_f = _pool.submit(_get_probe_assignment, session_id, probe_id)
+    cached_f     = _pool.submit(_get_analytics, session_id, probe_id)
+    target_f     = _pool.submit(_get_target_pit_temp, session_id)
+    state_f      = _pool.submit(_load_session_state, session_id)
 
-    # 6. Build milestones
-    milestones = _build_milestones(rows, session_id, probe_id)
+    try:
+        probe_data = assignment_f.result()
+    except Exception as e:
+        return _resp(500, {"error": f"Error fetching probe assignment: {e}"})
+    if not probe_data:
+        return _resp(404, {"error": f"No probe assignment found for {probe_id}"})
 
-    # 7. Call Bedrock
+    # 2. Meat type lookup runs alongside folding new sensor rows into the session analytics
+    meat_type         = probe_data.get("item_type") or probe_data.get("meat_type") or "unknown"
+    meat_f            = _pool.submit(_get_meat_type, meat_type)
+    target_pit_temp_f = target_f.result()
+    try:
+        session_analytics = _update_session_analytics(session_id, target_pit_temp_f, state_f.result())
+    except Exception as e:
+        return _resp(500, {"error": f"Error fetching sensor data: {e}"})
+
+    item = _item_details(probe_data, meat_f.result())
+
+    if not session_analytics.get("last"):
+        return _resp(404, {"error": "No sensor data found for this session"})
+
+    # 3. Compute probe-level metrics from the rolling window
+    rate_of_rise, stall_detected = _probe_metrics(session_analytics, probe_id)
+
+    last_row           = session_analytics["last"]
+    elapsed_minutes    = last_row.get("min")
+    current_probe_temp = last_row["probes"].get(probe_id)
+    current_pit_temp   = last_row.get("pit")
+
+    # 4. Check advice cache against the current inputs
+    now         = int(time.time())
+    inputs      = _advice_inputs(probe_id, item, target_pit_temp_f, last_row, rate_of_rise, stall_detected)
+    hit, fresh  = _cached_advice(cached_f.result(), inputs, now)
+    if hit is not None and not refresh:
+        if fresh:
+            return _resp(200, {"advice": hit, "cached": True})
+        if stale_ok:
+            _revalidate(context, session_id, [probe_id], now)
+            return _resp(200, {"advice": hit, "cached": True, "stale": True})
+
+    # 5. Build milestones
+    milestones = _build_milestones(session_analytics, probe_id)
+
+    # 6. Call Bedrock
     system_msg, user_msg = _build_prompt(
         probe_id              = probe_id,
-        meat_type             = meat_type,
-        meat_weight           = meat_weight,
-        smoke_type            = smoke_type,
-        item_target_temp      = item_target_temp,
-        item_max_safe_temp    = item_max_safe_temp,
+        meat_type             = item["meat_type"],
+        meat_weight           = item["weight_lbs"],
+        smoke_type            = item["smoke_type"],
+        item_target_temp      = item["target_internal_temp_f"],
+        item_max_safe_temp    = item["max_safe_temp_f"],
         target_pit_temp_f     = target_pit_temp_f,
         warmup_minutes        = session_analytics.get("warmup_minutes"),
         outside_temp_at_start = session_analytics.get("outside_temp_at_start"),
@@ -398,26 +699,11 @@ def lambda_handler(event, context):
     )
 
     try:
-        content = _invoke_bedrock(system_msg, user_msg)
-        # Strip potential markdown fencing
-        text = content.strip()
-        if text.startswith("```"):
-            text = text.split("```")[1]
-            if text.startswith("json"):
-                text = text[4:]
-            text = text.strip()
-        advice = json.loads(text)
-        if not isinstance(advice, dict):
-            advice = {"notes": str(advice)}
+        advice = _parse_advice(_invoke_bedrock(system_msg, user_msg))
     except Exception as e:
         return _resp(500, {"error": f"Bedrock call failed: {type(e).__name__}: {e}"})
 
-    # 8. Cache result
-    _put_analytics(session_id, probe_id, {
-        "last_advice":    advice,
-        "last_advice_at": now,
-        "rate_of_rise":   rate_of_rise,
-        "stall_detected": stall_detected,
-    })
+    # 7. Cache result
+    _put_advice(session_id, probe_id, advice, inputs, now, rate_of_rise, stall_detected)
 
     return _resp(200, {"advice": advice, "cached": False})
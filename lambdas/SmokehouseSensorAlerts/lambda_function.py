@@ -1,94 +1,227 @@
 # Lambda function to watch DynamoDB and send alerts via SNS
-import boto3
 import os
 import json
-from decimal import Decimal
+import time
+from boto3.dynamodb.conditions import Key
 
-# Initialize DynamoDB and SNS clients
-dynamodb = boto3.resource('dynamodb', region_name='us-east-2')
-sns_client = boto3.client('sns', region_name='us-east-2')
+from smokehouse_common import new_images, TTLCache, get_client, get_table, instrumented
+from smokehouse_common.timestamps import row_epoch
+
+# DynamoDB and SNS clients are built on first use: most batches never alarm
+REGION = 'us-east-2'
 
 # Environment variables for SNS topic and table names
 PROBE_ASSIGNMENT_TABLE = os.getenv('PROBE_ASSIGNMENT_TABLE', 'ProbeAssignments')
 SNS_TOPIC_ARN = os.getenv('SNS_TOPIC_ARN', 'arn:aws:sns:us-east-2:123456789012:SmokehouseAlerts')
+ASSIGNMENTS_CACHE_SECS = int(os.getenv('ASSIGNMENTS_CACHE_SECS', '120'))
+ALERTS_TABLE = os.getenv('ALERTS_TABLE', 'alerts')
+ALERT_DEDUP_SECS = int(os.getenv('ALERT_DEDUP_SECS', '1800'))  # repeat a firing alarm at most every 30 min
+ALERT_CLEAR_SECS = int(os.getenv('ALERT_CLEAR_SECS', '120'))   # condition must stay clear 2 min to reset
+ALERT_TTL_DAYS = int(os.getenv('ALERT_TTL_DAYS', '30'))
+SENTINEL = -999  # probe unplugged / read error
+
+# Warm-container cache of assignments per session. This function is also subscribed
+# to the probe_assignments stream, which invalidates entries immediately in the
+# container that receives it; the TTL bounds staleness in every other container.
+_assignments = TTLCache(maxsize=64, ttl=ASSIGNMENTS_CACHE_SECS)
+
+# Alarm state per session: {(probe_id, type): {state, since, last_notified, clear_since}}.
+# A session's rows arrive on one stream shard, so one container owns its alarms at a
+# time; state is kept in memory and only written to the alerts table on transitions.
+_alarm_states = TTLCache(maxsize=64, ttl=900)
+
+
+def _is_assignment_record(record):
+    return f':table/{PROBE_ASSIGNMENT_TABLE}/stream/' in record.get('eventSourceARN', '')
+
+
+def _invalidate_assignments(records):
+    for record in records:
+        keys = record.get('dynamodb', {}).get('Keys', {})
+        session_id = keys.get('session_id', {}).get('S')
+        if session_id:
+            _assignments.invalidate(session_id)
+            print(f'Assignments changed for session_id: {session_id}; cache entry dropped')
+
+
+def _load_assignments(session_id):
+    probe_table = get_table(PROBE_ASSIGNMENT_TABLE, REGION)
+    response = probe_table.query(KeyConditionExpression=Key('session_id').eq(session_id))
+    return response.get('Items', [])
+
+
+def _readings_by_session(records):
+    """Group the batch's sensor rows by session so each session is looked up once."""
+    by_session = {}
+    for probe_values in new_images({'Records': records}):
+        # New image arrives deserialized (numbers as Decimal, comparable with the thresholds)
+        session_id = str(probe_values.get('session_id') or '')
+        if session_id:
+            by_session.setdefault(session_id, []).append(probe_values)
+    return by_session
+
+
+def _send_alert(probe_id, mobile_number, alert_message):
+    try:
+        if mobile_number:
+            get_client('sns', REGION).publish(
+                PhoneNumber=mobile_number,
+                Message=alert_message,
+                MessageAttributes={
+                    'AWS.SNS.SMS.SMSType': {
+                        'DataType': 'String',
+                        'StringValue': 'Transactional'
+                    }
+                }
+            )
+        elif SNS_TOPIC_ARN:
+            get_client('sns', REGION).publish(
+                TopicArn=SNS_TOPIC_ARN,
+                Message=alert_message
+            )
+        else:
+            print(f'No mobile number or topic ARN configured for probe {probe_id}, skipping alert.')
+            return
+        print(f'Alert sent for probe {probe_id}: {alert_message}')
+    except Exception as e:
+        print(f'Error sending alert for probe {probe_id}: {str(e)}')
+
 
-# Helper function to convert DynamoDB Decimal to Python float
-def convert_decimal(obj):
-    if isinstance(obj, list):
-        return [convert_decimal(x) for x in obj]
-    if isinstance(obj, dict):
-        return {k: convert_decimal(v) for k, v in obj.items()}
-    if isinstance(obj, Decimal):
-        return float(obj)
-    return obj
+def _load_alarm_states(session_id):
+    table = get_table(ALERTS_TABLE, REGION)
+    response = table.query(
+        KeyConditionExpression=Key('session_id').eq(session_id) & Key('ts').begins_with('state#')
+    )
+    states = {}
+    for item in response.get('Items', []):
+        states[(item['probe_id'], item['type'])] = {
+            'state': item['state'],
+            'since': int(item.get('since') or 0),
+            'last_notified': int(item.get('last_notified') or 0),
+            'clear_since': int(item.get('clear_since') or 0),
+        }
+    return states
 
+
+def _step(alarm, breached, now):
+    """Advance one alarm by one reading. Returns (alarm, notify, changed).
+
+    ok -> firing (notify) -> clearing after an in-range reading -> ok once the
+    condition has stayed clear for ALERT_CLEAR_SECS. While firing, repeats are
+    suppressed for ALERT_DEDUP_SECS; a breach while clearing resumes firing quietly.
+    """
+    state = alarm['state']
+    if breached:
+        if state == 'ok':
+            return {'state': 'firing', 'since': now, 'last_notified': now, 'clear_since': 0}, True, True
+        if state == 'clearing':
+            return {**alarm, 'state': 'firing', 'clear_since': 0}, False, True
+        if now - alarm['last_notified'] >= ALERT_DEDUP_SECS:
+            return {**alarm, 'last_notified': now}, True, True
+        return alarm, False, False
+    if state == 'firing':
+        return {**alarm, 'state': 'clearing', 'clear_since': now}, False, True
+    if state == 'clearing' and now - alarm['clear_since'] >= ALERT_CLEAR_SECS:
+        return {'state': 'ok', 'since': now, 'last_notified': alarm['last_notified'], 'clear_since': 0}, False, True
+    return alarm, False, False
+
+
+def _check_reading(session_id, states, assignments, probe_values, transitions):
+    now = row_epoch(session_id, probe_values) or int(time.time())
+
+    # Iterate through the assigned probes and compare values
+    for assignment in assignments:
+        probe_id = assignment['probe_id']
+        min_alert = assignment.get('min_alert')
+        max_alert = assignment.get('max_alert')
+        mobile_number = assignment.get('mobile_number')
+
+        # Extract the current probe reading from the sensor data
+        probe_value = probe_values.get(probe_id)
+        if probe_value is None or probe_value == SENTINEL:
+            continue
+
+        checks = (
+            ('low', 'warning', min_alert is not None and probe_value < min_alert,
+             f'Alert for Probe {probe_id}: Temperature {probe_value} is below the minimum threshold of {min_alert}.'),
+            ('high', 'critical', max_alert is not None and probe_value > max_alert,
+             f'Alert for Probe {probe_id}: Temperature {probe_value} exceeds the maximum threshold of {max_alert}.'),
+        )
+        for alarm_type, severity, breached, alert_message in checks:
+            key = (probe_id, alarm_type)
+            alarm = states.get(key, {'state': 'ok', 'since': 0, 'last_notified': 0, 'clear_since': 0})
+            alarm, notify, changed = _step(alarm, breached, now)
+            if not changed:
+                continue
+            states[key] = alarm
+            # Send alert via SNS only on transitions that call for it
+            if notify:
+                _send_alert(probe_id, mobile_number, alert_message)
+            transitions.append({
+                'probe_id': probe_id, 'type': alarm_type, 'severity': severity, 'at': now,
+                'alarm': alarm, 'notified': notify,
+                'details': alert_message if breached else f'Probe {probe_id} back in range ({probe_value}).',
+            })
+
+
+def _persist_transitions(session_id, transitions):
+    """One history row per transition plus the latest state per alarm, batched."""
+    if not transitions:
+        return
+    expires = int(time.time()) + ALERT_TTL_DAYS * 86400
+    latest = {}
+    table = get_table(ALERTS_TABLE, REGION)
+    with table.batch_writer(overwrite_by_pkeys=['session_id', 'ts']) as batch:
+        for t in transitions:
+            stamp = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime(t['at']))
+            batch.put_item(Item={
+                'session_id': session_id,
+                'ts': f"{stamp}#{t['probe_id']}#{t['type']}",
+                'probe_id': t['probe_id'], 'type': t['type'], 'severity': t['severity'],
+                'state': t['alarm']['state'], 'notified': t['notified'],
+                'details': t['details'], 'ttl': expires,
+            })
+            latest[(t['probe_id'], t['type'])] = t
+        for (probe_id, alarm_type), t in latest.items():
+            batch.put_item(Item={
+                'session_id': session_id,
+                'ts': f'state#{probe_id}#{alarm_type}',
+                'probe_id': probe_id, 'type': alarm_type, 'severity': t['severity'],
+                **t['alarm'], 'ttl': expires,
+            })
+
+
+@instrumented
 def lambda_handler(event, context):
-    # Loop through each record in the DynamoDB stream
-    for record in event['Records']:
-        if record['eventName'] == 'INSERT' or record['eventName'] == 'MODIFY':
-            # Extract the new image from the record
-            new_image = record['dynamodb']['NewImage']
-            session_id = new_image['session_id']['N']
-            probe_values = convert_decimal(new_image)
-
-            # Fetch the probe assignment for this session
-            try:
-                probe_table = dynamodb.Table(PROBE_ASSIGNMENT_TABLE)
-                response = probe_table.query(
-                    KeyConditionExpression=boto3.dynamodb.conditions.Key('session_id').eq(session_id)
-                )
-                assignments = response.get('Items', [])
-                if not assignments:
-                    print(f'No probe assignments found for session_id: {session_id}')
-                    continue
-
-                # Iterate through the assigned probes and compare values
-                for assignment in assignments:
-                    probe_id = assignment['probe_id']
-                    min_alert = assignment.get('min_alert')
-                    max_alert = assignment.get('max_alert')
-                    mobile_number = assignment.get('mobile_number')
-
-                    # Extract the current probe reading from the sensor data
-                    probe_value = probe_values.get(probe_id)
-                    if probe_value is None:
-                        continue
-
-                    # Check if the reading exceeds the threshold
-                    alert_message = None
-                    if min_alert is not None and probe_value < min_alert:
-                        alert_message = f'Alert for Probe {probe_id}: Temperature {probe_value} is below the minimum threshold of {min_alert}.'
-                    elif max_alert is not None and probe_value > max_alert:
-                        alert_message = f'Alert for Probe {probe_id}: Temperature {probe_value} exceeds the maximum threshold of {max_alert}.'
-
-                    # Send alert via SNS if needed
-                    if alert_message:
-                        try:
-                            if mobile_number:
-                                sns_client.publish(
-                                    PhoneNumber=mobile_number,
-                                    Message=alert_message,
-                                    MessageAttributes={
-                                        'AWS.SNS.SMS.SMSType': {
-                                            'DataType': 'String',
-                                            'StringValue': 'Transactional'
-                                        }
-                                    }
-                                )
-                            elif SNS_TOPIC_ARN:
-                                sns_client.publish(
-                                    TopicArn=SNS_TOPIC_ARN,
-                                    Message=alert_message
-                                )
-                            else:
-                                print(f'No mobile number or topic ARN configured for probe {probe_id}, skipping alert.')
-                                continue
-                            print(f'Alert sent for probe {probe_id}: {alert_message}')
-                        except Exception as e:
-                            print(f'Error sending alert for probe {probe_id}: {str(e)}')
-
-            except Exception as e:
-                print(f'Error querying probe assignment table: {str(e)}')
+    records = event.get('Records', [])
+    _invalidate_assignments([r for r in records if _is_assignment_record(r)])
+    sensor_records = [r for r in records if not _is_assignment_record(r)]
+
+    for session_id, readings in _readings_by_session(sensor_records).items():
+        # Fetch the probe assignment for this session (cached across readings and batches)
+        try:
+            assignments = _assignments.get_or_load(session_id, _load_assignments)
+        except Exception as e:
+            print(f'Error querying probe assignment table: {str(e)}')
+            continue
+        if not assignments:
+            print(f'No probe assignments found for session_id: {session_id}')
+            continue
+
+        try:
+            states = _alarm_states.get_or_load(session_id, _load_alarm_states)
+        except Exception as e:
+            print(f'Error loading alarm state, starting clear: {str(e)}')
+            states = {}
+            _alarm_states.put(session_id, states)
+
+        transitions = []
+        for probe_values in readings:
+            _check_reading(session_id, states, assignments, probe_values, transitions)
+        try:
+            _persist_transitions(session_id, transitions)
+        except Exception as e:
+            print(f'Error writing alarm transitions for session_id {session_id}: {str(e)}')
 
     return {
         'statusCode': 200,
@@ -1,49 +1,134 @@
-import boto3
+import os
 import time
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Key, Attr
 
-dynamodb = boto3.resource('dynamodb')
-sessions_table = dynamodb.Table('sessions')
+from smokehouse_common import archive, get_table, instrumented
+from smokehouse_common.timestamps import to_epoch, to_iso, session_start_epoch
+
+SESSIONS_TABLE = 'sessions'
+SENSORS_TABLE = os.getenv('SENSORS_TABLE', 'sensor_data')
+ARCHIVE_TABLE = os.getenv('ARCHIVE_TABLE', 'sensor_archive')
 
 SESSION_TIMEOUT = 45 * 60  # 45 minutes in seconds
+ACTIVE_GSI = os.getenv('ACTIVE_GSI', 'by_active')  # sparse: only items carrying active_key
+ACTIVE_KEY = 'active'
+CLOSE_WORKERS = int(os.getenv('CLOSE_WORKERS', '8'))
+
+# Sessions close concurrently; get_table() gives each worker its own resource
+_pool = ThreadPoolExecutor(max_workers=CLOSE_WORKERS, thread_name_prefix='close')
+
+
+def active_sessions():
+    """(sessions, indexed): every session on the sparse by_active index, following
+    pagination; indexed is False when they came from the scan fallback."""
+    kwargs = {
+        'IndexName': ACTIVE_GSI,
+        'KeyConditionExpression': Key('active_key').eq(ACTIVE_KEY),
+    }
+    try:
+        return _paginate(get_table(SESSIONS_TABLE).query, kwargs), True
+    except Exception as e:
+        # Fallback while the index is missing/backfilling: full paginated scan
+        print(f"Active index unavailable ({e}); scanning sessions")
+        return _paginate(get_table(SESSIONS_TABLE).scan, {
+            'FilterExpression': Attr('status').eq('active'),
+            'ProjectionExpression': 'session_id, last_seen, last_seen_at',
+        }), False
+
+
+def _paginate(call, kwargs):
+    items = []
+    while True:
+        resp = call(**kwargs)
+        items.extend(resp.get('Items', []))
+        if 'LastEvaluatedKey' not in resp:
+            return items
+        kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+
 
+def archive_session(session_id):
+    """Pack an ended session's rows into sensor_archive. Returns the row count."""
+    rows, kwargs = [], {
+        'KeyConditionExpression': Key('session_id').eq(session_id),
+        'ScanIndexForward': True,
+    }
+    while True:
+        resp = get_table(SENSORS_TABLE).query(**kwargs)
+        rows.extend(resp.get('Items', []))
+        if 'LastEvaluatedKey' not in resp:
+            break
+        kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+    if not rows:
+        return 0
 
-def parse_last_seen(ts):
-    """Convert last_seen string to epoch int. Handles multiple formats."""
-    if ts is None:
-        return None
+    blob = archive.pack(session_id, rows)
+    chunks = archive.parts(blob)
+    with get_table(ARCHIVE_TABLE).batch_writer() as batch:
+        for i, chunk in enumerate(chunks):
+            item = {'session_id': session_id, 'part': i, 'blob': chunk}
+            if i == 0:
+                # readers only trust the archive once all `parts` items are present
+                item.update({'parts': len(chunks), 'rows': len(rows), 'bytes': len(blob)})
+            batch.put_item(Item=item)
+    get_table(SESSIONS_TABLE).update_item(
+        Key={'session_id': session_id},
+        UpdateExpression='SET archived_rows = :n, archive_bytes = :b',
+        ExpressionAttributeValues={':n': len(rows), ':b': len(blob)},
+    )
+    return len(rows)
+
+
+def close_session(session_id, seen_attr, seen_value, now, indexed=True):
+    """End one session if nobody else has, and it saw no new data meanwhile.
+
+    Sessions from the index are still open while they carry active_key. Those
+    from the scan fallback may be legacy items without it, so for them the
+    status itself is the guard. Returns 'ended', or 'skipped' when the
+    condition fails (an overlapping run already closed it, or a row arrived
+    since it was read).
+    """
+    values = {':ended': 'ended', ':et': to_iso(now), ':seen': seen_value}
+    if indexed:
+        condition = 'attribute_exists(active_key) AND #seen = :seen'
+    else:
+        condition = '#s = :active AND #seen = :seen'
+        values[':active'] = 'active'
     try:
-        s = str(ts)
-        # "20251225T184651Z" (firmware format)
-        if len(s) == 16 and 'T' in s and s.endswith('Z'):
-            dt = datetime.strptime(s, "%Y%m%dT%H%M%SZ")
-            return int(dt.replace(tzinfo=timezone.utc).timestamp())
-        # ISO 8601 "2025-12-25T18:46:51Z"
-        if 'T' in s and '-' in s:
-            dt = datetime.strptime(s[:19], "%Y-%m-%dT%H:%M:%S")
-            return int(dt.replace(tzinfo=timezone.utc).timestamp())
-        # Plain epoch int string
-        return int(float(s))
-    except Exception:
-        return None
+        get_table(SESSIONS_TABLE).update_item(
+            Key={'session_id': session_id},
+            UpdateExpression='SET #s = :ended, end_time = :et REMOVE active_key',
+            ConditionExpression=condition,
+            ExpressionAttributeNames={'#s': 'status', '#seen': seen_attr},
+            ExpressionAttributeValues=values,
+        )
+    except Exception as e:
+        if getattr(e, 'response', {}).get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+            return 'skipped'
+        raise
+    # Compact the finished cook for history reads; raw rows stay as the fallback
+    try:
+        n = archive_session(session_id)
+        print(f"Archived {n} row(s) for {session_id}")
+    except Exception as e:
+        print(f"Error archiving session {session_id}: {e}")
+    return 'ended'
 
 
+@instrumented
 def lambda_handler(event, context):
     now = int(time.time())
     ended = []
     errors = []
 
-    # Scan sessions table for active sessions only
-    resp = sessions_table.scan(
-        FilterExpression=boto3.dynamodb.conditions.Attr('status').eq('active'),
-        ProjectionExpression='session_id, last_seen',
-    )
-    active_sessions = resp.get('Items', [])
-
-    for session in active_sessions:
+    # Only active sessions are read: cost follows the live count, not the history
+    due = []
+    sessions, indexed = active_sessions()
+    for session in sessions:
         session_id = session.get('session_id')
-        last_seen = session.get('last_seen')
-        last_epoch = parse_last_seen(last_seen)
+        seen_attr = 'last_seen' if session.get('last_seen') is not None else 'last_seen_at'
+        last_seen = session.get(seen_attr)
+        last_epoch = to_epoch(last_seen, session_start_epoch(session_id))
 
         if last_epoch is None:
             print(f"Could not parse last_seen for {session_id}: {last_seen!r}")
@@ -51,21 +136,19 @@ def lambda_handler(event, context):
 
         age = now - last_epoch
         if age > SESSION_TIMEOUT:
-            try:
-                sessions_table.update_item(
-                    Key={'session_id': session_id},
-                    UpdateExpression='SET #s = :ended, end_time = :et',
-                    ExpressionAttributeNames={'#s': 'status'},
-                    ExpressionAttributeValues={
-                        ':ended': 'ended',
-                        ':et': datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
-                    },
-                )
+            due.append((session_id, seen_attr, last_seen, age))
+
+    # Conditional writes issued concurrently; overlapping runs can't both end a session
+    futures = {_pool.submit(close_session, sid, attr, seen, now, indexed): (sid, age)
+               for sid, attr, seen, age in due}
+    for future, (session_id, age) in futures.items():
+        try:
+            if future.result() == 'ended':
                 ended.append(session_id)
                 print(f"Ended session {session_id} (last seen {age // 60}m ago)")
-            except Exception as e:
-                errors.append(str(e))
-                print(f"Error ending session {session_id}: {e}")
+        except Exception as e:
+            errors.append(str(e))
+            print(f"Error ending session {session_id}: {e}")
 
     print(f"Done — ended {len(ended)} session(s), {len(errors)} error(s)")
     return {'ended': ended, 'errors': errors}
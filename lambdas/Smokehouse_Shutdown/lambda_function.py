@@ -1,13 +1,14 @@
-import boto3
+from smokehouse_common import get_client, instrumented
 
-iot_client = boto3.client('iot', region_name='us-east-2')
+REGION = 'us-east-2'
 
+@instrumented
 def lambda_handler(event, context):
     print(f"Received event for shutdown: {event}")
 
     # Example: Disable IoT Rule (if needed)
     try:
-        iot_client.update_topic_rule(
+        get_client('iot', REGION).update_topic_rule(
             ruleName='wake-up-rule',
             ruleDisabled=True
         )
@@ -15,8 +16,7 @@ def lambda_handler(event, context):
     except Exception as e:
         print(f"Error disabling IoT Rule: {e}")
 
-    # Log shutdown or notify via Amplify
-    amplify_client = boto3.client('amplify', region_name='us-east-2')
+    # Amplify needs no action (no client is built just to log this)
     print("Amplify resources remain accessible.")
 
     return {
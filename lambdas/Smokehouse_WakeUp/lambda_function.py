@@ -1,11 +1,15 @@
-import boto3
 import json
 
+from smokehouse_common import get_client, instrumented
+
+REGION = 'us-east-2'
+
+@instrumented
 def lambda_handler(event, context):
     print(f"Received event: {json.dumps(event)}")
 
     # Logics for DynamoDB (if any pre-wake-up preparation is required)
-    dynamodb_client = boto3.client('dynamodb', region_name='us-east-2')
+    dynamodb_client = get_client('dynamodb', REGION)
     try:
         response = dynamodb_client.describe_table(TableName='sensor_data')
         print(f"DynamoDB Table Status: {response['Table']['TableStatus']}")
@@ -13,7 +17,7 @@ def lambda_handler(event, context):
         print(f"Error with DynamoDB: {e}")
 
     # Any Amplify-related notifications (Optional)
-    amplify_client = boto3.client('amplify', region_name='us-east-2')
+    amplify_client = get_client('amplify', REGION)
     apps = amplify_client.list_apps()
     print(f"Amplify Apps: {apps}")
 
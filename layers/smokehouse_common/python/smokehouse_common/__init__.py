@@ -0,0 +1,18 @@
+"""Shared runtime for the smokehouse Python lambdas (published as a Lambda layer)."""
+from .jsonutil import DecimalEncoder, dumps, to_native, to_ddb
+from .http import (cors, response, preflight, method, query_params, header, parse_event,
+                   etag, etag_matches, not_modified)
+from .streams import from_ddb_image, new_images
+from .cache import TTLCache
+from .clients import get_client, get_resource, get_table, init_timings
+from .metrics import instrumented
+
+__all__ = [
+    "DecimalEncoder", "dumps", "to_native", "to_ddb",
+    "cors", "response", "preflight", "method", "query_params", "header", "parse_event",
+    "etag", "etag_matches", "not_modified",
+    "from_ddb_image", "new_images",
+    "TTLCache",
+    "get_client", "get_resource", "get_table", "init_timings",
+    "instrumented",
+]
@@ -0,0 +1,140 @@
+"""Columnar kernels for cook analytics.
+
+Rows are turned into array('d') columns once, with NaN standing in for a missing
+attribute or the firmware's -999 sentinel. Each kernel is then a single pass over
+plain floats instead of re-reading and re-converting row dicts, which keeps
+whole-session analytics in the low milliseconds for 1,000+ row cooks. NumPy is
+deliberately not used: it is not in the Lambda runtime and would triple the
+layer's size for loops this short.
+"""
+import math
+from array import array
+
+SENTINEL = -999
+NAN = float("nan")
+PIT_FIELDS = ("top_temp", "middle_temp", "bottom_temp")
+
+
+def value(v):
+    """Sensor value as float, NaN for missing/-999."""
+    if v is None:
+        return NAN
+    v = float(v)
+    return NAN if v == SENTINEL else v
+
+
+def column(rows, field):
+    return array("d", (value(r.get(field)) for r in rows))
+
+
+def pit_column(rows, fields=PIT_FIELDS):
+    """Per-row average of the available pit sensors (NaN when none read).
+
+    Rows written by SensorIngest carry it as `pit_avg`; only older rows are averaged here.
+    """
+    out, stored = array("d"), fields == PIT_FIELDS
+    for r in rows:
+        v = r.get("pit_avg") if stored else None
+        if v is not None:
+            out.append(float(v))
+            continue
+        total, n = 0.0, 0
+        for f in fields:
+            v = r.get(f)
+            if v is not None:
+                v = float(v)
+                if v != SENTINEL:
+                    total += v
+                    n += 1
+        out.append(total / n if n else NAN)
+    return out
+
+
+def optional(v, ndigits=None):
+    """NaN -> None (for JSON/DynamoDB), otherwise the float, optionally rounded."""
+    if v is None or math.isnan(v):
+        return None
+    return round(v, ndigits) if ndigits is not None else v
+
+
+def nan_sum(ys):
+    """(count, sum) of the non-NaN values."""
+    n, total = 0, 0.0
+    for y in ys:
+        if y == y:
+            n += 1
+            total += y
+    return n, total
+
+
+def slope(xs, ys):
+    """Least-squares slope of ys over xs, skipping NaN pairs; None below 2 points.
+
+    Fits against real x (elapsed time), so irregular or missed readings don't skew
+    the rate the way a first/last difference over a reading count does.
+    """
+    n = 0
+    sx = sy = sxx = sxy = 0.0
+    x0 = None
+    for x, y in zip(xs, ys):
+        if x != x or y != y:
+            continue
+        if x0 is None:
+            x0 = x  # shift the origin to keep the sums small
+        x -= x0
+        n += 1
+        sx += x
+        sy += y
+        sxx += x * x
+        sxy += x * y
+    if n < 2:
+        return None
+    denom = n * sxx - sx * sx
+    if denom == 0:
+        return None
+    return (n * sxy - sx * sy) / denom
+
+
+def stalled(ys, window, threshold):
+    """True if the last `window` valid values span less than `threshold`."""
+    lo, hi, n = math.inf, -math.inf, 0
+    for i in range(len(ys) - 1, -1, -1):
+        y = ys[i]
+        if y != y:
+            continue
+        lo, hi, n = min(lo, y), max(hi, y), n + 1
+        if n == window:
+            return (hi - lo) < threshold
+    return False
+
+
+def hold_start(xs, ys, target, hold, run=0, run_start=None):
+    """Find where ys first stays >= target for `hold` consecutive valid readings.
+
+    Resumable across batches: pass back the returned (run, run_start). Returns
+    (run, run_start, found) where found is the x at which the hold began, or None.
+    """
+    for x, y in zip(xs, ys):
+        if x != x or y != y:
+            continue
+        if y >= target:
+            if run == 0:
+                run_start = x
+            run += 1
+            if run >= hold:
+                return run, run_start, run_start
+        else:
+            run, run_start = 0, None
+    return run, run_start, None
+
+
+def tail(xs, ys, k):
+    """Last k (x, y) pairs where both are valid, oldest first."""
+    out = []
+    for i in range(len(ys) - 1, -1, -1):
+        if xs[i] == xs[i] and ys[i] == ys[i]:
+            out.append((xs[i], ys[i]))
+            if len(out) == k:
+                break
+    out.reverse()
+    return out
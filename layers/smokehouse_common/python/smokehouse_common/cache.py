@@ -0,0 +1,55 @@
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Per-container LRU cache whose entries also expire after `ttl` seconds.
+
+    Lives at module level in a handler, so it survives across warm invocations
+    and is dropped with the container. Not thread-safe.
+    """
+
+    def __init__(self, maxsize=128, ttl=300, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()  # key -> (expires_at, value)
+
+    def get(self, key, default=None):
+        hit = self._data.get(key)
+        if hit is None:
+            return default
+        if hit[0] <= self._clock():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return hit[1]
+
+    def put(self, key, value, ttl=None):
+        self._data[key] = (self._clock() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get_or_load(self, key, loader):
+        """Cached value for `key`, calling loader(key) and caching the result on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader(key)
+            self.put(key, value)
+        return value
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when key is None."""
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,89 @@
+"""Warm-container cache of the item-type catalogue (the `meat_types` table).
+
+The catalogue changes perhaps once a season, but the listing endpoints scanned it
+on every request and the advisor read it on every call. get() keeps one copy per
+container. When the copy is TTL seconds old, get() revalidates it against a
+version number in SSM (CATALOGUE_VERSION_PARAM). An unchanged version keeps the
+copy for another TTL, at the cost of one SSM read and no DynamoDB reads. A bumped
+version, or a missing/unreadable parameter, rescans the table.
+
+After editing meat_types, bump the parameter (any new value) so warm containers
+pick up the change within TTL seconds:
+
+    aws ssm put-parameter --name /smokehouse/catalogue_version --value 7 --overwrite
+
+The catalogue's `digest` hashes its content, so endpoints can serve it with an
+ETag and answer If-None-Match from memory.
+"""
+import hashlib
+import os
+import threading
+
+from .cache import TTLCache
+from .clients import get_client, get_table
+from .jsonutil import dumps
+
+TABLE = os.environ.get("ITEM_TYPES_TABLE", "meat_types")
+TTL_SECS = int(os.environ.get("CATALOGUE_TTL_SECS", "600"))
+VERSION_PARAM = os.environ.get("CATALOGUE_VERSION_PARAM", "/smokehouse/catalogue_version")
+
+_cache = TTLCache(maxsize=4, ttl=TTL_SECS)   # table -> Catalogue, while fresh
+_last = {}                                   # table -> Catalogue, kept past expiry to revalidate
+_lock = threading.Lock()                     # the advisor reads from pool threads
+
+
+class Catalogue:
+    """Immutable snapshot: `items` sorted by name, `by_name`, `version`, content `digest`."""
+
+    __slots__ = ("items", "by_name", "version", "digest")
+
+    def __init__(self, items, version):
+        for it in items:
+            if "name" not in it and "item_type" in it:
+                it["name"] = it["item_type"]
+        self.items = sorted(items, key=lambda it: str(it.get("name", "")))
+        self.by_name = {it.get("name"): it for it in self.items}
+        self.version = version
+        self.digest = hashlib.sha1(dumps(self.items).encode()).hexdigest()[:20]
+
+    def get(self, name, default=None):
+        return self.by_name.get(name, default)
+
+
+def _version(region_name):
+    try:
+        p = get_client("ssm", region_name).get_parameter(Name=VERSION_PARAM, WithDecryption=False)
+        return p["Parameter"]["Value"]
+    except Exception:
+        return None
+
+
+def _scan(table, region_name):
+    items, kwargs = [], {}
+    while True:
+        resp = get_table(table, region_name).scan(**kwargs)
+        items.extend(resp.get("Items", []))
+        if "LastEvaluatedKey" not in resp:
+            return items
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def get(table=TABLE, region_name=None):
+    """The current catalogue, from memory unless TTL_SECS have passed since it was checked."""
+    with _lock:
+        cat = _cache.get(table)
+        if cat is None:
+            version = _version(region_name)
+            cat = _last.get(table)
+            if cat is None or version is None or version != cat.version:
+                cat = Catalogue(_scan(table, region_name), version)
+            _cache.put(table, cat)
+            _last[table] = cat
+        return cat
+
+
+def invalidate(table=TABLE):
+    """Forget the cached copy; the next get() rescans."""
+    with _lock:
+        _cache.invalidate(table)
+        _last.pop(table, None)
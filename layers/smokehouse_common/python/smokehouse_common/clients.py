@@ -0,0 +1,98 @@
+"""Lazy, container-wide boto3 clients, resources and Table handles.
+
+Building a client loads its service model, which costs tens of milliseconds per
+client and more for the DynamoDB resource. Built at import, every client a
+handler might need lands in init time, including ones most requests never touch:
+Bedrock on a cached answer, SSM, SNS when nothing alarms. get_client(),
+get_resource() and get_table() build on first use instead, and reuse the result
+for the life of the container.
+
+boto3 clients are thread-safe, so one is shared per (service, region).
+Resources are not thread-safe. The main thread uses a shared resource, and
+each worker thread gets its own from a private Session.
+
+init_timings() lists what was built, where and how long it took, so a handler
+(or scripts/profile_init.py) can report which clients still land in init.
+Everything built here is hooked by metrics.instrument().
+"""
+import threading
+import time
+
+import boto3
+
+from .metrics import instrument
+
+_lock = threading.Lock()
+_clients = {}                # (service, region, endpoint) -> client, shared by all threads
+_main = {}                   # main thread's resources and Table handles
+_local = threading.local()   # worker threads' own
+_timings = []
+
+
+def _timed(kind, name, region_name, build):
+    t0 = time.perf_counter()
+    obj = instrument(build())
+    _timings.append({
+        "kind": kind,
+        "name": name,
+        "region": region_name,
+        "ms": round((time.perf_counter() - t0) * 1000, 1),
+        "thread": threading.current_thread().name,
+    })
+    return obj
+
+
+def _handles():
+    if threading.current_thread() is threading.main_thread():
+        return _main
+    handles = getattr(_local, "handles", None)
+    if handles is None:
+        handles = _local.handles = {}
+    return handles
+
+
+def get_client(service, region_name=None, endpoint_url=None):
+    """Shared boto3 client for `service`, created on first use."""
+    key = (service, region_name, endpoint_url)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:  # creating clients from the default session is not thread-safe
+            client = _clients.get(key)
+            if client is None:
+                kwargs = {"endpoint_url": endpoint_url} if endpoint_url else {}
+                client = _clients[key] = _timed(
+                    "client", service, region_name,
+                    lambda: boto3.client(service, region_name=region_name, **kwargs))
+    return client
+
+
+def get_resource(service="dynamodb", region_name=None):
+    """This thread's boto3 resource for `service`, created on first use."""
+    handles = _handles()
+    key = ("resource", service, region_name)
+    res = handles.get(key)
+    if res is None:
+        if handles is _main:
+            with _lock:
+                build = lambda: boto3.resource(service, region_name=region_name)
+                res = _timed("resource", service, region_name, build)
+        else:
+            build = lambda: boto3.session.Session().resource(service, region_name=region_name)
+            res = _timed("resource", service, region_name, build)
+        handles[key] = res
+    return res
+
+
+def get_table(name, region_name=None):
+    """This thread's DynamoDB Table handle for `name`."""
+    handles = _handles()
+    key = ("table", name, region_name)
+    table = handles.get(key)
+    if table is None:
+        table = handles[key] = get_resource("dynamodb", region_name).Table(name)
+    return table
+
+
+def init_timings():
+    """Clients/resources built so far: [{kind, name, region, ms, thread}, ...]."""
+    return list(_timings)
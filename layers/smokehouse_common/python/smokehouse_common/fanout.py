@@ -0,0 +1,71 @@
+"""Concurrent delivery to API Gateway WebSocket connections.
+
+`api` is an `apigatewaymanagementapi` client (get_client(..., endpoint_url=...))
+or anything with the same post_to_connection(ConnectionId=, Data=). Offline,
+bench/fakeapigw.py provides an in-process stand-in.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+GONE = "GoneException"   # 410: the client went away without a clean $disconnect
+MAX_FRAME = 120 * 1024   # post_to_connection accepts up to 128 KB per message
+
+
+def _encode(data):
+    return data.encode() if isinstance(data, str) else data
+
+
+def _post(api, connection_id, data):
+    try:
+        api.post_to_connection(ConnectionId=connection_id, Data=data)
+        return "sent"
+    except ClientError as e:
+        return "gone" if e.response.get("Error", {}).get("Code") == GONE else "failed"
+    except BotoCoreError as e:
+        # connect/read timeouts, endpoint errors: this frame is lost, the batch isn't
+        print(f"post to {connection_id} failed: {type(e).__name__}: {e}")
+        return "failed"
+
+
+def deliver(api, messages, workers=16):
+    """Post each (connection_id, data) concurrently -> {"sent": [...], "gone": [...], "failed": [...]}.
+
+    `data` is str or bytes, encoded once per message. Gone connections are for the
+    caller to drop from its registry. Failed ones (throttling, oversized frames) are
+    kept, and the client's polling fallback covers the missed rows. Transport errors
+    (timeouts, dropped connections) count as failed too, so one slow post can't fail
+    the stream batch and make every viewer receive it again.
+    """
+    messages = [(cid, _encode(data)) for cid, data in messages]
+    out = {"sent": [], "gone": [], "failed": []}
+    if not messages:
+        return out
+    if len(messages) == 1 or workers <= 1:
+        results = [_post(api, cid, data) for cid, data in messages]
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(messages))) as pool:
+            results = list(pool.map(lambda m: _post(api, *m), messages))
+    for (cid, _), result in zip(messages, results):
+        out[result].append(cid)
+    return out
+
+
+def frames(rows, encode, limit=MAX_FRAME):
+    """Split rows into encode(chunk) payloads of at most `limit` bytes each (one row minimum).
+
+    encode(chunk) wraps a list of rows in the message envelope; sizes are summed per
+    row (plus a separator) rather than re-encoding the growing chunk.
+    """
+    base = len(_encode(encode([])))
+    out, chunk, size = [], [], base
+    for row in rows:
+        cost = len(_encode(encode([row]))) - base + 1
+        if chunk and size + cost > limit:
+            out.append(encode(chunk))
+            chunk, size = [], base
+        chunk.append(row)
+        size += cost
+    if chunk:
+        out.append(encode(chunk))
+    return out
@@ -0,0 +1,100 @@
+import base64
+import hashlib
+import json
+
+from .jsonutil import dumps
+
+
+def cors(methods="OPTIONS,GET"):
+    return {
+        "Access-Control-Allow-Origin":  "*",
+        "Access-Control-Allow-Headers": "content-type,if-none-match",
+        "Access-Control-Allow-Methods": methods,
+        "Access-Control-Expose-Headers": "ETag",
+    }
+
+
+def response(status, body=None, methods="OPTIONS,GET", headers=None):
+    """API Gateway proxy response. `body` may hold raw DynamoDB items (Decimals)."""
+    out = {"statusCode": status, "headers": cors(methods)}
+    if body is not None:
+        out["headers"]["Content-Type"] = "application/json"
+        out["body"] = dumps(body)
+    if headers:
+        out["headers"].update(headers)
+    return out
+
+
+def preflight(methods="OPTIONS,GET"):
+    return {"statusCode": 204, "headers": cors(methods)}
+
+
+def etag(*parts):
+    """Weak ETag over the values that determine a response body."""
+    digest = hashlib.sha1("\x1f".join(map(str, parts)).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(event, tag):
+    """True if the request's If-None-Match already names `tag`."""
+    inm = header(event, "if-none-match")
+    if not inm:
+        return False
+    return inm.strip() == "*" or tag in [t.strip() for t in inm.split(",")]
+
+
+def not_modified(tag, methods="OPTIONS,GET", headers=None):
+    """Body-less 304 that keeps the validator and CORS headers."""
+    out = {"statusCode": 304, "headers": {**cors(methods), "ETag": tag}}
+    if headers:
+        out["headers"].update(headers)
+    return out
+
+
+def method(event, default="GET"):
+    """HTTP method for HTTP API (v2) and REST (v1) proxy events."""
+    if not isinstance(event, dict):
+        return default
+    return (event.get("requestContext", {}).get("http", {}).get("method") or
+            event.get("httpMethod") or default).upper()
+
+
+def query_params(event):
+    if not isinstance(event, dict):
+        return {}
+    return event.get("queryStringParameters") or {}
+
+
+def header(event, name):
+    """Case-insensitive request header lookup."""
+    headers = (event or {}).get("headers") or {}
+    name = name.lower()
+    for k, v in headers.items():
+        if k.lower() == name:
+            return v
+    return None
+
+
+def parse_event(event):
+    """
+    Accepts:
+      - API Gateway HTTP API v2 / REST proxy events ({ body, isBase64Encoded, ... })
+      - Direct Lambda invokes (event is already the JSON dict)
+      - Raw JSON string
+    Returns a dict payload; an unparseable body yields {}.
+    """
+    try:
+        if isinstance(event, str):
+            return json.loads(event)
+        if not isinstance(event, dict):
+            return {}
+        body = event.get("body")
+        if body is None:
+            # Some integrations or tests send the JSON directly
+            return event
+        if event.get("isBase64Encoded"):
+            body = base64.b64decode(body).decode("utf-8", "ignore")
+        payload = json.loads(body) if isinstance(body, str) else body
+        return payload if isinstance(payload, dict) else {}
+    except (ValueError, TypeError):
+        return {}
@@ -0,0 +1,54 @@
+import json
+from decimal import Decimal
+
+
+def _native_number(d):
+    return int(d) if d % 1 == 0 else float(d)
+
+
+class DecimalEncoder(json.JSONEncoder):
+    """JSON encoder that converts DynamoDB Decimals (and sets) while it serializes.
+
+    json only calls default() for values it can't encode itself, so items coming
+    straight out of boto3 are written in one pass without building a native copy.
+    """
+
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return _native_number(o)
+        if isinstance(o, (set, frozenset)):
+            return sorted(o) if all(isinstance(v, str) for v in o) else list(o)
+        return super().default(o)
+
+
+_ENCODER = DecimalEncoder(separators=(",", ":"))
+
+
+def dumps(obj):
+    """Compact JSON string for a response body; accepts raw DynamoDB items."""
+    return _ENCODER.encode(obj)
+
+
+def to_native(obj):
+    """Recursive Decimal -> int/float copy, for code that does arithmetic on items.
+
+    Prefer dumps() when the data is only being serialized.
+    """
+    if isinstance(obj, Decimal):
+        return _native_number(obj)
+    if isinstance(obj, list):
+        return [to_native(v) for v in obj]
+    if isinstance(obj, dict):
+        return {k: to_native(v) for k, v in obj.items()}
+    return obj
+
+
+def to_ddb(obj):
+    """Recursive float -> Decimal copy so computed values can be written with boto3."""
+    if isinstance(obj, float):
+        return Decimal(str(obj))
+    if isinstance(obj, list):
+        return [to_ddb(v) for v in obj]
+    if isinstance(obj, dict):
+        return {k: to_ddb(v) for k, v in obj.items()}
+    return obj
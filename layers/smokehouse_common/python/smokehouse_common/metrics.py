@@ -0,0 +1,241 @@
+"""Per-call AWS instrumentation, summarized per invocation as CloudWatch EMF.
+
+Every client and resource built by smokehouse_common.clients is hooked through
+botocore's event system, so handler code is unchanged. Each DynamoDB, Bedrock,
+SNS, SSM (or any other) call records:
+
+- wall time, including retries and (de)serialization;
+- consumed read/write capacity (ReturnConsumedCapacity=TOTAL is added to
+  DynamoDB calls that don't already ask for it);
+- items returned and items scanned;
+- request and response bytes;
+- Bedrock input/output tokens.
+
+@instrumented on lambda_handler resets the per-invocation record and, when the
+handler returns or raises, prints one embedded-metric-format line per
+(service, operation, target) plus one invocation summary. A line carries at
+most EMF_MAX_VALUES latencies, so a busy target gets extra Latency-only lines.
+CloudWatch turns these into metrics in the "Smokehouse" namespace with no
+PutMetricData calls. The overhead is a few dict operations per AWS call and one
+print per group.
+
+Set SMOKEHOUSE_METRICS=off (or 0/false) to turn it all off. Clients are then
+not hooked, and @instrumented returns the handler unchanged.
+"""
+import functools
+import json
+import os
+import time
+
+NAMESPACE = "Smokehouse"
+ENABLED = os.environ.get("SMOKEHOUSE_METRICS", "on").strip().lower() not in ("off", "0", "false", "no")
+
+EMF_MAX_VALUES = 100  # CloudWatch drops a metric whose value array is longer
+_READS = {"GetItem", "BatchGetItem", "Query", "Scan", "TransactGetItems"}
+_calls = []          # this invocation's calls; list.append is atomic, so worker threads can record
+_cold = True
+
+
+def _target(params):
+    """What a call was aimed at: table, model, topic or parameter name."""
+    if "TableName" in params:
+        return params["TableName"]
+    for key in ("RequestItems", "TransactItems"):
+        items = params.get(key)
+        if isinstance(items, dict):
+            return ",".join(sorted(items))
+    if "modelId" in params:
+        return params["modelId"]
+    if "TopicArn" in params:
+        return params["TopicArn"].rsplit(":", 1)[-1]
+    if "Name" in params:
+        return params["Name"]
+    if "Names" in params:
+        return ",".join(params["Names"])
+    if "FunctionName" in params:
+        return params["FunctionName"]
+    return "-"
+
+
+def _provide_params(params, model, context, **kwargs):
+    if (model.service_model.service_name == "dynamodb" and "ReturnConsumedCapacity" not in params
+            and model.input_shape is not None and "ReturnConsumedCapacity" in model.input_shape.members):
+        params["ReturnConsumedCapacity"] = "TOTAL"
+    context["smokehouse_call"] = {
+        "service": model.service_model.service_name,
+        "op": model.name,
+        "target": _target(params),
+        "t0": time.perf_counter(),
+    }
+
+
+def _before_call(params, context, **kwargs):
+    call = context.get("smokehouse_call")
+    if call is not None:
+        body = params.get("body")
+        call["req_bytes"] = len(body) if isinstance(body, (bytes, str)) else 0
+
+
+def _capacity(op, consumed):
+    """(rcu, wcu) from ConsumedCapacity, a dict or (batch/transact) a list of dicts."""
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+    rcu = wcu = 0.0
+    for c in consumed or ():
+        if "ReadCapacityUnits" in c or "WriteCapacityUnits" in c:
+            rcu += c.get("ReadCapacityUnits", 0.0)
+            wcu += c.get("WriteCapacityUnits", 0.0)
+        elif op in _READS:
+            rcu += c.get("CapacityUnits", 0.0)
+        else:
+            wcu += c.get("CapacityUnits", 0.0)
+    return rcu, wcu
+
+
+def _items(parsed):
+    if "Count" in parsed:
+        return parsed["Count"]
+    if "Item" in parsed:
+        return 1
+    if "Responses" in parsed:
+        return sum(len(v) for v in parsed["Responses"].values())
+    return 0
+
+
+def _after_call(http_response, parsed, model, context, **kwargs):
+    call = context.pop("smokehouse_call", None)
+    if call is None:
+        return
+    call["ms"] = (time.perf_counter() - call.pop("t0")) * 1000
+    call["error"] = http_response.status_code >= 300
+    headers = http_response.headers
+    # Never touch .content: on streaming responses (invoke_model) it would consume the body.
+    call["resp_bytes"] = int(headers.get("content-length") or 0)
+    call["rcu"], call["wcu"] = _capacity(model.name, parsed.get("ConsumedCapacity"))
+    call["items"] = _items(parsed)
+    call["scanned"] = parsed.get("ScannedCount", call["items"])
+    if "x-amzn-bedrock-input-token-count" in headers:
+        call["tokens_in"] = int(headers["x-amzn-bedrock-input-token-count"])
+        call["tokens_out"] = int(headers.get("x-amzn-bedrock-output-token-count") or 0)
+    _calls.append(call)
+
+
+def _after_call_error(context, **kwargs):
+    call = context.pop("smokehouse_call", None)
+    if call is not None:
+        call["ms"] = (time.perf_counter() - call.pop("t0")) * 1000
+        call["error"] = True
+        _calls.append(call)
+
+
+def instrument(obj):
+    """Hook a boto3 client or resource (in place); returns it. No-op when disabled or not boto3."""
+    if not ENABLED:
+        return obj
+    client = getattr(getattr(obj, "meta", None), "client", obj)
+    events = getattr(getattr(client, "meta", None), "events", None)
+    if events is None:
+        return obj
+    events.register("provide-client-params", _provide_params, unique_id="smokehouse-metrics-params")
+    events.register("before-call", _before_call, unique_id="smokehouse-metrics-before")
+    events.register("after-call", _after_call, unique_id="smokehouse-metrics-after")
+    events.register("after-call-error", _after_call_error, unique_id="smokehouse-metrics-error")
+    return obj
+
+
+def calls():
+    """Calls recorded so far in this invocation: [{service, op, target, ms, rcu, wcu, ...}]."""
+    return list(_calls)
+
+
+def _emf(function, dimensions, metrics, values):
+    doc = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": NAMESPACE,
+                "Dimensions": [dimensions],
+                "Metrics": [{"Name": name, "Unit": unit} for name, unit in metrics],
+            }],
+        },
+        "Function": function,
+    }
+    doc.update(values)
+    return json.dumps(doc, separators=(",", ":"))
+
+
+def summarize(function, duration_ms, request_id=None, cold_start=False):
+    """EMF lines for the calls recorded this invocation: one per target (more when a
+    target's latencies exceed EMF_MAX_VALUES), then a summary."""
+    groups = {}
+    for c in _calls:
+        groups.setdefault((c["service"], c["op"], c["target"]), []).append(c)
+    lines = []
+    dims = ["Function", "Service", "Operation", "Target"]
+    for (service, op, target), cs in groups.items():
+        latency = [round(c["ms"], 2) for c in cs]
+        values = {
+            "Service": service, "Operation": op, "Target": target,
+            "Calls": len(cs),
+            "Errors": sum(1 for c in cs if c["error"]),
+            "Latency": latency[:EMF_MAX_VALUES],
+            "RCU": sum(c.get("rcu", 0.0) for c in cs),
+            "WCU": sum(c.get("wcu", 0.0) for c in cs),
+            "Items": sum(c.get("items", 0) for c in cs),
+            "Scanned": sum(c.get("scanned", 0) for c in cs),
+            "Bytes": sum(c.get("req_bytes", 0) + c.get("resp_bytes", 0) for c in cs),
+        }
+        metrics = [("Calls", "Count"), ("Errors", "Count"), ("Latency", "Milliseconds"),
+                   ("RCU", "Count"), ("WCU", "Count"), ("Items", "Count"), ("Scanned", "Count"),
+                   ("Bytes", "Bytes")]
+        if any("tokens_in" in c for c in cs):
+            values["InputTokens"] = sum(c.get("tokens_in", 0) for c in cs)
+            values["OutputTokens"] = sum(c.get("tokens_out", 0) for c in cs)
+            metrics += [("InputTokens", "Count"), ("OutputTokens", "Count")]
+        lines.append(_emf(function, dims, metrics, values))
+        # Busy targets (batch writes, fanout) make more calls than one array may hold:
+        # the rest of the latencies go out in extra Latency-only lines
+        for i in range(EMF_MAX_VALUES, len(latency), EMF_MAX_VALUES):
+            lines.append(_emf(function, dims, [("Latency", "Milliseconds")], {
+                "Service": service, "Operation": op, "Target": target,
+                "Latency": latency[i:i + EMF_MAX_VALUES],
+            }))
+    summary = {
+        "Duration": round(duration_ms, 2),
+        "AwsCalls": len(_calls),
+        "AwsMs": round(sum(c["ms"] for c in _calls), 2),
+        "RCU": sum(c.get("rcu", 0.0) for c in _calls),
+        "WCU": sum(c.get("wcu", 0.0) for c in _calls),
+        "ColdStart": cold_start,
+    }
+    if request_id:
+        summary["RequestId"] = request_id
+    lines.append(_emf(function, ["Function"], [
+        ("Duration", "Milliseconds"), ("AwsCalls", "Count"), ("AwsMs", "Milliseconds"),
+        ("RCU", "Count"), ("WCU", "Count"),
+    ], summary))
+    return lines
+
+
+def instrumented(handler):
+    """Decorator for lambda_handler: record this invocation's AWS calls and emit them as EMF."""
+    if not ENABLED:
+        return handler
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        global _cold
+        del _calls[:]
+        t0 = time.perf_counter()
+        try:
+            return handler(event, context)
+        finally:
+            function = (getattr(context, "function_name", None)
+                        or os.environ.get("AWS_LAMBDA_FUNCTION_NAME") or handler.__module__)
+            lines = summarize(function, (time.perf_counter() - t0) * 1000,
+                              getattr(context, "aws_request_id", None), _cold)
+            _cold = False
+            for line in lines:  # one log event per EMF document
+                print(line)
+
+    return wrapper
@@ -0,0 +1,114 @@
+"""Firmware payload -> sensor_data item, derived once at ingest (SensorIngest).
+
+Stored items:
+  session_id (S, hash)   timestamp (S, range)   the firmware's sort key, unchanged
+  ts_epoch   (N)         epoch seconds of `timestamp` (never the payload's own ts_epoch,
+                         which may disagree with the sort key)
+  elapsed_s  (N)         seconds since the session start (session_id)
+  pit_avg    (N)         mean of the pit zones that read (absent when none did)
+  <field>    (N)         each reading in FIELDS; -999 and unreadable values are omitted
+
+Everything is derived from the payload alone, so a replayed message produces a
+byte-identical item: the write is an idempotent overwrite of the same key, and
+DynamoDB Streams emits no record for a put that changes nothing.
+"""
+import math
+import re
+from decimal import Decimal
+
+from .analytics import PIT_FIELDS
+from .timestamps import DAY, session_start_epoch, to_epoch
+
+SENTINEL = -999
+FIELDS = (
+    "top_temp", "middle_temp", "bottom_temp", "outside_temp",
+    "probe1_temp", "probe2_temp", "probe3_temp",
+    "humidity", "smoke_ppm",
+)
+# The sort-key formats readers page over: firmware compact UTC or legacy HHMMSS
+SORT_KEY = re.compile(r"^(\d{8}T\d{6}Z|\d{6})$")
+CLOCK_SKEW_SECS = 300            # device clock slightly behind the session start
+MAX_SESSION_SECS = 7 * 86400     # no cook runs longer; later readings are garbled
+# Anything outside these is a wiring fault or a garbled frame, not a reading
+TEMP_RANGE = (-100.0, 1500.0)   # °F
+RANGES = {"humidity": (0.0, 100.0), "smoke_ppm": (0.0, 100000.0)}
+
+
+class InvalidReading(ValueError):
+    """The payload can't be stored: bad session_id/timestamp, or no readings at all.
+
+    Retrying it can't help, so callers drop it rather than fail the batch.
+    """
+
+
+def _number(field, v):
+    """Firmware value -> float, or None for the sentinel/missing/unparseable/out of range."""
+    if v is None or isinstance(v, bool):
+        return None
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return None
+    lo, hi = RANGES.get(field, TEMP_RANGE)
+    if not math.isfinite(f) or f == SENTINEL or not lo <= f <= hi:
+        return None
+    return f
+
+
+def _decimal(f, ndigits):
+    # via str(round()) so the same float always becomes the same Decimal
+    return Decimal(str(round(f, ndigits)))
+
+
+def _to_epoch(value, anchor=None):
+    # to_epoch(), but a payload value it chokes on is just unusable
+    try:
+        return to_epoch(value, anchor)
+    except (ValueError, TypeError, OverflowError, ArithmeticError):
+        return None
+
+
+def _epoch(payload, ts, start):
+    """Epoch seconds of the sort key `timestamp`, so ts_epoch can never disagree with it.
+
+    A legacy HHMMSS key only names a time of day: the session-start anchor resolves
+    the first day, and the firmware ts_epoch (else the rule's receive time) moves it
+    to the nearest matching day for long cooks.
+    """
+    epoch = _to_epoch(ts, start)
+    if epoch is not None and len(ts) == 6:
+        near = payload.get("ts_epoch")
+        near = None if near is None or isinstance(near, bool) else _to_epoch(near)
+        if near is None:
+            near = _to_epoch(payload.get("received_at"))
+        if near is not None:
+            epoch += round((near - epoch) / DAY) * DAY
+    return epoch
+
+
+def normalize(payload):
+    """One firmware reading -> the sensor_data item to put. Raises InvalidReading."""
+    if not isinstance(payload, dict):
+        raise InvalidReading("payload is not an object")
+    session_id = str(payload.get("session_id") or "").strip()
+    start = session_start_epoch(session_id) if len(session_id) == 14 and session_id.isdigit() else None
+    if start is None:
+        raise InvalidReading(f"bad session_id: {payload.get('session_id')!r}")
+    ts = str(payload.get("timestamp") or "").strip()
+    epoch = _epoch(payload, ts, start) if SORT_KEY.match(ts) else None
+    if epoch is None:
+        raise InvalidReading(f"bad timestamp: {payload.get('timestamp')!r}")
+    if not start - CLOCK_SKEW_SECS <= epoch <= start + MAX_SESSION_SECS:
+        raise InvalidReading(f"timestamp {ts!r} outside session {session_id}")
+
+    values = {f: v for f in FIELDS if (v := _number(f, payload.get(f))) is not None}
+    if not values:
+        raise InvalidReading("no readings")
+
+    item = {"session_id": session_id, "timestamp": ts, "ts_epoch": epoch,
+            "elapsed_s": max(0, epoch - start)}
+    item.update((f, _decimal(v, 2)) for f, v in values.items())
+    pit = [values[f] for f in PIT_FIELDS if f in values]
+    if pit:
+        item["pit_avg"] = _decimal(sum(pit) / len(pit), 2)
+    return item
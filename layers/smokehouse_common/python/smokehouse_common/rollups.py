@@ -0,0 +1,31 @@
+"""Multi-resolution sensor rollups shared by the writer (SensorRollups) and readers.
+
+sensor_rollups items:
+  series_key  (S, hash)   "<session_id>#<resolution>", e.g. "20260424124000#5m"
+  bucket      (N, range)  bucket start, epoch seconds
+  seen        (NS)        epochs of the rows folded in (makes retries idempotent in any order)
+  last_ts     (N)         newest row epoch folded in (the bucket's change marker)
+  <metric>_min/_max/_sum/_n for every metric present in the bucket
+"""
+RESOLUTIONS = {"1m": 60, "5m": 300, "15m": 900}   # finest -> coarsest
+METRICS = (
+    "top_temp", "middle_temp", "bottom_temp", "outside_temp",
+    "probe1_temp", "probe2_temp", "probe3_temp",
+    "humidity", "smoke_ppm", "pit_avg",
+)
+SENTINEL = -999
+
+
+def series_key(session_id, resolution):
+    return f"{session_id}#{resolution}"
+
+
+def choose_resolution(span_secs, max_points):
+    """Finest resolution whose bucket count over `span_secs` fits in `max_points`.
+
+    Falls back to the coarsest resolution when even that would overflow.
+    """
+    for name, secs in RESOLUTIONS.items():
+        if span_secs / secs <= max_points:
+            return name
+    return next(reversed(RESOLUTIONS))
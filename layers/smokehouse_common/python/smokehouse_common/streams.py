@@ -0,0 +1,18 @@
+from boto3.dynamodb.types import TypeDeserializer
+
+_deser = TypeDeserializer()
+
+
+def from_ddb_image(img):
+    """Stream image ({"N": "1"} style) -> plain dict; numbers come back as Decimal."""
+    return {k: _deser.deserialize(v) for k, v in (img or {}).items()}
+
+
+def new_images(event, events=("INSERT", "MODIFY")):
+    """Yield the deserialized NewImage of each matching DynamoDB stream record."""
+    for rec in (event or {}).get("Records", []):
+        if rec.get("eventName") not in events:
+            continue
+        img = rec.get("dynamodb", {}).get("NewImage")
+        if img:
+            yield from_ddb_image(img)
@@ -0,0 +1,130 @@
+"""One timestamp parser for every handler.
+
+Formats seen in the tables:
+  20260424T124032Z      firmware sort key (UTC)
+  124032                legacy firmware sort key, HHMMSS on the session's UTC day
+  2026-04-24T12:40:32Z  ISO-8601 (sessions.last_seen, end_time, query params)
+  1777034432            epoch seconds (ts_epoch, query params), as int, Decimal or string
+  20260424124000        session_id, the session's UTC start
+
+Sensor rows carry a numeric ts_epoch and elapsed_s (written by SensorIngest);
+readers should prefer row_epoch()/column_epochs()/column_elapsed(), which use
+them and only fall back to parsing the sort key for rows written before they
+existed.
+"""
+import calendar
+import time
+from decimal import Decimal
+from functools import lru_cache
+
+COMPACT_FMT = "%Y%m%dT%H%M%SZ"
+ISO_FMT = "%Y-%m-%dT%H:%M:%SZ"
+DAY = 86400
+MAX_EPOCH = 253402300799   # 9999-12-31T23:59:59Z, the last second strftime can format
+
+
+@lru_cache(maxsize=1024)
+def session_start_epoch(session_id):
+    """session_id is the UTC start time, YYYYMMDDHHMMSS."""
+    try:
+        return calendar.timegm(time.strptime(str(session_id)[:14], "%Y%m%d%H%M%S"))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=8192)
+def _parse_str(s, anchor):
+    n = len(s)
+    try:
+        if n == 16 and s[8] == "T" and s[15] == "Z":
+            return calendar.timegm(time.strptime(s, COMPACT_FMT))
+        if s.isdigit():
+            if n == 6:
+                # legacy HHMMSS: same UTC day as the anchor, rolling past midnight
+                if anchor is None:
+                    return None
+                t = anchor - anchor % DAY + int(s[0:2]) * 3600 + int(s[2:4]) * 60 + int(s[4:6])
+                return t + DAY if t < anchor else t
+            if n == 14:
+                return session_start_epoch(s)
+            return int(s)
+        if n >= 19 and s[4] == "-" and s[10] == "T":
+            return calendar.timegm(time.strptime(s[:19], "%Y-%m-%dT%H:%M:%S"))
+        return int(float(s))
+    except (ValueError, OverflowError):   # "nan", "inf", garbage
+        return None
+
+
+def to_epoch(value, anchor=None):
+    """Epoch seconds for any supported format, or None (also for NaN, infinity and
+    values outside 1970..9999).
+
+    `anchor` (epoch seconds, normally the session start) places legacy HHMMSS
+    values on a day; without it they cannot be resolved.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        try:
+            epoch = int(value)
+        except (ValueError, OverflowError, ArithmeticError):   # NaN / infinity
+            return None
+    else:
+        s = str(value).strip()
+        epoch = _parse_str(s, anchor) if s else None
+    return epoch if epoch is not None and 0 <= epoch <= MAX_EPOCH else None
+
+
+def row_epoch(session_id, row):
+    """Epoch seconds of a sensor row: ts_epoch, else its sort-key timestamp."""
+    if row.get("ts_epoch") is not None:
+        return int(row["ts_epoch"])
+    return to_epoch(row.get("timestamp"), session_start_epoch(session_id) if session_id else None)
+
+
+def column_epochs(session_id, rows, field="timestamp"):
+    """Epochs for a chronological run of rows in one pass (None where unparseable).
+
+    Legacy HHMMSS rows are anchored to the session start and keep rolling forward
+    a day at a time, so cooks longer than 24 hours stay monotonic.
+    """
+    anchor = session_start_epoch(session_id) if session_id else None
+    out, roll, prev = [], 0, None
+    for row in rows:
+        epoch = row.get("ts_epoch")
+        if epoch is not None:
+            epoch = int(epoch)
+        else:
+            raw = row.get(field)
+            epoch = to_epoch(raw, anchor)
+            if epoch is not None and isinstance(raw, str) and len(raw) == 6:
+                epoch += roll
+                if prev is not None and epoch < prev:
+                    roll += DAY
+                    epoch += DAY
+        if epoch is not None:
+            prev = epoch
+        out.append(epoch)
+    return out
+
+
+def column_elapsed(session_id, rows):
+    """Seconds since the session start for each chronological row (None where unknown).
+
+    Uses the stored elapsed_s, converting only the rows that lack it.
+    """
+    if all(r.get("elapsed_s") is not None for r in rows):
+        return [int(r["elapsed_s"]) for r in rows]
+    start = session_start_epoch(session_id) if session_id else None
+    return [int(r["elapsed_s"]) if r.get("elapsed_s") is not None
+            else None if e is None or start is None else max(0, e - start)
+            for r, e in zip(rows, column_epochs(session_id, rows))]
+
+
+def to_compact(epoch):
+    """Epoch seconds -> firmware sort-key format."""
+    return time.strftime(COMPACT_FMT, time.gmtime(int(epoch)))
+
+
+def to_iso(epoch):
+    return time.strftime(ISO_FMT, time.gmtime(int(epoch)))
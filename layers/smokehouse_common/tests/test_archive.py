@@ -0,0 +1,48 @@
+import os
+import sys
+import unittest
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "python"))
+
+from smokehouse_common import archive  # noqa: E402
+
+SID = "20260424120000"
+START = 1777032000  # SID as epoch seconds
+
+
+class ArchiveTest(unittest.TestCase):
+    def test_round_trip_keeps_sort_keys(self):
+        rows = [
+            # ts_epoch one second after its sort key, as some firmware sends it
+            {"session_id": SID, "timestamp": "20260424T120000Z", "ts_epoch": START + 1,
+             "top_temp": Decimal("225.5"), "probe1_temp": -999},
+            {"session_id": SID, "timestamp": "20260424T120030Z", "ts_epoch": START + 30,
+             "top_temp": Decimal("226"), "device_id": "pi"},
+        ]
+        out = archive.unpack(archive.pack(SID, rows))
+        self.assertEqual([r["timestamp"] for r in out], ["20260424T120000Z", "20260424T120030Z"])
+        self.assertEqual([r["ts_epoch"] for r in out], [START + 1, START + 30])
+        self.assertEqual(out[0]["top_temp"], 225.5)
+        self.assertEqual(out[0]["probe1_temp"], -999)
+        self.assertNotIn("probe1_temp", out[1])
+        self.assertEqual([r["device_id"] for r in out], ["pi", "pi"])  # kept once, from the last row
+
+    def test_round_trip_legacy_keys(self):
+        rows = [{"session_id": SID, "timestamp": "235959", "top_temp": 200},
+                {"session_id": SID, "timestamp": "000001", "top_temp": 201}]
+        out = archive.unpack(archive.pack(SID, rows))
+        self.assertEqual([r["timestamp"] for r in out], ["235959", "000001"])
+
+    def test_empty(self):
+        self.assertEqual(archive.unpack(archive.pack(SID, [])), [])
+
+    def test_rejects_unknown_version(self):
+        blob = bytearray(archive.pack(SID, []))
+        blob[4] = 99
+        with self.assertRaises(ValueError):
+            archive.unpack(bytes(blob))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "python"))
+
+from smokehouse_common.readings import InvalidReading, normalize  # noqa: E402
+
+SID = "20260424120000"
+START = 1777032000  # SID as epoch seconds
+
+
+def reading(**kw):
+    p = {"session_id": SID, "timestamp": "20260424T124032Z", "top_temp": 225.5,
+         "probe1_temp": -999}
+    p.update(kw)
+    return p
+
+
+class NormalizeTest(unittest.TestCase):
+    def test_item(self):
+        item = normalize(reading())
+        self.assertEqual(item["ts_epoch"], START + 2432)
+        self.assertEqual(item["elapsed_s"], 2432)
+        self.assertNotIn("probe1_temp", item)
+        self.assertEqual(normalize(reading()), item)
+
+    def test_unusable_ts_epoch_falls_back_to_timestamp(self):
+        for bad in ("inf", "-inf", "nan", float("inf"), float("nan"), 1e300, "1e300", "garbage"):
+            with self.subTest(ts_epoch=bad):
+                self.assertEqual(normalize(reading(ts_epoch=bad))["ts_epoch"], START + 2432)
+
+    def test_ts_epoch_never_disagrees_with_timestamp(self):
+        for epoch in (START + 2433, START + 3 * 3600, "1777034400"):
+            with self.subTest(ts_epoch=epoch):
+                self.assertEqual(normalize(reading(ts_epoch=epoch))["ts_epoch"], START + 2432)
+
+    def test_legacy_timestamp_day_from_ts_epoch(self):
+        # the second day of a long cook: HHMMSS alone would land on the first
+        item = normalize(reading(timestamp="124032", ts_epoch=START + 86400 + 2440))
+        self.assertEqual(item["ts_epoch"], START + 86400 + 2432)
+
+    def test_unusable_timestamp_is_invalid(self):
+        for ts in ("", "inf", "nan", "1e300", "20261399T999999Z", "2026-04-24T12:40:32Z"):
+            with self.subTest(timestamp=ts):
+                with self.assertRaises(InvalidReading):
+                    normalize(reading(timestamp=ts, ts_epoch="inf"))
+
+    def test_outside_session_is_invalid(self):
+        for ts, epoch in (("20260424T112000Z", None), ("20260601T000000Z", None),
+                          ("124032", 0), ("124032", START + 30 * 86400)):
+            with self.subTest(timestamp=ts, ts_epoch=epoch):
+                with self.assertRaises(InvalidReading):
+                    normalize(reading(timestamp=ts, ts_epoch=epoch))
+
+    def test_legacy_timestamp(self):
+        self.assertEqual(normalize(reading(timestamp="124032"))["ts_epoch"], START + 2432)
+
+    def test_no_readings_is_invalid(self):
+        with self.assertRaises(InvalidReading):
+            normalize(reading(top_temp=-999))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,51 +1,280 @@
-import os, boto3, time
-from boto3.dynamodb.conditions import Key, Attr
+"""Rebuild the sessions table from sensor_data.
+
+Scans sensor_data as a parallel scan (TotalSegments across a thread pool),
+collecting first/last timestamp and row count per session in the same pass, then
+writes real started_at / start_time / last_seen / seen_count values with
+rate-limited concurrent updates. The writes are update_item calls rather than a
+batch_writer because they must merge into existing session items. last_seen and
+seen_count only move forward, and ended sessions are never reactivated, so running
+it next to the live upserters is safe.
+
+Progress goes to a checkpoint file after every scan page and every batch of
+writes, so an interrupted run picks up where it stopped:
+
+    python scripts/backfill_sessions.py                  # start or resume
+    python scripts/backfill_sessions.py --reset          # ignore the checkpoint
+    python scripts/backfill_sessions.py --segments 16 --writes-per-sec 100
+"""
+import os, sys, json, time, argparse, threading
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "layers", "smokehouse_common", "python"))
+from smokehouse_common import to_native                      # noqa: E402
+from smokehouse_common.timestamps import (                   # noqa: E402
+    row_epoch, session_start_epoch, to_epoch, to_iso)
 
 REGION = os.environ.get("AWS_REGION", "us-east-2")
 TABLE_SENSOR = os.environ.get("TABLE_SENSOR", "sensor_data")
 TABLE_SESS   = os.environ.get("TABLE_SESS", "sessions")
+SESSION_KIND = "session"  # hash key of the sessions GSI (by_kind_session)
+ACTIVE_KEY   = "active"   # hash key of the sparse active-sessions GSI (by_active)
+ACTIVE_SECS  = 45 * 60    # same timeout SmokehouseUpdateSession uses
+SAVE_EVERY   = 100        # writes between checkpoint saves
 
-ddb = boto3.resource("dynamodb", region_name=REGION)
-t_sensors = ddb.Table(TABLE_SENSOR)
-t_sessions = ddb.Table(TABLE_SESS)
+_local = threading.local()
 
-def main():
-    print(f"Scanning table: {TABLE_SENSOR} (projection: session_id)")
-    seen = set()
-    scan_kwargs = {"ProjectionExpression": "session_id"}
+
+def _table(name):
+    """Per-thread Table handle (boto3 resources are not thread-safe)."""
+    res = getattr(_local, "ddb", None)
+    if res is None:
+        res = _local.ddb = boto3.session.Session().resource("dynamodb", region_name=REGION)
+    return res.Table(name)
+
+
+class Checkpoint:
+    """JSON progress file: per-segment scan position + partial aggregates, written sessions."""
+
+    def __init__(self, path, segments, reset=False):
+        self.path = path
+        self.lock = threading.Lock()
+        state = None
+        if not reset and os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            if state.get("segments_total") != segments:
+                sys.exit(f"{path} was written with {state.get('segments_total')} segments; "
+                         f"rerun with --segments {state.get('segments_total')} or --reset")
+        self.state = state or {
+            "segments_total": segments,
+            "segments": {str(i): {"done": False, "start_key": None, "sessions": {}} for i in range(segments)},
+            "written": [],
+        }
+
+    def save(self):
+        with self.lock:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.state, f, default=str)
+            os.replace(tmp, self.path)
+
+
+class RateLimiter:
+    """Spaces calls at most `rate` per second across all threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.lock = threading.Lock()
+        self.next_at = time.monotonic()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            at = max(now, self.next_at)
+            self.next_at = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+
+def _fold(sessions, session_id, row):
+    """Merge one sensor row into the per-session aggregate {first, last, n, ...}."""
+    epoch = row_epoch(session_id, row)
+    ts = str(row.get("timestamp", ""))
+    agg = sessions.get(session_id)
+    if agg is None:
+        sessions[session_id] = {"n": 1, "first": ts, "last": ts, "first_epoch": epoch, "last_epoch": epoch}
+        return
+    agg["n"] += 1
+    if epoch is not None and (agg["first_epoch"] is None or epoch < agg["first_epoch"]):
+        agg["first"], agg["first_epoch"] = ts, epoch
+    if epoch is not None and (agg["last_epoch"] is None or epoch > agg["last_epoch"]):
+        agg["last"], agg["last_epoch"] = ts, epoch
+
+
+def scan_segment(segment, checkpoint):
+    seg = checkpoint.state["segments"][str(segment)]
+    if seg["done"]:
+        return
+    kwargs = {
+        "Segment": segment,
+        "TotalSegments": checkpoint.state["segments_total"],
+        "ProjectionExpression": "session_id, #ts, ts_epoch",
+        "ExpressionAttributeNames": {"#ts": "timestamp"},
+    }
+    if seg["start_key"]:
+        kwargs["ExclusiveStartKey"] = seg["start_key"]
+    table = _table(TABLE_SENSOR)
+    rows = 0
     while True:
-        resp = t_sensors.scan(**scan_kwargs)
+        resp = table.scan(**kwargs)
         for item in resp.get("Items", []):
             sid = str(item.get("session_id", "")).strip()
             if sid:
-                seen.add(sid)
-        if "LastEvaluatedKey" in resp:
-            scan_kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
-        else:
+                _fold(seg["sessions"], sid, to_native(item))
+                rows += 1
+        last_key = resp.get("LastEvaluatedKey")
+        seg["start_key"] = to_native(last_key) if last_key else None
+        seg["done"] = last_key is None
+        checkpoint.save()
+        if seg["done"]:
             break
+        kwargs["ExclusiveStartKey"] = last_key
+    print(f"segment {segment}: {rows} row(s), {len(seg['sessions'])} session(s)")
+
+
+def merge(checkpoint):
+    merged = {}
+    for seg in checkpoint.state["segments"].values():
+        for sid, agg in seg["sessions"].items():
+            cur = merged.get(sid)
+            if cur is None:
+                merged[sid] = dict(agg)
+                continue
+            cur["n"] += agg["n"]
+            if agg["first_epoch"] is not None and (cur["first_epoch"] is None or agg["first_epoch"] < cur["first_epoch"]):
+                cur["first"], cur["first_epoch"] = agg["first"], agg["first_epoch"]
+            if agg["last_epoch"] is not None and (cur["last_epoch"] is None or agg["last_epoch"] > cur["last_epoch"]):
+                cur["last"], cur["last_epoch"] = agg["last"], agg["last_epoch"]
+    return merged
+
+
+def _update_if(session_id, **kwargs):
+    """update_item that treats a failed condition as "the live value wins"."""
+    try:
+        _table(TABLE_SESS).update_item(Key={"session_id": session_id}, **kwargs)
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            return False
+        raise
+
+
+def write_session(session_id, agg, now, limiter):
+    """Merge one session's scanned aggregates without undoing live writes.
+
+    The scan is a snapshot, and the upserters may have moved a live session on since.
+    last_seen, last_seen_at and seen_count are each only written when the snapshot is
+    ahead of what the item holds, and a session is only (re)activated if it was not
+    ended on purpose.
+    """
+    limiter.wait()
+    sets = ["kind = :k", "start_time = if_not_exists(start_time, :st)",
+            "created_at = if_not_exists(created_at, :now)"]
+    values = {":k": SESSION_KIND, ":st": agg["first"], ":now": now}
+    if agg["first_epoch"] is not None:
+        sets.append("started_at = :sa")
+        values[":sa"] = agg["first_epoch"]
+    recent = agg["last_epoch"] is not None and now - agg["last_epoch"] <= ACTIVE_SECS
+    if not recent:
+        sets.append("#s = if_not_exists(#s, :unknown)")
+        values[":unknown"] = "unknown"
+        if agg["last_epoch"] is not None:
+            sets.append("end_time = if_not_exists(end_time, :et)")
+            values[":et"] = to_iso(agg["last_epoch"])
+    kwargs = {"UpdateExpression": "SET " + ", ".join(sets), "ExpressionAttributeValues": values}
+    if not recent:
+        kwargs["ExpressionAttributeNames"] = {"#s": "status"}
+    _table(TABLE_SESS).update_item(Key={"session_id": session_id}, **kwargs)
+    if agg["last_epoch"] is None:
+        return
+
+    # Progress only moves forward. The upserters maintain last_seen (a sort key or ISO
+    # string, so compared as epochs here) and ADD to seen_count; the scan may be older.
+    item = _table(TABLE_SESS).get_item(
+        Key={"session_id": session_id}, ConsistentRead=True,
+        ProjectionExpression="last_seen",
+    ).get("Item") or {}
+    live = item.get("last_seen")
+    live_epoch = to_epoch(to_native(live), session_start_epoch(session_id)) if live is not None else None
+    if live_epoch is None or live_epoch < agg["last_epoch"]:
+        # ...and only if last_seen is still what was read: a live write since then wins
+        _update_if(
+            session_id,
+            UpdateExpression="SET last_seen = :ls",
+            ConditionExpression="attribute_not_exists(last_seen)" if live is None else "last_seen = :live",
+            ExpressionAttributeValues={":ls": agg["last"], **({} if live is None else {":live": live})},
+        )
+    _update_if(
+        session_id,
+        UpdateExpression="SET last_seen_at = :lsa",
+        ConditionExpression="attribute_not_exists(last_seen_at) OR last_seen_at < :lsa",
+        ExpressionAttributeValues={":lsa": agg["last_epoch"]},
+    )
+    _update_if(
+        session_id,
+        UpdateExpression="SET seen_count = :n",
+        ConditionExpression="attribute_not_exists(seen_count) OR seen_count < :n",
+        ExpressionAttributeValues={":n": agg["n"]},
+    )
+    if recent:
+        # still receiving data: active, and on the index the session closer reads,
+        # unless someone ended it deliberately
+        _update_if(
+            session_id,
+            UpdateExpression="SET #s = :active, active_key = :ak",
+            ConditionExpression="attribute_not_exists(#s) OR #s <> :ended",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={":active": "active", ":ak": ACTIVE_KEY, ":ended": "ended"},
+        )
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--segments", type=int, default=8, help="parallel scan segments (and scan threads)")
+    ap.add_argument("--writes-per-sec", type=float, default=50, help="session update rate limit")
+    ap.add_argument("--write-workers", type=int, default=8)
+    ap.add_argument("--checkpoint", default="backfill_sessions.checkpoint.json")
+    ap.add_argument("--reset", action="store_true", help="start over, ignoring the checkpoint")
+    args = ap.parse_args()
+
+    checkpoint = Checkpoint(args.checkpoint, args.segments, reset=args.reset)
+    pending = [i for i in range(args.segments) if not checkpoint.state["segments"][str(i)]["done"]]
+    print(f"Scanning {TABLE_SENSOR}: {len(pending)}/{args.segments} segment(s) to go")
+    with ThreadPoolExecutor(max_workers=max(1, len(pending))) as pool:
+        for future in [pool.submit(scan_segment, i, checkpoint) for i in pending]:
+            future.result()
+
+    sessions = merge(checkpoint)
+    written = set(checkpoint.state["written"])
+    todo = [sid for sid in sessions if sid not in written]
+    print(f"Found {len(sessions)} session(s); writing {len(todo)} to '{TABLE_SESS}'…")
 
-    print(f"Found {len(seen)} unique session_id(s). Upserting into '{TABLE_SESS}'…")
-    inserted = 0
-    skipped = 0
     now = int(time.time())
+    limiter = RateLimiter(args.writes_per_sec)
+    errors = 0
+    with ThreadPoolExecutor(max_workers=args.write_workers) as pool:
+        futures = {pool.submit(write_session, sid, sessions[sid], now, limiter): sid for sid in todo}
+        for i, (future, sid) in enumerate(futures.items(), 1):
+            try:
+                future.result()
+                with checkpoint.lock:
+                    checkpoint.state["written"].append(sid)
+            except Exception as e:
+                errors += 1
+                print(f"error writing {sid}: {e}")
+            if i % SAVE_EVERY == 0:
+                checkpoint.save()
+    checkpoint.save()
+
+    print({"sessions": len(sessions), "written": len(todo) - errors, "errors": errors,
+           "skipped_already_written": len(sessions) - len(todo)})
+    if not errors:
+        os.remove(args.checkpoint)
 
-    for sid in seen:
-        # try to create item if not exists
-        try:
-            t_sessions.put_item(
-                Item={
-                    "session_id": sid,
-                    "started_at": now,          # best-effort; will be corrected by stream upserter later
-                    "created_at": now,
-                    "status": "unknown",
-                },
-                ConditionExpression="attribute_not_exists(session_id)"
-            )
-            inserted += 1
-        except Exception:
-            skipped += 1
-
-    print({"inserted": inserted, "skipped_existing": skipped})
 
 if __name__ == "__main__":
     main()
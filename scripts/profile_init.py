@@ -0,0 +1,139 @@
+"""Report where each Python lambda's init (import) time goes.
+
+Imports every lambdas/<name>/lambda_function.py in a fresh interpreter under
+`python -X importtime`, with the smokehouse-common layer on the path. For each
+one it prints the total init time, the heaviest top-level imports, and any boto3
+client or resource built at import. That last list should be empty: clients come
+from smokehouse_common.get_client()/get_table() on first use.
+
+The same profile can be captured in Lambda itself. Set
+PYTHONPROFILEIMPORTTIME=1 on the function, export the cold start's log lines,
+and summarize them with --log:
+
+    python scripts/profile_init.py                          # every lambda
+    python scripts/profile_init.py SmokehouseAIAdvisor --top 20
+    python scripts/profile_init.py --log cold_start.log     # CloudWatch export
+
+Needs the handlers' own dependencies (boto3) installed locally. No AWS calls are
+made, since nothing runs past import.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAMBDAS = os.path.join(ROOT, "lambdas")
+LAYER = os.path.join(ROOT, "layers", "smokehouse_common", "python")
+
+PROBE = """
+import json, time
+t0 = time.perf_counter()
+import lambda_function
+init_ms = (time.perf_counter() - t0) * 1000
+from smokehouse_common import init_timings
+print(json.dumps({"init_ms": init_ms, "clients": init_timings()}))
+"""
+
+# import time:       self [us] |  cumulative | imported package
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(text):
+    """-X importtime output -> [(depth, module, self_us, cumulative_us)] in print order."""
+    out = []
+    for line in text.splitlines():
+        m = _LINE.search(line)
+        if m:
+            out.append(((len(m.group(3)) - 1) // 2, m.group(4), int(m.group(1)), int(m.group(2))))
+    return out
+
+
+def top_imports(entries, n, parent="lambda_function"):
+    """Heaviest imports made directly by `parent`, grouped by root package: [(package, ms)].
+
+    -X importtime prints a module after everything it imported, one indent level
+    deeper, so parent's direct imports are the entries just above it at depth+1.
+    Without a `parent` line (or with parent=None) the top-level imports are ranked.
+    """
+    idx = next((i for i, e in enumerate(entries) if e[1] == parent), None) if parent else None
+    if idx is None:
+        children = [e for e in entries if e[0] == 0]
+    else:
+        depth, children = entries[idx][0], []
+        for e in reversed(entries[:idx]):
+            if e[0] <= depth:
+                break
+            if e[0] == depth + 1:
+                children.append(e)
+    totals = {}
+    for _, module, _, cumulative in children:
+        root = module.split(".")[0]
+        totals[root] = totals.get(root, 0) + cumulative
+    ranked = sorted(totals.items(), key=lambda kv: -kv[1])[:n]
+    return [(name, us / 1000) for name, us in ranked]
+
+
+def profile(name):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([os.path.join(LAMBDAS, name), LAYER, env.get("PYTHONPATH", "")])
+    env.setdefault("AWS_DEFAULT_REGION", "us-east-2")
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", PROBE],
+                          capture_output=True, text=True, env=env, cwd=os.path.join(LAMBDAS, name))
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["(no output)"]
+        return {"error": tail[0]}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["imports"] = parse_importtime(proc.stderr)
+    return result
+
+
+def report(name, result, n):
+    if "error" in result:
+        print(f"{name}: import failed: {result['error']}")
+        return
+    own = next((e for e in result["imports"] if e[1] == "lambda_function"), None)
+    line = f"{name}: init {result['init_ms']:.1f} ms"
+    if own:
+        line += f" (lambda_function itself {own[2] / 1000:.1f} ms)"
+    print(line)
+    clients = result.get("clients") or []
+    if clients:
+        built = ", ".join(f"{c['kind']} {c['name']} {c['ms']} ms" for c in clients)
+        print(f"  built at import: {built}")
+    heavy = top_imports(result["imports"], n)
+    print("  top imports: " + ", ".join(f"{pkg} {ms:.1f} ms" for pkg, ms in heavy))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("lambdas", nargs="*", help="lambda directory names (default: all Python lambdas)")
+    ap.add_argument("--top", type=int, default=8, help="imports to list per lambda")
+    ap.add_argument("--log", help="summarize PYTHONPROFILEIMPORTTIME lines from a log file instead")
+    ap.add_argument("--json", action="store_true", help="print raw results as JSON")
+    args = ap.parse_args()
+
+    if args.log:
+        with open(args.log) as f:
+            entries = parse_importtime(f.read())
+        total = sum(e[3] for e in entries if e[0] == 0) / 1000
+        print(f"{args.log}: {total:.1f} ms in imports; heaviest made by lambda_function:")
+        for pkg, ms in top_imports(entries, args.top):
+            print(f"  {pkg:<32} {ms:8.1f} ms")
+        return
+
+    names = args.lambdas or sorted(
+        d for d in os.listdir(LAMBDAS) if os.path.exists(os.path.join(LAMBDAS, d, "lambda_function.py")))
+    results = {name: profile(name) for name in names}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name in names:
+        report(name, results[name], args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+#!/usr/bin/env bash
+set -euo pipefail
+REGION="${AWS_REGION:-us-east-2}"
+NAME="smokehouse-common"
+SRC="$(cd "$(dirname "$0")/../layers/smokehouse_common" && pwd)"
+WORKDIR="$(mktemp -d)"
+echo "WORKDIR=$WORKDIR"
+
+# Pure-Python layer: copy the package, minus bytecode
+cp -R "$SRC/python" "$WORKDIR/python"
+find "$WORKDIR/python" -name '__pycache__' -type d -prune -exec rm -rf {} +
+
+# Zip and publish
+( cd "$WORKDIR" && zip -r "${NAME}.zip" python >/dev/null )
+LAYER_ARN=$(aws lambda publish-layer-version \
+  --layer-name "$NAME" \
+  --region "$REGION" \
+  --compatible-runtimes python3.12 python3.13 \
+  --zip-file "fileb://$WORKDIR/$NAME.zip" \
+  --query 'LayerVersionArn' --output text)
+echo "Published: $LAYER_ARN"
+echo "$LAYER_ARN" > "$WORKDIR/arn.txt"
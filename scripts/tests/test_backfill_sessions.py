@@ -0,0 +1,88 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..", "..")
+sys.path[:0] = [os.path.join(ROOT, "scripts"), os.path.join(ROOT, "bench")]
+
+import backfill_sessions as bf          # noqa: E402
+from fakeddb import FakeDynamoDB        # noqa: E402
+
+
+class _NoLimit:
+    def wait(self):
+        pass
+
+
+def _compact(epoch):
+    return time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(epoch))
+
+
+class WriteSessionTest(unittest.TestCase):
+    def setUp(self):
+        self.db = FakeDynamoDB.from_infra(os.path.join(ROOT, "infra", "ddb", "tables"))
+        self.db.create_table("sensor_data", [("session_id", "S"), ("timestamp", "S")])
+        self.table = bf._table
+        bf._table = self.db.Table
+        self.now = int(time.time())
+        self.sid = time.strftime("%Y%m%d%H%M%S", time.gmtime(self.now - 3600))
+        start = self.now - 3600
+        self.db.Table("sensor_data").load([
+            {"session_id": self.sid, "timestamp": _compact(start + 30 * i), "ts_epoch": start + 30 * i}
+            for i in range(100)])
+
+    def tearDown(self):
+        bf._table = self.table
+
+    def _scan(self):
+        with tempfile.TemporaryDirectory() as d:
+            checkpoint = bf.Checkpoint(os.path.join(d, "cp.json"), 1)
+            bf.scan_segment(0, checkpoint)
+            return bf.merge(checkpoint)[self.sid]
+
+    def _live_upsert(self, ts, n):
+        # what SessionsUpserter writes for a batch of n rows
+        self.db.Table("sessions").update_item(
+            Key={"session_id": self.sid},
+            UpdateExpression="SET last_seen = :ls, #s = if_not_exists(#s, :a) ADD seen_count :n",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={":ls": ts, ":a": "active", ":n": n})
+
+    def _item(self):
+        return self.db.Table("sessions").get_item(Key={"session_id": self.sid})["Item"]
+
+    def test_live_progress_after_the_scan_is_kept(self):
+        self._live_upsert(_compact(self.now - 600), 150)
+        agg = self._scan()
+        self._live_upsert(_compact(self.now - 5), 10)   # rows that arrived after the scan
+        bf.write_session(self.sid, agg, self.now, _NoLimit())
+        item = self._item()
+        self.assertEqual(item["last_seen"], _compact(self.now - 5))
+        self.assertEqual(item["seen_count"], 160)
+        self.assertEqual(item["status"], "active")
+
+    def test_snapshot_ahead_of_the_item_is_written(self):
+        self._live_upsert(_compact(self.now - 3000), 5)
+        agg = self._scan()
+        bf.write_session(self.sid, agg, self.now, _NoLimit())
+        item = self._item()
+        self.assertEqual(item["last_seen"], agg["last"])
+        self.assertEqual(item["seen_count"], 100)
+        self.assertEqual(item["last_seen_at"], agg["last_epoch"])
+
+    def test_ended_session_stays_ended(self):
+        agg = self._scan()
+        self.db.Table("sessions").load([{"session_id": self.sid, "status": "ended",
+                                         "last_seen": _compact(self.now - 60), "seen_count": 120}])
+        bf.write_session(self.sid, agg, self.now, _NoLimit())
+        item = self._item()
+        self.assertEqual(item["status"], "ended")
+        self.assertNotIn("active_key", item)
+        self.assertEqual(item["seen_count"], 120)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,12 +4,15 @@ import "./App.css";
 import Chart from "./components/Chart/Chart";
 import Alerts from "./components/Alerts/Alerts";
 import ProbeCard from "./components/ProbeCard/ProbeCard";
-import { fetchLatestSession, fetchSessions, fetchSensors, fetchItemTypes, updateSession, fetchProbeAssignments, saveProbeAssignment } from "./api";
+import { fetchBootstrap, fetchLatestSession, fetchSessionsPage, fetchSensors, fetchItemTypes, updateSession, postAdvisorBatch, fetchProbeAssignments, saveProbeAssignment, subscribeLiveSensors } from "./api";
 import GroupedProbeCard from "./components/ProbeCard/GroupedProbeCard";
 import SessionSelector from "./components/SessionSelector/SessionSelector";
 import { sessionIdToDate } from "./components/SessionSelector/formatDateTime";
 import { toDisplay, fromDisplay, unitLabel } from "./utils/temperature";
 const POLL_MS = 15000;
+const FALLBACK_POLL_MS = 120000; // while rows are pushed over the live socket
+const SENSOR_ROWS = 100;
+const ADVICE_REVALIDATE_MS = 20000; // re-read stale advice once its background refresh is done
 
 function fmtElapsed(ms) {
   if (ms == null || ms < 0) return null;
@@ -24,6 +27,7 @@ export default function App() {
   const [selectedSessionId, setSelectedSessionId] = useState("");
   const [sessions, setSessions] = useState([]);
   const [sessionsLoading, setSessionsLoading] = useState(true);
+  const [sessionsCursor, setSessionsCursor] = useState(null);
   const [sensorData, setSensorData] = useState([]);
   const [itemTypes, setItemTypes] = useState([]);
   const [alerts, setAlerts] = useState([]);
@@ -32,12 +36,18 @@ export default function App() {
   const [unit, setUnit] = useState("F"); // 'F' | 'C'
   const [sessionElapsed, setSessionElapsed] = useState(null);
   const [sessionActive, setSessionActive] = useState(false);
+  const [liveOpen, setLiveOpen] = useState(false);
+  const [booted, setBooted] = useState(false);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState("");
   const timerRef = useRef(null);
   const clockRef = useRef(null);
   const inFlightRef = useRef(false);
+  const skipRefreshRef = useRef(false);
   const assignmentsLoadedForRef = useRef("");
+  // Rows already on screen, and the session they belong to, for delta polling
+  const sensorDataRef = useRef([]);
+  const sensorSidRef = useRef("");
 
   const [probes, setProbes] = useState([
     { id: "probe1_temp", name: "Probe 1", minAlert: "", maxAlert: "", itemType: "", itemWeight: "", temperature: null, groupId: null },
@@ -87,18 +97,66 @@ export default function App() {
     return res;
   }, []);
 
-  useEffect(() => {
-    let mounted = true;
-    fetchSessions(50)
-      .then((list) => { if (mounted) setSessions(Array.isArray(list) ? list : []); })
-      .catch(() => {})
-      .finally(() => { if (mounted) setSessionsLoading(false); });
-    return () => { mounted = false; };
-  }, []);
+  // "Load more" in the session selector: fetch exactly one further page
+  const loadMoreSessions = useCallback(async () => {
+    if (!sessionsCursor) return;
+    try {
+      const { items, next_cursor } = await fetchSessionsPage({ limit: 50, cursor: sessionsCursor });
+      setSessions((prev) => [...prev, ...items]);
+      setSessionsCursor(next_cursor);
+    } catch {
+      // keep the current list; the user can retry
+    }
+  }, [sessionsCursor]);
 
   const selectedSessionIdRef = useRef(selectedSessionId);
   useEffect(() => { selectedSessionIdRef.current = selectedSessionId; }, [selectedSessionId]);
 
+  // Merge new rows (polled or pushed) into what's on screen: newest-first, deduped by timestamp
+  const applyRows = useCallback((viewSid, fresh) => {
+    const sameSession = sensorSidRef.current === viewSid;
+    const have = sameSession ? sensorDataRef.current : [];
+    const seen = new Set(have.map((r) => r?.timestamp));
+    const added = fresh.filter((r) => !seen.has(r?.timestamp));
+    const sorted = [...added, ...have]
+      .sort((a, b) => String(b?.timestamp ?? "").localeCompare(String(a?.timestamp ?? "")))
+      .slice(0, SENSOR_ROWS);
+    sensorSidRef.current = viewSid;
+    sensorDataRef.current = sorted;
+    if (sameSession && added.length === 0) return;
+    setSensorData(sorted);
+
+    const latestSample = sorted[0] || {};
+    setProbes((prev) =>
+      prev.map((p) => ({
+        ...p,
+        temperature:
+          latestSample[p.id] !== undefined && latestSample[p.id] !== -999
+            ? latestSample[p.id]
+            : null,
+      }))
+    );
+  }, []);
+
+  // Restore probe assignments (item type, weight, alert thresholds, group)
+  const applyAssignments = useCallback((assignments) => {
+    if (!assignments.length) return;
+    setProbes((prev) =>
+      prev.map((p) => {
+        const a = assignments.find((x) => x.probe_id === p.id);
+        if (!a) return p;
+        return {
+          ...p,
+          itemType:   a.item_type   ?? p.itemType,
+          itemWeight: a.item_weight ?? p.itemWeight,
+          minAlert:   a.min_alert  != null ? String(a.min_alert)  : p.minAlert,
+          maxAlert:   a.max_alert  != null ? String(a.max_alert)  : p.maxAlert,
+          groupId:    a.group_id   ?? null,
+        };
+      })
+    );
+  }, []);
+
   const refreshData = useCallback(async () => {
     if (inFlightRef.current) return;
     inFlightRef.current = true;
@@ -112,22 +170,11 @@ export default function App() {
       setSelectedSessionId((prev) => prev || sid);
 
       const viewSid = selectedSessionIdRef.current || sid;
-      const data = await fetchSensors(viewSid, 100);
-      const sorted = [...(Array.isArray(data) ? data : [])].sort((a, b) =>
-        String(b?.timestamp ?? "").localeCompare(String(a?.timestamp ?? ""))
-      );
-      setSensorData(sorted);
-
-      const latestSample = sorted[0] || {};
-      setProbes((prev) =>
-        prev.map((p) => ({
-          ...p,
-          temperature:
-            latestSample[p.id] !== undefined && latestSample[p.id] !== -999
-              ? latestSample[p.id]
-              : null,
-        }))
-      );
+      // Same session already loaded: only ask for rows newer than what we have
+      const have = sensorSidRef.current === viewSid ? sensorDataRef.current : [];
+      const after = have[0]?.timestamp;
+      const data = await fetchSensors(viewSid, SENSOR_ROWS, after ? { after } : {});
+      applyRows(viewSid, Array.isArray(data) ? data : []);
 
       // Load session-level data and probe assignments once per session
       if (assignmentsLoadedForRef.current !== sid) {
@@ -138,24 +185,7 @@ export default function App() {
           setTargetPitTempF(String(session.target_pit_temp_f));
         }
 
-        // Restore probe assignments (item type, weight, alert thresholds, group)
-        const assignments = await fetchProbeAssignments(sid);
-        if (assignments.length > 0) {
-          setProbes((prev) =>
-            prev.map((p) => {
-              const a = assignments.find((x) => x.probe_id === p.id);
-              if (!a) return p;
-              return {
-                ...p,
-                itemType:   a.item_type   ?? p.itemType,
-                itemWeight: a.item_weight ?? p.itemWeight,
-                minAlert:   a.min_alert  != null ? String(a.min_alert)  : p.minAlert,
-                maxAlert:   a.max_alert  != null ? String(a.max_alert)  : p.maxAlert,
-                groupId:    a.group_id   ?? null,
-              };
-            })
-          );
-        }
+        applyAssignments(await fetchProbeAssignments(sid));
       }
     } catch {
       setError("Failed to load data");
@@ -163,22 +193,67 @@ export default function App() {
       setLoading(false);
       inFlightRef.current = false;
     }
-  }, [resolveSessionId]);
+  }, [resolveSessionId, applyRows, applyAssignments]);
 
+  // First paint from one GET /bootstrap (latest session, its rows and assignments, the
+  // sessions page, item types). If it fails, load the same pieces with separate calls.
   useEffect(() => {
     let mounted = true;
-    fetchItemTypes()
-      .then((types) => { if (mounted) setItemTypes(Array.isArray(types) ? types : []); })
-      .catch(() => {});
+    fetchBootstrap({ limit: SENSOR_ROWS, sessionsLimit: 50 })
+      .then((boot) => {
+        if (!mounted) return;
+        setSessions(Array.isArray(boot?.sessions?.items) ? boot.sessions.items : []);
+        setSessionsCursor(boot?.sessions?.next_cursor ?? null);
+        setSessionsLoading(false);
+        setItemTypes(Array.isArray(boot?.item_types) ? boot.item_types : []);
+        const session = boot?.latest;
+        const sid = String(session?.session_id || "");
+        if (!sid) return;
+        setSessionActive(session.status === "active");
+        setSessionId(sid);
+        setSelectedSessionId((prev) => prev || sid);
+        applyRows(sid, Array.isArray(boot.sensors) ? boot.sensors : []);
+        assignmentsLoadedForRef.current = sid;
+        if (session.target_pit_temp_f != null) {
+          setTargetPitTempF(String(session.target_pit_temp_f));
+        }
+        applyAssignments(Array.isArray(boot.assignments) ? boot.assignments : []);
+        skipRefreshRef.current = true; // already current; the next poll is a delta
+      })
+      .catch(() => {
+        if (!mounted) return;
+        fetchSessionsPage({ limit: 50 })
+          .then(({ items, next_cursor }) => {
+            if (!mounted) return;
+            setSessions(items);
+            setSessionsCursor(next_cursor);
+          })
+          .catch(() => {})
+          .finally(() => { if (mounted) setSessionsLoading(false); });
+        fetchItemTypes()
+          .then((types) => { if (mounted) setItemTypes(Array.isArray(types) ? types : []); })
+          .catch(() => {});
+      })
+      .finally(() => { if (mounted) setBooted(true); });
     return () => { mounted = false; };
-  }, []);
+  }, [applyRows, applyAssignments]);
 
+  // Live session: new rows are pushed as they land; polling drops to a slow catch-up
+  // while the socket is up and returns to POLL_MS whenever it isn't.
+  const liveSid = isLive ? (selectedSessionId || sessionId) : "";
   useEffect(() => {
-    refreshData();
+    if (!liveSid) return undefined;
+    return subscribeLiveSensors(liveSid, (rows) => applyRows(liveSid, rows), setLiveOpen);
+  }, [liveSid, applyRows]);
+
+  useEffect(() => {
+    if (!booted) return undefined;
+    if (skipRefreshRef.current) skipRefreshRef.current = false;
+    else refreshData();
     if (timerRef.current) clearInterval(timerRef.current);
-    if (isLive) timerRef.current = setInterval(refreshData, POLL_MS);
+    if (isLive) timerRef.current = setInterval(refreshData, liveOpen ? FALLBACK_POLL_MS : POLL_MS);
     return () => { if (timerRef.current) clearInterval(timerRef.current); };
-  }, [refreshData, isLive]);
+  }, [refreshData, isLive, liveOpen, booted]);
 
   const handleSessionSelect = useCallback((sid) => {
     selectedSessionIdRef.current = sid;
@@ -187,6 +262,57 @@ export default function App() {
     refreshData();
   }, [refreshData]);
 
+  // AI guidance for every assigned probe comes from one batch call (a single model
+  // invocation per session); each card shows its own probe's share.
+  const advisorSid = selectedSessionId || sessionId;
+  const [advice, setAdvice] = useState({}); // probe_id -> { advice, cached }
+  const [advisorBusy, setAdvisorBusy] = useState(false);
+  const adviceTimerRef = useRef(null);
+
+  useEffect(() => {
+    setAdvice({});
+    return () => clearTimeout(adviceTimerRef.current);
+  }, [advisorSid]);
+
+  const handleAdvisor = useCallback(async () => {
+    if (!advisorSid) return;
+    clearTimeout(adviceTimerRef.current);
+    setAdvisorBusy(true);
+    try {
+      // Stale advice comes back at once while the advisor refreshes it in the background
+      const res = await postAdvisorBatch(advisorSid, null, { staleOk: true });
+      if (!res || res.error) throw new Error(res?.error || "Advisor error");
+      const next = {};
+      for (const [probeId, a] of Object.entries(res.advice || {})) {
+        next[probeId] = { advice: a, cached: Boolean(res.cached?.[probeId]) };
+      }
+      setAdvice(next);
+      if (res.stale?.length) {
+        adviceTimerRef.current = setTimeout(async () => {
+          try {
+            const fresh = await postAdvisorBatch(advisorSid, res.stale, { staleOk: true });
+            if (!fresh || fresh.error) return;
+            setAdvice((prev) => {
+              const merged = { ...prev };
+              for (const [probeId, a] of Object.entries(fresh.advice || {})) {
+                merged[probeId] = { advice: a, cached: Boolean(fresh.cached?.[probeId]) };
+              }
+              return merged;
+            });
+          } catch {
+            // keep the stale advice on screen
+          }
+        }, ADVICE_REVALIDATE_MS);
+      }
+    } catch (err) {
+      console.error("Advisor error:", err); // eslint-disable-line no-console
+      const failed = { advice: { notes: "Unable to get AI guidance right now. Please try again." }, cached: false };
+      setAdvice(Object.fromEntries(probes.filter((p) => p.itemType).map((p) => [p.id, failed])));
+    } finally {
+      setAdvisorBusy(false);
+    }
+  }, [advisorSid, probes]);
+
   const handleApplyPitTemp = useCallback(async (tempF) => {
     setTargetPitTempF(String(tempF));
     try {
@@ -344,6 +470,8 @@ export default function App() {
             onSelect={handleSessionSelect}
             loading={sessionsLoading}
             sessionActive={sessionActive}
+            hasMore={Boolean(sessionsCursor)}
+            onLoadMore={loadMoreSessions}
           />
           {!isLive && (
             <button className="back-to-live-btn" onClick={() => setSelectedSessionId(sessionId)}>
@@ -449,6 +577,9 @@ export default function App() {
                     onItemChange={handleItemChange}
                     onUngroup={handleUnlinkProbe}
                     onApplyPitTemp={handleApplyPitTemp}
+                    adviceByProbe={advice}
+                    advisorBusy={advisorBusy}
+                    onAdvisor={handleAdvisor}
                   />
                 )];
               }
@@ -470,6 +601,10 @@ export default function App() {
                   onApplyPitTemp={handleApplyPitTemp}
                   availablePartners={availablePartners}
                   onGroupWith={handleLinkProbe}
+                  advice={advice[probe.id]?.advice ?? null}
+                  adviceCached={advice[probe.id]?.cached ?? false}
+                  advisorBusy={advisorBusy}
+                  onAdvisor={handleAdvisor}
                 />
               )];
             });
@@ -9,6 +9,9 @@ const ITEMS_BASE =
   process.env.REACT_APP_MEAT_API_BASE ||
   "https://o05rs5z8e1.execute-api.us-east-2.amazonaws.com"; // itemTypes/meatTypes
 
+// WebSocket API that pushes new sensor rows (LiveConnections/LiveFanout). Unset: poll only.
+export const LIVE_WS_URL = process.env.REACT_APP_LIVE_WS_URL || "";
+
 // Full URL for assignments (POST). Prefer a single URL to avoid double-slash mishaps.
 const ASSIGN_URL =
   process.env.REACT_APP_ASSIGN_URL ||
@@ -33,25 +36,101 @@ async function jsonFetch(url, options = {}) {
   return data;
 }
 
+// ---------- Bootstrap ----------
+/**
+ * GET /bootstrap?limit=N&sessions_limit=M -> everything the first paint needs, in one trip:
+ * { latest: {...as fetchLatestSession}, sessions: { items, next_cursor },
+ *   sensors: [...newest-first rows of latest], assignments: [...], item_types: [...] }
+ */
+export async function fetchBootstrap({ limit = 100, sessionsLimit = 50 } = {}) {
+  const qs = new URLSearchParams({ limit: String(limit), sessions_limit: String(sessionsLimit) });
+  return jsonFetch(`${API_BASE}/bootstrap?${qs}`);
+}
+
 // ---------- Sessions ----------
 /** GET /sessions/latest -> { session_id, started_at, status, ... } */
 export async function fetchLatestSession() {
   return jsonFetch(`${API_BASE}/sessions/latest`);
 }
 
-/** GET /sessions?limit=N -> [{ session_id, status, started_at, ... }, ...] newest-first */
+/**
+ * GET /sessions?limit=N[&cursor=...&status=...&since=...&until=...]
+ * -> { items: [{ session_id, status, started_at, ... }, ...] newest-first, next_cursor }
+ * Pass the returned next_cursor back to load the following page.
+ */
+export async function fetchSessionsPage({ limit = 50, cursor, status, since, until } = {}) {
+  const qs = new URLSearchParams({ limit: String(limit) });
+  if (cursor) qs.set("cursor", cursor);
+  if (status) qs.set("status", status);
+  if (since) qs.set("since", since);
+  if (until) qs.set("until", until);
+  const res = await jsonFetch(`${API_BASE}/sessions?${qs}`);
+  // Older deployments returned a bare array
+  if (Array.isArray(res)) return { items: res, next_cursor: null };
+  return { items: Array.isArray(res?.items) ? res.items : [], next_cursor: res?.next_cursor ?? null };
+}
+
+/** First page only -> [{ session_id, status, started_at, ... }, ...] newest-first */
 export async function fetchSessions(limit = 50) {
-  return jsonFetch(`${API_BASE}/sessions?limit=${limit}`);
+  const { items } = await fetchSessionsPage({ limit });
+  return items;
 }
 
 // ---------- Sensors ----------
-/** GET /sensors?session_id=...&limit=... -> array of samples (newest-first expected by UI) */
-export async function fetchSensors(sessionId, limit = 50) {
+/**
+ * GET /sensors?session_id=...&limit=...[&after=<timestamp>] -> array of samples (newest-first)
+ * With `after`, only rows strictly newer than that timestamp are returned (delta poll).
+ * Responses carry an ETag; the browser revalidates with If-None-Match and an
+ * unchanged session comes back as a body-less 304 served from the HTTP cache.
+ */
+export async function fetchSensors(sessionId, limit = 50, { after } = {}) {
   if (!sessionId) throw new Error("fetchSensors: sessionId required");
-  const url = `${API_BASE}/sensors?session_id=${encodeURIComponent(sessionId)}&limit=${limit}`;
+  let url = `${API_BASE}/sensors?session_id=${encodeURIComponent(sessionId)}&limit=${limit}`;
+  if (after) url += `&after=${encodeURIComponent(after)}`;
   return jsonFetch(url);
 }
 
+/**
+ * Live push: opens a WebSocket subscribed to sessionId and calls onRows(rows) with each
+ * batch of new rows (newest-first, same shape as fetchSensors). onOpenChange(bool)
+ * reports whether the socket is up, so callers can fall back to polling while it isn't.
+ * Reconnects with backoff. Returns a function that closes it for good.
+ * Without REACT_APP_LIVE_WS_URL it never connects and onOpenChange is never true.
+ */
+export function subscribeLiveSensors(sessionId, onRows, onOpenChange = () => {}) {
+  if (!LIVE_WS_URL || !sessionId || typeof WebSocket === "undefined") return () => {};
+  let ws = null;
+  let closed = false;
+  let retry = 0;
+  let timer = null;
+
+  function connect() {
+    ws = new WebSocket(`${LIVE_WS_URL}?session_id=${encodeURIComponent(sessionId)}`);
+    ws.onopen = () => { retry = 0; onOpenChange(true); };
+    ws.onmessage = (e) => {
+      let msg = null;
+      try { msg = JSON.parse(e.data); } catch { return; }
+      if (msg?.type === "rows" && msg.session_id === sessionId && Array.isArray(msg.rows)) {
+        onRows(msg.rows);
+      }
+    };
+    ws.onclose = () => {
+      if (closed) return;
+      onOpenChange(false);
+      const delay = Math.min(60000, 1000 * 2 ** retry++);
+      timer = setTimeout(connect, delay);
+    };
+  }
+
+  connect();
+  return () => {
+    closed = true;
+    clearTimeout(timer);
+    onOpenChange(false);
+    if (ws) ws.close();
+  };
+}
+
 // ---------- Item Types (with route fallback) ----------
 /**
  * Tries GET /itemTypes first; falls back to /meatTypes.
@@ -82,18 +161,17 @@ function normalizeItemTypes(list) {
 
 // ---------- Advisor ----------
 /**
- * POST /advisor
- * payload: { session_id: string, probe_id: 'probe1_temp'|'probe2_temp'|... }
- * returns: { advice: string, model?: string, ... }
+ * POST /advisor (batch) — one model call for several probes of a session
+ * probeIds: ['probe1_temp', ...]; omit for every assigned probe
+ * staleOk: answer at once with the last advice and refresh it in the background
+ * returns: { advice: { [probe_id]: advice }, cached: { [probe_id]: boolean }, stale: [probe_id, ...] }
  */
-export async function postAdvisor(payload) {
-  if (!payload?.session_id || !payload?.probe_id) {
-    throw new Error("postAdvisor: {session_id, probe_id} required");
-  }
+export async function postAdvisorBatch(sessionId, probeIds = null, { staleOk = false } = {}) {
+  if (!sessionId) throw new Error("postAdvisorBatch: sessionId required");
   return jsonFetch(`${API_BASE}/advisor`, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
-    body: JSON.stringify(payload),
+    body: JSON.stringify({ session_id: sessionId, probe_ids: probeIds, stale_ok: staleOk }),
   });
 }
 
@@ -1,7 +1,6 @@
 // src/components/ProbeCard/GroupedProbeCard.js
 import React, { useEffect, useState, useCallback, useMemo } from "react";
 import "./ProbeCard.css";
-import { postAdvisor } from "../../api";
 import AdvisorPanel from "./AdvisorPanel";
 import ProbeChart from "./ProbeChart";
 import { toDisplay, fromDisplay, unitLabel } from "../../utils/temperature";
@@ -20,7 +19,6 @@ function computeRateOfRise(data, probeId, window = 10) {
 function GroupedProbeCard({
   probes,
   data = [],
-  sessionId,
   itemTypes = [],
   unit = "F",
   onSetAlert,
@@ -28,6 +26,9 @@ function GroupedProbeCard({
   onItemChange,
   onUngroup,
   onApplyPitTemp,
+  adviceByProbe = {},
+  advisorBusy = false,
+  onAdvisor,
 }) {
   const [p1, p2] = probes;
   const ul = unitLabel(unit);
@@ -39,9 +40,6 @@ function GroupedProbeCard({
   const [min2F, setMin2F] = useState(p2.minAlert ?? "");
   const [max2F, setMax2F] = useState(p2.maxAlert ?? "");
   const [configOpen,   setConfigOpen]   = useState(false);
-  const [advisorBusy,  setAdvisorBusy]  = useState(false);
-  const [advice,       setAdvice]       = useState(null);
-  const [adviceCached, setAdviceCached] = useState(false);
 
   useEffect(() => {
     setItemType(p1.itemType   ?? "");
@@ -50,7 +48,6 @@ function GroupedProbeCard({
     setMax1F(p1.maxAlert ?? "");
     setMin2F(p2.minAlert ?? "");
     setMax2F(p2.maxAlert ?? "");
-    setAdvice(null);
   }, [p1.id, p2.id]); // eslint-disable-line react-hooks/exhaustive-deps
 
   const selectedItem = useMemo(
@@ -97,22 +94,8 @@ function GroupedProbeCard({
   // Use the lower-temp probe for AI (the undercooked end matters most)
   const advisorProbe = (p1.temperature ?? Infinity) <= (p2.temperature ?? Infinity) ? p1 : p2;
 
-  const handleAdvisor = useCallback(async () => {
-    if (!sessionId) return;
-    setAdvisorBusy(true);
-    try {
-      const res = await postAdvisor({ session_id: sessionId, probe_id: advisorProbe.id });
-      if (!res || res.error) throw new Error(res?.error || "Advisor error");
-      setAdvice(res.advice);
-      setAdviceCached(res.cached ?? false);
-    } catch (err) {
-      console.error("Advisor error:", err); // eslint-disable-line no-console
-      setAdvice({ notes: "Unable to get AI guidance right now. Please try again." });
-      setAdviceCached(false);
-    } finally {
-      setAdvisorBusy(false);
-    }
-  }, [sessionId, advisorProbe.id]);
+  const advice       = adviceByProbe[advisorProbe.id]?.advice ?? null;
+  const adviceCached = adviceByProbe[advisorProbe.id]?.cached ?? false;
 
   const ror1 = useMemo(() => computeRateOfRise(data, p1.id), [data, p1.id]);
   const ror2 = useMemo(() => computeRateOfRise(data, p2.id), [data, p2.id]);
@@ -206,7 +189,7 @@ function GroupedProbeCard({
       {/* Actions */}
       <div className="probe-card__actions">
         {hasItem && !isColdSmoke && (
-          <button className="probe-btn probe-btn--ai" onClick={handleAdvisor} disabled={advisorBusy}>
+          <button className="probe-btn probe-btn--ai" onClick={onAdvisor} disabled={advisorBusy || !onAdvisor}>
             {advisorBusy ? "Getting AI…" : advice ? "↻ Refresh AI" : "🤖 AI Guidance"}
           </button>
         )}
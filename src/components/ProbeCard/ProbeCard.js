@@ -1,7 +1,6 @@
 // src/components/ProbeCard/ProbeCard.js
 import React, { useEffect, useState, useCallback, useMemo } from "react";
 import "./ProbeCard.css";
-import { postAdvisor } from "../../api";
 import AdvisorPanel from "./AdvisorPanel";
 import ProbeChart from "./ProbeChart";
 import { toDisplay, fromDisplay, unitLabel } from "../../utils/temperature";
@@ -53,23 +52,19 @@ function computeRateOfRise(data, probeId, window = 10) {
   return Math.round((delta / (vals.length - 1)) * 60 * 10) / 10;
 }
 
-function ProbeCard({ probe, data = [], sessionId, itemTypes = [], unit = "F", onSetAlert, onClearAlert, onItemChange, onApplyPitTemp, availablePartners = [], onGroupWith }) {
+function ProbeCard({ probe, data = [], sessionId, itemTypes = [], unit = "F", onSetAlert, onClearAlert, onItemChange, onApplyPitTemp, availablePartners = [], onGroupWith, advice = null, adviceCached = false, advisorBusy = false, onAdvisor }) {
   const [itemType,     setItemType]     = useState(probe.itemType   ?? "");
   const [itemWeight,   setItemWeight]   = useState(probe.itemWeight ?? "");
   // alerts stored internally in °F
   const [minAlertF,    setMinAlertF]    = useState(probe.minAlert   ?? "");
   const [maxAlertF,    setMaxAlertF]    = useState(probe.maxAlert   ?? "");
   const [configOpen,   setConfigOpen]   = useState(false);
-  const [advisorBusy,  setAdvisorBusy]  = useState(false);
-  const [advice,       setAdvice]       = useState(null);
-  const [adviceCached, setAdviceCached] = useState(false);
 
   useEffect(() => {
     setItemType(probe.itemType   ?? "");
     setItemWeight(probe.itemWeight ?? "");
     setMinAlertF(probe.minAlert  ?? "");
     setMaxAlertF(probe.maxAlert  ?? "");
-    setAdvice(null);
   }, [probe.id]); // eslint-disable-line react-hooks/exhaustive-deps
 
   const selectedItem = useMemo(
@@ -119,23 +114,6 @@ function ProbeCard({ probe, data = [], sessionId, itemTypes = [], unit = "F", on
     onClearAlert?.(probe.id);
   }, [onClearAlert, probe.id]);
 
-  const handleAdvisor = useCallback(async () => {
-    if (!sessionId) return;
-    setAdvisorBusy(true);
-    try {
-      const res = await postAdvisor({ session_id: sessionId, probe_id: probe.id });
-      if (!res || res.error) throw new Error(res?.error || "Advisor error");
-      setAdvice(res.advice);
-      setAdviceCached(res.cached ?? false);
-    } catch (err) {
-      console.error("Advisor error:", err); // eslint-disable-line no-console
-      setAdvice({ notes: "Unable to get AI guidance right now. Please try again." });
-      setAdviceCached(false);
-    } finally {
-      setAdvisorBusy(false);
-    }
-  }, [sessionId, probe.id]);
-
   const temp    = probe.temperature; // always °F
   const hasTemp = temp !== null && temp !== undefined;
   const tempDisplay = hasTemp ? toDisplay(temp, unit) : null;
@@ -219,7 +197,7 @@ function ProbeCard({ probe, data = [], sessionId, itemTypes = [], unit = "F", on
       {/* Actions */}
       <div className="probe-card__actions">
         {hasItem && !isColdSmoke && (
-          <button className="probe-btn probe-btn--ai" onClick={handleAdvisor} disabled={advisorBusy}>
+          <button className="probe-btn probe-btn--ai" onClick={onAdvisor} disabled={advisorBusy || !onAdvisor}>
             {advisorBusy ? "Getting AI…" : advice ? "↻ Refresh AI" : "🤖 AI Guidance"}
           </button>
         )}
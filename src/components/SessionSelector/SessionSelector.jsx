@@ -11,8 +11,10 @@ import './SessionSelector.css';
  *   selectedId   {string}  the currently viewed session_id
  *   onSelect     {func}    called with session_id string when user picks one
  *   loading      {bool}    show loading state while sessions are fetching
+ *   hasMore      {bool}    another page of older sessions is available
+ *   onLoadMore   {func}    fetch the next page of sessions
  */
-export default function SessionSelector({ sessions, currentId, selectedId, onSelect, loading, sessionActive }) {
+export default function SessionSelector({ sessions, currentId, selectedId, onSelect, loading, sessionActive, hasMore, onLoadMore }) {
   const [open, setOpen] = useState(false);
   const ref = useRef(null);
 
@@ -78,6 +80,11 @@ export default function SessionSelector({ sessions, currentId, selectedId, onSel
           {sessions.length === 0 && !loading && (
             <li className="session-selector__empty">No sessions found</li>
           )}
+          {hasMore && onLoadMore && (
+            <li className="session-selector__item session-selector__more" onClick={onLoadMore}>
+              Load older sessions…
+            </li>
+          )}
         </ul>
       )}
     </div>